@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+benchmarks the probe and edit paths of videfix on synthetic video files
+
+the fixtures are generated locally with ffmpeg's lavfi sources (a test pattern for the video, sine waves for the audio tracks), for each combination of container, number of audio tracks, tagging and size. They are kept in the work directory, so that the next runs don't have to generate them again.
+
+the results are written as json, so that they can be compared from one commit to the other.
+"""
+import sys
+import os
+import argparse
+import contextlib
+import datetime
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+import videfix  # noqa: E402
+
+# the approximate size of the fixtures, in bytes
+FIXTURE_SIZES = {
+    'tiny': 256 * 1024,
+    'small': 16 * 1024 * 1024,
+    'medium': 256 * 1024 * 1024,
+    'large': 2 * 1024 * 1024 * 1024,
+}
+
+FIXTURE_DURATION = 20.0  # in seconds ; the video bitrate is chosen to reach the requested size
+AUDIO_BITRATE = 64000  # in bits per second, for each audio track
+AUDIO_LANGUAGES = ['eng', 'fra', 'jpn', 'kor', 'spa', 'deu', 'ita', 'por']
+
+OPERATIONS = ['get_movie_track_languages', 'get_movie_title', 'get_movie_track_languages_ffprobe', 'create_backup', 'modify_movie_metadata']
+
+
+class Fixture:
+
+    def __init__(self, container_type, num_audio_tracks, is_tagged, size_name):
+        """
+        :param videfix.MovieContainerType container_type:
+        :param int num_audio_tracks:
+        :param bool is_tagged: if True, the fixture has a title and its audio tracks have languages (IAS<n> riff tags for avi files)
+        :param str size_name: one of the keys of FIXTURE_SIZES
+        """
+        self.container_type = container_type
+        self.num_audio_tracks = num_audio_tracks
+        self.is_tagged = is_tagged
+        self.size_name = size_name
+
+    @property
+    def file_name(self):
+        return '%s_%daudio_%s.%s' % (self.size_name, self.num_audio_tracks, 'tagged' if self.is_tagged else 'untagged', self.container_type.name.lower())
+
+    def generate(self, fixture_file_path):
+        """
+        :param Path fixture_file_path:
+        """
+        video_bitrate = max(FIXTURE_SIZES[self.size_name] * 8 / FIXTURE_DURATION - self.num_audio_tracks * AUDIO_BITRATE, 32000)
+        command = ['ffmpeg', '-v', 'error', '-y', '-f', 'lavfi', '-i', 'testsrc2=size=640x360:rate=25:duration=%f' % FIXTURE_DURATION]
+        for track_index in range(self.num_audio_tracks):
+            command += ['-f', 'lavfi', '-i', 'sine=frequency=%d:sample_rate=48000:duration=%f' % (220 * (track_index + 1), FIXTURE_DURATION)]
+        command += ['-map', '0:v']
+        for track_index in range(self.num_audio_tracks):
+            command += ['-map', '%d:a' % (track_index + 1)]
+        # mpeg4 and ac3 have native encoders and fit in the 3 containers
+        command += ['-c:v', 'mpeg4', '-b:v', '%d' % video_bitrate, '-maxrate', '%d' % video_bitrate, '-bufsize', '%d' % video_bitrate, '-c:a', 'ac3', '-b:a', '%d' % AUDIO_BITRATE]
+        if self.is_tagged:
+            command += ['-metadata', 'title=videfix benchmark %s' % self.file_name]
+            for track_index in range(self.num_audio_tracks):
+                language = videfix.Language(language_iso=AUDIO_LANGUAGES[track_index % len(AUDIO_LANGUAGES)])
+                if self.container_type == videfix.MovieContainerType.AVI:
+                    command += ['-metadata', 'IAS%d=%s' % (track_index + 1, language.name)]
+                else:
+                    command += ['-metadata:s:a:%d' % track_index, 'language=%s' % language.iso]
+        command.append(str(fixture_file_path))
+        completed_process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        assert completed_process.returncode == 0, completed_process.stderr
+
+
+def get_fixture_file_path(fixture, fixtures_dir_path):
+    """
+    :param Fixture fixture:
+    :param Path fixtures_dir_path:
+    :rtype Path: the fixture file, generated if it doesn't exist yet
+    """
+    fixture_file_path = fixtures_dir_path / fixture.file_name
+    if not fixture_file_path.exists():
+        print('generating %s' % fixture_file_path, file=sys.stderr)
+        tmp_file_path = fixture_file_path.with_name('tmp_' + fixture_file_path.name)
+        fixture.generate(tmp_file_path)
+        tmp_file_path.rename(fixture_file_path)
+    return fixture_file_path
+
+
+def reset_probe_cache():
+    # each measure starts cold, as when videfix is launched on a new video file
+    videfix.MOVIE_PROBE_CACHE = videfix.MovieProbeCache()
+
+
+def run_operation(operation, fixture_file_path, scratch_dir_path):
+    """
+    runs an operation once
+
+    :param str operation: one of OPERATIONS
+    :param Path fixture_file_path:
+    :param Path scratch_dir_path: the directory where the files modified by the operation are created
+    :rtype float: the duration of the operation in seconds, excluding its setup and cleanup
+    """
+    reset_probe_cache()
+    if operation == 'get_movie_track_languages':
+        start_time = time.perf_counter()
+        videfix.get_movie_track_languages(fixture_file_path)
+        return time.perf_counter() - start_time
+    if operation == 'get_movie_title':
+        start_time = time.perf_counter()
+        videfix.get_movie_title(fixture_file_path)
+        return time.perf_counter() - start_time
+    if operation == 'get_movie_track_languages_ffprobe':
+        start_time = time.perf_counter()
+        videfix.get_movie_track_languages(fixture_file_path, use_ffprobe=True)
+        return time.perf_counter() - start_time
+    movie_file_path = scratch_dir_path / fixture_file_path.name
+    shutil.copyfile(fixture_file_path, movie_file_path)
+    try:
+        if operation == 'create_backup':
+            start_time = time.perf_counter()
+            backup_file_path, _ = videfix.create_backup(movie_file_path)
+            duration = time.perf_counter() - start_time
+            backup_file_path.unlink()
+            return duration
+        if operation == 'modify_movie_metadata':
+            num_audio_tracks = len(videfix.get_movie_track_languages(movie_file_path))
+            reset_probe_cache()
+            modifiers = [videfix.TracksLanguageModifier([videfix.Language(language_iso=AUDIO_LANGUAGES[-1 - track_index % len(AUDIO_LANGUAGES)]) for track_index in range(num_audio_tracks)]), videfix.TitleModifier('modified by the videfix benchmark')]
+            start_time = time.perf_counter()
+            videfix.modify_movie_metadata(movie_file_path, modifiers)
+            return time.perf_counter() - start_time
+        assert False, 'unexpected operation : %s' % operation
+    finally:
+        for scratch_file_path in scratch_dir_path.iterdir():
+            scratch_file_path.unlink()
+
+
+def benchmark(fixtures, operations, fixtures_dir_path, num_repeats):
+    """
+    :param list(Fixture) fixtures:
+    :param list(str) operations:
+    :param Path fixtures_dir_path:
+    :param int num_repeats: the number of times each operation is run on each fixture
+    :rtype list(dict): one result per fixture and operation
+    """
+    scratch_dir_path = fixtures_dir_path / 'scratch'
+    scratch_dir_path.mkdir(parents=True, exist_ok=True)
+    results = []
+    for fixture in fixtures:
+        fixture_file_path = get_fixture_file_path(fixture, fixtures_dir_path)
+        file_size = fixture_file_path.stat().st_size
+        for operation in operations:
+            print('%s on %s' % (operation, fixture_file_path.name), file=sys.stderr)
+            durations = [run_operation(operation, fixture_file_path, scratch_dir_path) for _ in range(num_repeats)]
+            median_duration = statistics.median(durations)
+            results.append({
+                'operation': operation,
+                'container': fixture.container_type.name.lower(),
+                'num_audio_tracks': fixture.num_audio_tracks,
+                'tagged': fixture.is_tagged,
+                'size_name': fixture.size_name,
+                'file_size': file_size,
+                'num_repeats': num_repeats,
+                'min_seconds': min(durations),
+                'median_seconds': median_duration,
+                'max_seconds': max(durations),
+                'files_per_second': 1.0 / median_duration,
+                'megabytes_per_second': file_size / (1024 * 1024) / median_duration,
+            })
+    return results
+
+
+def get_environment():
+    """
+    :rtype dict: what the results depend on, besides the fixtures
+    """
+    src_dir_path = Path(videfix.__file__).resolve().parent
+    completed_process = subprocess.run(['git', '-C', str(src_dir_path), 'rev-parse', 'HEAD'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    commit = str(completed_process.stdout, encoding='utf-8').strip() if completed_process.returncode == 0 else None
+    completed_process = subprocess.run(['ffmpeg', '-version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    ffmpeg_version = str(completed_process.stdout, encoding='utf-8').split('\n')[0] if completed_process.returncode == 0 else None
+    return {
+        'date': datetime.datetime.now().isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'ffmpeg': ffmpeg_version,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmarks videfix on synthetic video files generated with ffmpeg')
+    parser.add_argument('--fixtures-dir', default=str(Path('~/.cache/videfix/bench_fixtures')), help="the directory where the fixtures are generated and kept (default : %(default)s)")
+    parser.add_argument('--containers', nargs='+', default=['avi', 'mp4', 'mkv'], choices=[container_type.name.lower() for container_type in videfix.MovieContainerType])
+    parser.add_argument('--audio-tracks', nargs='+', type=int, default=[1, 2, 8], help="the numbers of audio tracks of the fixtures, from 1 to 8 (default : %(default)s)")
+    parser.add_argument('--tagging', nargs='+', default=['tagged', 'untagged'], choices=['tagged', 'untagged'], help="whether the fixtures have a title and audio track languages (default : %(default)s)")
+    parser.add_argument('--sizes', nargs='+', default=['tiny', 'small'], choices=list(FIXTURE_SIZES.keys()), help="the approximate sizes of the fixtures : %s (default : %%(default)s)" % ', '.join(['%s=%d MiB' % (size_name, size // (1024 * 1024)) if size >= 1024 * 1024 else '%s=%d KiB' % (size_name, size // 1024) for size_name, size in FIXTURE_SIZES.items()]))
+    parser.add_argument('--operations', nargs='+', default=OPERATIONS, choices=OPERATIONS)
+    parser.add_argument('-n', '--repeats', type=int, default=3, help="the number of times each operation is run on each fixture (default : %(default)s)")
+    parser.add_argument('-o', '--output', help="the json file where the results are written (default : the standard output)")
+    namespace = parser.parse_args()
+    for num_audio_tracks in namespace.audio_tracks:
+        if not 1 <= num_audio_tracks <= len(AUDIO_LANGUAGES):
+            parser.error('the number of audio tracks must be between 1 and %d' % len(AUDIO_LANGUAGES))
+
+    fixtures = []
+    for size_name in namespace.sizes:
+        for container in namespace.containers:
+            for num_audio_tracks in namespace.audio_tracks:
+                for tagging in namespace.tagging:
+                    fixtures.append(Fixture(videfix.MovieContainerType[container.upper()], num_audio_tracks, tagging == 'tagged', size_name))
+    fixtures_dir_path = Path(namespace.fixtures_dir).expanduser()
+    fixtures_dir_path.mkdir(parents=True, exist_ok=True)
+    # videfix's own messages must not mix with the json results
+    with contextlib.redirect_stdout(sys.stderr):
+        results = benchmark(fixtures, namespace.operations, fixtures_dir_path, namespace.repeats)
+    report = {'environment': get_environment(), 'results': results}
+    if namespace.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(os.path.expanduser(namespace.output), 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
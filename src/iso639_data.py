@@ -0,0 +1,500 @@
+"""
+the iso 639-2 language codes
+
+generated from the iso-codes package (/usr/share/iso-codes/json/iso_639-2.json, iso-codes 4.15.0) ; each language is described by :
+- its iso 639-2/T code
+- its iso 639-2/B code, or None if it is the same as the iso 639-2/T code
+- its iso 639-1 code, or None if it has none
+- its english name (the first one, when there are several)
+
+the range qaa-qtz, reserved for local use, is not listed
+"""
+
+ISO_639_2_LANGUAGES = (
+    ('aar', None, 'aa', 'Afar'),
+    ('abk', None, 'ab', 'Abkhazian'),
+    ('ace', None, None, 'Achinese'),
+    ('ach', None, None, 'Acoli'),
+    ('ada', None, None, 'Adangme'),
+    ('ady', None, None, 'Adyghe'),
+    ('afa', None, None, 'Afro-Asiatic languages'),
+    ('afh', None, None, 'Afrihili'),
+    ('afr', None, 'af', 'Afrikaans'),
+    ('ain', None, None, 'Ainu'),
+    ('aka', None, 'ak', 'Akan'),
+    ('akk', None, None, 'Akkadian'),
+    ('ale', None, None, 'Aleut'),
+    ('alg', None, None, 'Algonquian languages'),
+    ('alt', None, None, 'Southern Altai'),
+    ('amh', None, 'am', 'Amharic'),
+    ('ang', None, None, 'English, Old (ca. 450-1100)'),
+    ('anp', None, None, 'Angika'),
+    ('apa', None, None, 'Apache languages'),
+    ('ara', None, 'ar', 'Arabic'),
+    ('arc', None, None, 'Official Aramaic (700-300 BCE)'),
+    ('arg', None, 'an', 'Aragonese'),
+    ('arn', None, None, 'Mapudungun'),
+    ('arp', None, None, 'Arapaho'),
+    ('art', None, None, 'Artificial languages'),
+    ('arw', None, None, 'Arawak'),
+    ('asm', None, 'as', 'Assamese'),
+    ('ast', None, None, 'Asturian'),
+    ('ath', None, None, 'Athapascan languages'),
+    ('aus', None, None, 'Australian languages'),
+    ('ava', None, 'av', 'Avaric'),
+    ('ave', None, 'ae', 'Avestan'),
+    ('awa', None, None, 'Awadhi'),
+    ('aym', None, 'ay', 'Aymara'),
+    ('aze', None, 'az', 'Azerbaijani'),
+    ('bad', None, None, 'Banda languages'),
+    ('bai', None, None, 'Bamileke languages'),
+    ('bak', None, 'ba', 'Bashkir'),
+    ('bal', None, None, 'Baluchi'),
+    ('bam', None, 'bm', 'Bambara'),
+    ('ban', None, None, 'Balinese'),
+    ('bas', None, None, 'Basa'),
+    ('bat', None, None, 'Baltic languages'),
+    ('bej', None, None, 'Beja'),
+    ('bel', None, 'be', 'Belarusian'),
+    ('bem', None, None, 'Bemba'),
+    ('ben', None, 'bn', 'Bengali'),
+    ('ber', None, None, 'Berber languages'),
+    ('bho', None, None, 'Bhojpuri'),
+    ('bih', None, 'bh', 'Bihari languages'),
+    ('bik', None, None, 'Bikol'),
+    ('bin', None, None, 'Bini'),
+    ('bis', None, 'bi', 'Bislama'),
+    ('bla', None, None, 'Siksika'),
+    ('bnt', None, None, 'Bantu (Other)'),
+    ('bod', 'tib', 'bo', 'Tibetan'),
+    ('bos', None, 'bs', 'Bosnian'),
+    ('bra', None, None, 'Braj'),
+    ('bre', None, 'br', 'Breton'),
+    ('btk', None, None, 'Batak languages'),
+    ('bua', None, None, 'Buriat'),
+    ('bug', None, None, 'Buginese'),
+    ('bul', None, 'bg', 'Bulgarian'),
+    ('byn', None, None, 'Blin'),
+    ('cad', None, None, 'Caddo'),
+    ('cai', None, None, 'Central American Indian languages'),
+    ('car', None, None, 'Galibi Carib'),
+    ('cat', None, 'ca', 'Catalan'),
+    ('cau', None, None, 'Caucasian languages'),
+    ('ceb', None, None, 'Cebuano'),
+    ('cel', None, None, 'Celtic languages'),
+    ('ces', 'cze', 'cs', 'Czech'),
+    ('cha', None, 'ch', 'Chamorro'),
+    ('chb', None, None, 'Chibcha'),
+    ('che', None, 'ce', 'Chechen'),
+    ('chg', None, None, 'Chagatai'),
+    ('chk', None, None, 'Chuukese'),
+    ('chm', None, None, 'Mari'),
+    ('chn', None, None, 'Chinook jargon'),
+    ('cho', None, None, 'Choctaw'),
+    ('chp', None, None, 'Chipewyan'),
+    ('chr', None, None, 'Cherokee'),
+    ('chu', None, 'cu', 'Church Slavic'),
+    ('chv', None, 'cv', 'Chuvash'),
+    ('chy', None, None, 'Cheyenne'),
+    ('cmc', None, None, 'Chamic languages'),
+    ('cnr', None, None, 'Montenegrin'),
+    ('cop', None, None, 'Coptic'),
+    ('cor', None, 'kw', 'Cornish'),
+    ('cos', None, 'co', 'Corsican'),
+    ('cpe', None, None, 'Creoles and pidgins, English based'),
+    ('cpf', None, None, 'Creoles and pidgins, French-based'),
+    ('cpp', None, None, 'Creoles and pidgins, Portuguese-based'),
+    ('cre', None, 'cr', 'Cree'),
+    ('crh', None, None, 'Crimean Tatar'),
+    ('crp', None, None, 'Creoles and pidgins'),
+    ('csb', None, None, 'Kashubian'),
+    ('cus', None, None, 'Cushitic languages'),
+    ('cym', 'wel', 'cy', 'Welsh'),
+    ('dak', None, None, 'Dakota'),
+    ('dan', None, 'da', 'Danish'),
+    ('dar', None, None, 'Dargwa'),
+    ('day', None, None, 'Land Dayak languages'),
+    ('del', None, None, 'Delaware'),
+    ('den', None, None, 'Slave (Athapascan)'),
+    ('deu', 'ger', 'de', 'German'),
+    ('dgr', None, None, 'Dogrib'),
+    ('din', None, None, 'Dinka'),
+    ('div', None, 'dv', 'Divehi'),
+    ('doi', None, None, 'Dogri'),
+    ('dra', None, None, 'Dravidian languages'),
+    ('dsb', None, None, 'Lower Sorbian'),
+    ('dua', None, None, 'Duala'),
+    ('dum', None, None, 'Dutch, Middle (ca. 1050-1350)'),
+    ('dyu', None, None, 'Dyula'),
+    ('dzo', None, 'dz', 'Dzongkha'),
+    ('efi', None, None, 'Efik'),
+    ('egy', None, None, 'Egyptian (Ancient)'),
+    ('eka', None, None, 'Ekajuk'),
+    ('ell', 'gre', 'el', 'Greek, Modern (1453-)'),
+    ('elx', None, None, 'Elamite'),
+    ('eng', None, 'en', 'English'),
+    ('enm', None, None, 'English, Middle (1100-1500)'),
+    ('epo', None, 'eo', 'Esperanto'),
+    ('est', None, 'et', 'Estonian'),
+    ('eus', 'baq', 'eu', 'Basque'),
+    ('ewe', None, 'ee', 'Ewe'),
+    ('ewo', None, None, 'Ewondo'),
+    ('fan', None, None, 'Fang'),
+    ('fao', None, 'fo', 'Faroese'),
+    ('fas', 'per', 'fa', 'Persian'),
+    ('fat', None, None, 'Fanti'),
+    ('fij', None, 'fj', 'Fijian'),
+    ('fil', None, None, 'Filipino'),
+    ('fin', None, 'fi', 'Finnish'),
+    ('fiu', None, None, 'Finno-Ugrian languages'),
+    ('fon', None, None, 'Fon'),
+    ('fra', 'fre', 'fr', 'French'),
+    ('frm', None, None, 'French, Middle (ca. 1400-1600)'),
+    ('fro', None, None, 'French, Old (842-ca. 1400)'),
+    ('frr', None, None, 'Northern Frisian'),
+    ('frs', None, None, 'Eastern Frisian'),
+    ('fry', None, 'fy', 'Western Frisian'),
+    ('ful', None, 'ff', 'Fulah'),
+    ('fur', None, None, 'Friulian'),
+    ('gaa', None, None, 'Ga'),
+    ('gay', None, None, 'Gayo'),
+    ('gba', None, None, 'Gbaya'),
+    ('gem', None, None, 'Germanic languages'),
+    ('gez', None, None, 'Geez'),
+    ('gil', None, None, 'Gilbertese'),
+    ('gla', None, 'gd', 'Gaelic'),
+    ('gle', None, 'ga', 'Irish'),
+    ('glg', None, 'gl', 'Galician'),
+    ('glv', None, 'gv', 'Manx'),
+    ('gmh', None, None, 'German, Middle High (ca. 1050-1500)'),
+    ('goh', None, None, 'German, Old High (ca. 750-1050)'),
+    ('gon', None, None, 'Gondi'),
+    ('gor', None, None, 'Gorontalo'),
+    ('got', None, None, 'Gothic'),
+    ('grb', None, None, 'Grebo'),
+    ('grc', None, None, 'Greek, Ancient (to 1453)'),
+    ('grn', None, 'gn', 'Guarani'),
+    ('gsw', None, None, 'Swiss German'),
+    ('guj', None, 'gu', 'Gujarati'),
+    ('gwi', None, None, "Gwich'in"),
+    ('hai', None, None, 'Haida'),
+    ('hat', None, 'ht', 'Haitian'),
+    ('hau', None, 'ha', 'Hausa'),
+    ('haw', None, None, 'Hawaiian'),
+    ('heb', None, 'he', 'Hebrew'),
+    ('her', None, 'hz', 'Herero'),
+    ('hil', None, None, 'Hiligaynon'),
+    ('him', None, None, 'Himachali languages'),
+    ('hin', None, 'hi', 'Hindi'),
+    ('hit', None, None, 'Hittite'),
+    ('hmn', None, None, 'Hmong'),
+    ('hmo', None, 'ho', 'Hiri Motu'),
+    ('hrv', None, 'hr', 'Croatian'),
+    ('hsb', None, None, 'Upper Sorbian'),
+    ('hun', None, 'hu', 'Hungarian'),
+    ('hup', None, None, 'Hupa'),
+    ('hye', 'arm', 'hy', 'Armenian'),
+    ('iba', None, None, 'Iban'),
+    ('ibo', None, 'ig', 'Igbo'),
+    ('ido', None, 'io', 'Ido'),
+    ('iii', None, 'ii', 'Sichuan Yi'),
+    ('ijo', None, None, 'Ijo languages'),
+    ('iku', None, 'iu', 'Inuktitut'),
+    ('ile', None, 'ie', 'Interlingue'),
+    ('ilo', None, None, 'Iloko'),
+    ('ina', None, 'ia', 'Interlingua (International Auxiliary Language Association)'),
+    ('inc', None, None, 'Indic languages'),
+    ('ind', None, 'id', 'Indonesian'),
+    ('ine', None, None, 'Indo-European languages'),
+    ('inh', None, None, 'Ingush'),
+    ('ipk', None, 'ik', 'Inupiaq'),
+    ('ira', None, None, 'Iranian languages'),
+    ('iro', None, None, 'Iroquoian languages'),
+    ('isl', 'ice', 'is', 'Icelandic'),
+    ('ita', None, 'it', 'Italian'),
+    ('jav', None, 'jv', 'Javanese'),
+    ('jbo', None, None, 'Lojban'),
+    ('jpn', None, 'ja', 'Japanese'),
+    ('jpr', None, None, 'Judeo-Persian'),
+    ('jrb', None, None, 'Judeo-Arabic'),
+    ('kaa', None, None, 'Kara-Kalpak'),
+    ('kab', None, None, 'Kabyle'),
+    ('kac', None, None, 'Kachin'),
+    ('kal', None, 'kl', 'Kalaallisut'),
+    ('kam', None, None, 'Kamba'),
+    ('kan', None, 'kn', 'Kannada'),
+    ('kar', None, None, 'Karen languages'),
+    ('kas', None, 'ks', 'Kashmiri'),
+    ('kat', 'geo', 'ka', 'Georgian'),
+    ('kau', None, 'kr', 'Kanuri'),
+    ('kaw', None, None, 'Kawi'),
+    ('kaz', None, 'kk', 'Kazakh'),
+    ('kbd', None, None, 'Kabardian'),
+    ('kha', None, None, 'Khasi'),
+    ('khi', None, None, 'Khoisan languages'),
+    ('khm', None, 'km', 'Central Khmer'),
+    ('kho', None, None, 'Khotanese'),
+    ('kik', None, 'ki', 'Kikuyu'),
+    ('kin', None, 'rw', 'Kinyarwanda'),
+    ('kir', None, 'ky', 'Kirghiz'),
+    ('kmb', None, None, 'Kimbundu'),
+    ('kok', None, None, 'Konkani'),
+    ('kom', None, 'kv', 'Komi'),
+    ('kon', None, 'kg', 'Kongo'),
+    ('kor', None, 'ko', 'Korean'),
+    ('kos', None, None, 'Kosraean'),
+    ('kpe', None, None, 'Kpelle'),
+    ('krc', None, None, 'Karachay-Balkar'),
+    ('krl', None, None, 'Karelian'),
+    ('kro', None, None, 'Kru languages'),
+    ('kru', None, None, 'Kurukh'),
+    ('kua', None, 'kj', 'Kuanyama'),
+    ('kum', None, None, 'Kumyk'),
+    ('kur', None, 'ku', 'Kurdish'),
+    ('kut', None, None, 'Kutenai'),
+    ('lad', None, None, 'Ladino'),
+    ('lah', None, None, 'Lahnda'),
+    ('lam', None, None, 'Lamba'),
+    ('lao', None, 'lo', 'Lao'),
+    ('lat', None, 'la', 'Latin'),
+    ('lav', None, 'lv', 'Latvian'),
+    ('lez', None, None, 'Lezghian'),
+    ('lim', None, 'li', 'Limburgan'),
+    ('lin', None, 'ln', 'Lingala'),
+    ('lit', None, 'lt', 'Lithuanian'),
+    ('lol', None, None, 'Mongo'),
+    ('loz', None, None, 'Lozi'),
+    ('ltz', None, 'lb', 'Luxembourgish'),
+    ('lua', None, None, 'Luba-Lulua'),
+    ('lub', None, 'lu', 'Luba-Katanga'),
+    ('lug', None, 'lg', 'Ganda'),
+    ('lui', None, None, 'Luiseno'),
+    ('lun', None, None, 'Lunda'),
+    ('luo', None, None, 'Luo (Kenya and Tanzania)'),
+    ('lus', None, None, 'Lushai'),
+    ('mad', None, None, 'Madurese'),
+    ('mag', None, None, 'Magahi'),
+    ('mah', None, 'mh', 'Marshallese'),
+    ('mai', None, None, 'Maithili'),
+    ('mak', None, None, 'Makasar'),
+    ('mal', None, 'ml', 'Malayalam'),
+    ('man', None, None, 'Mandingo'),
+    ('map', None, None, 'Austronesian languages'),
+    ('mar', None, 'mr', 'Marathi'),
+    ('mas', None, None, 'Masai'),
+    ('mdf', None, None, 'Moksha'),
+    ('mdr', None, None, 'Mandar'),
+    ('men', None, None, 'Mende'),
+    ('mga', None, None, 'Irish, Middle (900-1200)'),
+    ('mic', None, None, "Mi'kmaq"),
+    ('min', None, None, 'Minangkabau'),
+    ('mis', None, None, 'Uncoded languages'),
+    ('mkd', 'mac', 'mk', 'Macedonian'),
+    ('mkh', None, None, 'Mon-Khmer languages'),
+    ('mlg', None, 'mg', 'Malagasy'),
+    ('mlt', None, 'mt', 'Maltese'),
+    ('mnc', None, None, 'Manchu'),
+    ('mni', None, None, 'Manipuri'),
+    ('mno', None, None, 'Manobo languages'),
+    ('moh', None, None, 'Mohawk'),
+    ('mon', None, 'mn', 'Mongolian'),
+    ('mos', None, None, 'Mossi'),
+    ('mri', 'mao', 'mi', 'Maori'),
+    ('msa', 'may', 'ms', 'Malay'),
+    ('mul', None, None, 'Multiple languages'),
+    ('mun', None, None, 'Munda languages'),
+    ('mus', None, None, 'Creek'),
+    ('mwl', None, None, 'Mirandese'),
+    ('mwr', None, None, 'Marwari'),
+    ('mya', 'bur', 'my', 'Burmese'),
+    ('myn', None, None, 'Mayan languages'),
+    ('myv', None, None, 'Erzya'),
+    ('nah', None, None, 'Nahuatl languages'),
+    ('nai', None, None, 'North American Indian languages'),
+    ('nap', None, None, 'Neapolitan'),
+    ('nau', None, 'na', 'Nauru'),
+    ('nav', None, 'nv', 'Navajo'),
+    ('nbl', None, 'nr', 'Ndebele, South'),
+    ('nde', None, 'nd', 'Ndebele, North'),
+    ('ndo', None, 'ng', 'Ndonga'),
+    ('nds', None, None, 'Low German'),
+    ('nep', None, 'ne', 'Nepali'),
+    ('new', None, None, 'Nepal Bhasa'),
+    ('nia', None, None, 'Nias'),
+    ('nic', None, None, 'Niger-Kordofanian languages'),
+    ('niu', None, None, 'Niuean'),
+    ('nld', 'dut', 'nl', 'Dutch'),
+    ('nno', None, 'nn', 'Norwegian Nynorsk'),
+    ('nob', None, 'nb', 'Bokmål, Norwegian'),
+    ('nog', None, None, 'Nogai'),
+    ('non', None, None, 'Norse, Old'),
+    ('nor', None, 'no', 'Norwegian'),
+    ('nqo', None, None, "N'Ko"),
+    ('nso', None, None, 'Pedi'),
+    ('nub', None, None, 'Nubian languages'),
+    ('nwc', None, None, 'Classical Newari'),
+    ('nya', None, 'ny', 'Chichewa'),
+    ('nym', None, None, 'Nyamwezi'),
+    ('nyn', None, None, 'Nyankole'),
+    ('nyo', None, None, 'Nyoro'),
+    ('nzi', None, None, 'Nzima'),
+    ('oci', None, 'oc', 'Occitan (post 1500)'),
+    ('oji', None, 'oj', 'Ojibwa'),
+    ('ori', None, 'or', 'Oriya'),
+    ('orm', None, 'om', 'Oromo'),
+    ('osa', None, None, 'Osage'),
+    ('oss', None, 'os', 'Ossetian'),
+    ('ota', None, None, 'Turkish, Ottoman (1500-1928)'),
+    ('oto', None, None, 'Otomian languages'),
+    ('paa', None, None, 'Papuan languages'),
+    ('pag', None, None, 'Pangasinan'),
+    ('pal', None, None, 'Pahlavi'),
+    ('pam', None, None, 'Pampanga'),
+    ('pan', None, 'pa', 'Panjabi'),
+    ('pap', None, None, 'Papiamento'),
+    ('pau', None, None, 'Palauan'),
+    ('peo', None, None, 'Persian, Old (ca. 600-400 B.C.)'),
+    ('phi', None, None, 'Philippine languages'),
+    ('phn', None, None, 'Phoenician'),
+    ('pli', None, 'pi', 'Pali'),
+    ('pol', None, 'pl', 'Polish'),
+    ('pon', None, None, 'Pohnpeian'),
+    ('por', None, 'pt', 'Portuguese'),
+    ('pra', None, None, 'Prakrit languages'),
+    ('pro', None, None, 'Provençal, Old (to 1500)'),
+    ('pus', None, 'ps', 'Pushto'),
+    ('que', None, 'qu', 'Quechua'),
+    ('raj', None, None, 'Rajasthani'),
+    ('rap', None, None, 'Rapanui'),
+    ('rar', None, None, 'Rarotongan'),
+    ('roa', None, None, 'Romance languages'),
+    ('roh', None, 'rm', 'Romansh'),
+    ('rom', None, None, 'Romany'),
+    ('ron', 'rum', 'ro', 'Romanian'),
+    ('run', None, 'rn', 'Rundi'),
+    ('rup', None, None, 'Aromanian'),
+    ('rus', None, 'ru', 'Russian'),
+    ('sad', None, None, 'Sandawe'),
+    ('sag', None, 'sg', 'Sango'),
+    ('sah', None, None, 'Yakut'),
+    ('sai', None, None, 'South American Indian (Other)'),
+    ('sal', None, None, 'Salishan languages'),
+    ('sam', None, None, 'Samaritan Aramaic'),
+    ('san', None, 'sa', 'Sanskrit'),
+    ('sas', None, None, 'Sasak'),
+    ('sat', None, None, 'Santali'),
+    ('scn', None, None, 'Sicilian'),
+    ('sco', None, None, 'Scots'),
+    ('sel', None, None, 'Selkup'),
+    ('sem', None, None, 'Semitic languages'),
+    ('sga', None, None, 'Irish, Old (to 900)'),
+    ('sgn', None, None, 'Sign Languages'),
+    ('shn', None, None, 'Shan'),
+    ('sid', None, None, 'Sidamo'),
+    ('sin', None, 'si', 'Sinhala'),
+    ('sio', None, None, 'Siouan languages'),
+    ('sit', None, None, 'Sino-Tibetan languages'),
+    ('sla', None, None, 'Slavic languages'),
+    ('slk', 'slo', 'sk', 'Slovak'),
+    ('slv', None, 'sl', 'Slovenian'),
+    ('sma', None, None, 'Southern Sami'),
+    ('sme', None, 'se', 'Northern Sami'),
+    ('smi', None, None, 'Sami languages'),
+    ('smj', None, None, 'Lule Sami'),
+    ('smn', None, None, 'Inari Sami'),
+    ('smo', None, 'sm', 'Samoan'),
+    ('sms', None, None, 'Skolt Sami'),
+    ('sna', None, 'sn', 'Shona'),
+    ('snd', None, 'sd', 'Sindhi'),
+    ('snk', None, None, 'Soninke'),
+    ('sog', None, None, 'Sogdian'),
+    ('som', None, 'so', 'Somali'),
+    ('son', None, None, 'Songhai languages'),
+    ('sot', None, 'st', 'Sotho, Southern'),
+    ('spa', None, 'es', 'Spanish'),
+    ('sqi', 'alb', 'sq', 'Albanian'),
+    ('srd', None, 'sc', 'Sardinian'),
+    ('srn', None, None, 'Sranan Tongo'),
+    ('srp', None, 'sr', 'Serbian'),
+    ('srr', None, None, 'Serer'),
+    ('ssa', None, None, 'Nilo-Saharan languages'),
+    ('ssw', None, 'ss', 'Swati'),
+    ('suk', None, None, 'Sukuma'),
+    ('sun', None, 'su', 'Sundanese'),
+    ('sus', None, None, 'Susu'),
+    ('sux', None, None, 'Sumerian'),
+    ('swa', None, 'sw', 'Swahili'),
+    ('swe', None, 'sv', 'Swedish'),
+    ('syc', None, None, 'Classical Syriac'),
+    ('syr', None, None, 'Syriac'),
+    ('tah', None, 'ty', 'Tahitian'),
+    ('tai', None, None, 'Tai languages'),
+    ('tam', None, 'ta', 'Tamil'),
+    ('tat', None, 'tt', 'Tatar'),
+    ('tel', None, 'te', 'Telugu'),
+    ('tem', None, None, 'Timne'),
+    ('ter', None, None, 'Tereno'),
+    ('tet', None, None, 'Tetum'),
+    ('tgk', None, 'tg', 'Tajik'),
+    ('tgl', None, 'tl', 'Tagalog'),
+    ('tha', None, 'th', 'Thai'),
+    ('tig', None, None, 'Tigre'),
+    ('tir', None, 'ti', 'Tigrinya'),
+    ('tiv', None, None, 'Tiv'),
+    ('tkl', None, None, 'Tokelau'),
+    ('tlh', None, None, 'Klingon'),
+    ('tli', None, None, 'Tlingit'),
+    ('tmh', None, None, 'Tamashek'),
+    ('tog', None, None, 'Tonga (Nyasa)'),
+    ('ton', None, 'to', 'Tonga (Tonga Islands)'),
+    ('tpi', None, None, 'Tok Pisin'),
+    ('tsi', None, None, 'Tsimshian'),
+    ('tsn', None, 'tn', 'Tswana'),
+    ('tso', None, 'ts', 'Tsonga'),
+    ('tuk', None, 'tk', 'Turkmen'),
+    ('tum', None, None, 'Tumbuka'),
+    ('tup', None, None, 'Tupi languages'),
+    ('tur', None, 'tr', 'Turkish'),
+    ('tut', None, None, 'Altaic languages'),
+    ('tvl', None, None, 'Tuvalu'),
+    ('twi', None, 'tw', 'Twi'),
+    ('tyv', None, None, 'Tuvinian'),
+    ('udm', None, None, 'Udmurt'),
+    ('uga', None, None, 'Ugaritic'),
+    ('uig', None, 'ug', 'Uighur'),
+    ('ukr', None, 'uk', 'Ukrainian'),
+    ('umb', None, None, 'Umbundu'),
+    ('und', None, None, 'Undetermined'),
+    ('urd', None, 'ur', 'Urdu'),
+    ('uzb', None, 'uz', 'Uzbek'),
+    ('vai', None, None, 'Vai'),
+    ('ven', None, 've', 'Venda'),
+    ('vie', None, 'vi', 'Vietnamese'),
+    ('vol', None, 'vo', 'Volapük'),
+    ('vot', None, None, 'Votic'),
+    ('wak', None, None, 'Wakashan languages'),
+    ('wal', None, None, 'Walamo'),
+    ('war', None, None, 'Waray'),
+    ('was', None, None, 'Washo'),
+    ('wen', None, None, 'Sorbian languages'),
+    ('wln', None, 'wa', 'Walloon'),
+    ('wol', None, 'wo', 'Wolof'),
+    ('xal', None, None, 'Kalmyk'),
+    ('xho', None, 'xh', 'Xhosa'),
+    ('yao', None, None, 'Yao'),
+    ('yap', None, None, 'Yapese'),
+    ('yid', None, 'yi', 'Yiddish'),
+    ('yor', None, 'yo', 'Yoruba'),
+    ('ypk', None, None, 'Yupik languages'),
+    ('zap', None, None, 'Zapotec'),
+    ('zbl', None, None, 'Blissymbols'),
+    ('zen', None, None, 'Zenaga'),
+    ('zgh', None, None, 'Standard Moroccan Tamazight'),
+    ('zha', None, 'za', 'Zhuang'),
+    ('zho', 'chi', 'zh', 'Chinese'),
+    ('znd', None, None, 'Zande languages'),
+    ('zul', None, 'zu', 'Zulu'),
+    ('zun', None, None, 'Zuni'),
+    ('zxx', None, None, 'No linguistic content'),
+    ('zza', None, None, 'Zaza'),
+)
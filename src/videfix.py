@@ -1,15 +1,30 @@
 #!/usr/bin/env python3
 # # utf-8
 import sys
+import os
 import abc
 import subprocess
 import re
+import json
+import struct
+import array
+import unicodedata
+import zlib
+import mmap
+import contextlib
+import shutil
+import fcntl
+import threading
+import collections
+import concurrent.futures
 from enum import Enum, auto
 import argparse
 from pathlib import Path
 import datetime
-import configparser
-import readline
+# readline, sqlite3, csv and asyncio are imported where they're used, so that importing videfix as a library stays cheap
+import signal
+import select
+import time
 
 RED   = "\033[1;31m"  
 BLUE  = "\033[1;34m"
@@ -19,69 +34,120 @@ RESET = "\033[0;0m"
 BOLD    = "\033[;1m"
 REVERSE = "\033[;7m"
 
-class LanguageId(Enum):
-    UNKNOWN = auto()
-    ENGLISH = auto()
-    FRENCH = auto()
-    JAPANESE = auto()
-    KOREAN = auto()
-    SPANISH = auto()
-
 class LanguageDef:
 
-    def __init__(self, language_id, language_name, language_iso):
+    def __init__(self, language_iso, language_name, language_iso_b=None, language_iso_1=None):
         """
-        :param LanguageId language_id:
-        :param str language_name:
-        :param str language_iso: iso 639-2/T
+        :param str language_iso: iso 639-2/T, which also identifies the language
+        :param str language_name: the short english name written in the riff IAS<n> tags of avi files (eg 'Modern Greek' for 'Greek, Modern (1453-)')
+        :param str or None language_iso_b: iso 639-2/B, if it differs from iso 639-2/T
+        :param str or None language_iso_1: iso 639-1, if the language has one
         """
-        self.language_id = language_id
-        self.language_name = language_name
         self.language_iso = language_iso
+        self.language_name = language_name
+        self.language_iso_b = language_iso_b
+        self.language_iso_1 = language_iso_1
 
 class LanguageDefs:
+    """
+    the iso 639-2 languages, loaded from iso639_data on first use and indexed by their codes and names
+    """
+
+    # the names that videfix has always written in the riff IAS<n> tags of avi files, kept so that these files are still read the same way
+    PREFERRED_LANGUAGE_NAMES = {
+        'und': 'Unknown',
+        'fra': 'Francais',
+        'spa': 'Espanol',
+        'tog': 'Nyasa Tonga',  # Tonga is the short name of Tonga (Tonga Islands)
+    }
 
     def __init__(self):
-        self.language_defs = {}
-        self.register_language_def(LanguageDef(LanguageId.UNKNOWN, 'Unknown', 'und'))
-        self.register_language_def(LanguageDef(LanguageId.ENGLISH, 'English', 'eng'))
-        self.register_language_def(LanguageDef(LanguageId.FRENCH, 'Francais', 'fra'))
-        self.register_language_def(LanguageDef(LanguageId.JAPANESE, 'Japanese', 'jpn'))
-        self.register_language_def(LanguageDef(LanguageId.KOREAN, 'Korean', 'kor'))
-        self.register_language_def(LanguageDef(LanguageId.SPANISH, 'Espanol', 'spa'))
-    
-    def register_language_def(self, language_def):
+        self.language_defs = None  # language_iso -> LanguageDef
+        self.language_isos_b = None  # iso 639-2/B -> language_iso
+        self.language_isos_1 = None  # iso 639-1 -> language_iso
+        self.language_names = None  # lowercase name -> language_iso
+        self.load_lock = threading.Lock()
+
+    def _load(self):
+        with self.load_lock:
+            if self.language_defs is not None:
+                return
+            import iso639_data
+            language_defs = {}
+            language_isos_b = {}
+            language_isos_1 = {}
+            language_names = {}
+            for language_iso, language_iso_b, language_iso_1, iso_name in iso639_data.ISO_639_2_LANGUAGES:
+                language_name = LanguageDefs.PREFERRED_LANGUAGE_NAMES.get(language_iso, LanguageDefs._get_short_name(iso_name))
+                language_defs[language_iso] = LanguageDef(language_iso, language_name, language_iso_b, language_iso_1)
+                if language_iso_b is not None:
+                    language_isos_b[language_iso_b] = language_iso
+                if language_iso_1 is not None:
+                    language_isos_1[language_iso_1] = language_iso
+                # both the official name and the preferred name are understood
+                language_names.setdefault(iso_name.lower(), language_iso)
+                language_names.setdefault(language_name.lower(), language_iso)
+            self.language_isos_b = language_isos_b
+            self.language_isos_1 = language_isos_1
+            self.language_names = language_names
+            self.language_defs = language_defs
+
+    @staticmethod
+    def _get_short_name(iso_name):
         """
-        :param LanguageDef language_def:
+        :param str iso_name: the english name of a language in iso 639-2 (eg 'Greek, Modern (1453-)')
+        :rtype str: the name without its comments in parentheses, and with its qualifier put first (eg 'Modern Greek'), as the names of riff IAS<n> tags are short names
         """
-        self.language_defs[language_def.language_id] = language_def
+        language_name = re.sub(r'\s*\([^)]*\)', '', iso_name).split(';')[0].strip()
+        if ', ' in language_name:
+            base_name, qualifier = language_name.split(', ', 1)
+            language_name = '%s %s' % (qualifier, base_name)
+        return language_name
+
+    def _get_language_defs(self):
+        if self.language_defs is None:
+            self._load()
+        return self.language_defs
 
     def language_iso_to_id(self, language_iso):
-        for language_def in self.language_defs.values():
-            if language_def.language_iso == language_iso:
-                return language_def.language_id
+        if language_iso in self._get_language_defs():
+            return language_iso
+        return None
 
     def language_name_to_id(self, language_name):
-        for language_def in self.language_defs.values():
-            if language_def.language_name == language_name:
-                return language_def.language_id
+        self._get_language_defs()
+        return self.language_names.get(language_name.lower())
+
+    def find_language_iso(self, iso_or_pseudo_iso):
+        """
+        :param str iso_or_pseudo_iso: an iso 639-2/T, iso 639-2/B or iso 639-1 code
+        :rtype str, str: the iso 639-2/T code and the norm of iso_or_pseudo_iso, or None, None if iso_or_pseudo_iso is not a known language code
+        """
+        language_defs = self._get_language_defs()
+        if iso_or_pseudo_iso in language_defs:
+            return iso_or_pseudo_iso, 'iso 639-2/T'
+        if iso_or_pseudo_iso in self.language_isos_b:
+            return self.language_isos_b[iso_or_pseudo_iso], 'iso 639-2/B'
+        if iso_or_pseudo_iso in self.language_isos_1:
+            return self.language_isos_1[iso_or_pseudo_iso], 'iso 639-1'
+        return None, None
 
     def language_id_to_iso(self, language_id):
-        return self.language_defs[language_id].language_iso
+        return self._get_language_defs()[language_id].language_iso
 
     def language_id_to_name(self, language_id):
-        return self.language_defs[language_id].language_name
+        return self._get_language_defs()[language_id].language_name
 
     def isos(self):
-        return [language_def.language_iso for language_def in self.language_defs.values()]
+        return list(self._get_language_defs().keys())
 
     def names(self):
-        return [language_def.language_name for language_def in self.language_defs.values()]
+        return [language_def.language_name for language_def in self._get_language_defs().values()]
 
 LANGUAGE_DEFS = LanguageDefs()
 
 class Language:
-    # we use iso 639-2/T codes https://en.wikipedia.org/wiki/List_of_ISO_639-1_codes
+    # we use iso 639-2/T codes https://en.wikipedia.org/wiki/List_of_ISO_639-1_codes, which also serve as language ids
 
     def __init__(self, language_id=None, language_name=None, language_iso=None):
         global LANGUAGE_DEFS
@@ -91,9 +157,11 @@ class Language:
         if language_name is not None:
             assert language_id is None and language_iso is None
             self.language_id = LANGUAGE_DEFS.language_name_to_id(language_name)
+            assert self.language_id is not None, 'unexpected language name : %s' % language_name
         if language_iso is not None:
             assert language_id is None and language_name is None
             self.language_id = LANGUAGE_DEFS.language_iso_to_id(language_iso)
+            assert self.language_id is not None, 'unexpected language iso : %s' % language_iso
 
     def __str__(self):
         global LANGUAGE_DEFS
@@ -124,24 +192,529 @@ class Language:
         return LANGUAGE_DEFS.isos()
 
 
-def execute_command(command):
+class CommandOutputTooLarge(subprocess.SubprocessError):
+
+    def __init__(self, command, max_output_size):
+        """
+        :param list(str) command:
+        :param int max_output_size: in bytes
+        """
+        self.command = command
+        self.max_output_size = max_output_size
+
+    def __str__(self):
+        return "the output of command '%s' exceeds %d bytes" % (' '.join([str(argument) for argument in self.command]), self.max_output_size)
+
+
+class CommandRunner:
+    """
+    runs the commands (ffprobe, ffmpeg, rsync) of all the threads of videfix on an asyncio event loop running in a background thread
+
+    the number of processes running at the same time is limited, each command can have a timeout, and the processes are terminated when their command is cancelled or times out (or when videfix is interrupted, see cancel_all). Each process runs in its own session so that a Ctrl-C in the terminal reaches videfix only, which terminates the processes cleanly.
+    """
+
+    def __init__(self, max_processes=None, max_stdout_size=256 * 1024 * 1024, max_stderr_size=64 * 1024):
+        """
+        :param int or None max_processes: the maximum number of processes running at the same time ; by default, 4 times the number of cpus, as most commands wait for the storage
+        :param int max_stdout_size: the maximum size of the standard output of a command, in bytes ; above it, the command fails
+        :param int max_stderr_size: the maximum size of the standard error of a command that is kept, in bytes ; above it, only its end is kept
+        """
+        self.max_processes = max_processes if max_processes is not None else 4 * (os.cpu_count() or 1)
+        self.max_stdout_size = max_stdout_size
+        self.max_stderr_size = max_stderr_size
+        self.timeouts = {}  # program name (eg 'ffprobe') -> the default timeout of its commands, in seconds
+        self.termination_delay = 5.0  # the time given to a process to exit after SIGTERM, before it's killed, in seconds
+        self._reset()
+        # a forked process (eg a worker of apply-manifest) inherits the event loop but not its thread
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self.loop = None
+        self.semaphore = None
+        self.start_lock = threading.Lock()
+        self.pending_futures = set()
+
+    def _start(self):
+        import asyncio
+        with self.start_lock:
+            if self.loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def run_loop():
+                asyncio.set_event_loop(loop)
+                self.semaphore = asyncio.Semaphore(self.max_processes)
+                loop.call_soon(started.set)
+                loop.run_forever()
+
+            threading.Thread(target=run_loop, name='videfix-command-runner', daemon=True).start()
+            started.wait()
+            self.loop = loop
+
+    def execute_command(self, command, timeout=None, stdout_line_callback=None):
+        """
+        runs a command and waits for its completion, from any thread
+
+        :param list(str) command:
+        :param float or None timeout: in seconds ; by default, the timeout of the program of the command, if any (see timeouts)
+        :param callable or None stdout_line_callback: if not None, called (from the thread of the event loop) with each line of the standard output as soon as it's read, in which case the standard output is not kept
+        :rtype subprocess.CompletedProcess, resource.struct_rusage, float: the completed process, its resource usage and its wall time in seconds
+        """
+        import asyncio
+        self._start()
+        if timeout is None:
+            timeout = self.timeouts.get(os.path.basename(str(command[0])))
+        finished = threading.Event()
+        future = asyncio.run_coroutine_threadsafe(self._execute_command(command, timeout, finished, stdout_line_callback), self.loop)
+        with self.start_lock:
+            self.pending_futures.add(future)
+        try:
+            return future.result()
+        except BaseException:
+            # eg KeyboardInterrupt : the process must not outlive its command
+            future.cancel()
+            finished.wait(self.termination_delay * 2)
+            raise
+        finally:
+            with self.start_lock:
+                self.pending_futures.discard(future)
+
+    def cancel_all(self):
+        """
+        cancels all the running commands, which terminates their processes
+        """
+        with self.start_lock:
+            pending_futures = list(self.pending_futures)
+        for future in pending_futures:
+            future.cancel()
+
+    async def _execute_command(self, command, timeout, finished, stdout_line_callback):
+        import asyncio
+        try:
+            async with self.semaphore:
+                start_time = time.perf_counter()
+                process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+                if stdout_line_callback is not None:
+                    stdout_task = asyncio.ensure_future(self._read_output_lines(process.stdout, stdout_line_callback))
+                else:
+                    stdout_task = asyncio.ensure_future(self._read_output(process.stdout, self.max_stdout_size, command))
+                stderr_task = asyncio.ensure_future(self._read_output(process.stderr, self.max_stderr_size, None))
+                try:
+                    stdout, stderr = await asyncio.wait_for(asyncio.gather(stdout_task, stderr_task), timeout)
+                    resource_usage, wait_status = await self._wait_process(process.pid)
+                except BaseException as e:
+                    stdout_task.cancel()
+                    stderr_task.cancel()
+                    resource_usage, wait_status = await self._terminate_process(process)
+                    if isinstance(e, asyncio.TimeoutError):
+                        raise subprocess.TimeoutExpired(command, timeout)
+                    raise
+                finally:
+                    process.stdout.close()
+                    process.stderr.close()
+                # the process is reaped here, so that subprocess doesn't try to reap it again
+                process.returncode = _wait_status_to_returncode(wait_status)
+                return subprocess.CompletedProcess(command, process.returncode, stdout, stderr), resource_usage, time.perf_counter() - start_time
+        finally:
+            finished.set()
+
+    async def _read_output(self, pipe, max_output_size, command):
+        """
+        :param file pipe:
+        :param int max_output_size:
+        :param list(str) or None command: if not None, the output must not exceed max_output_size ; if None, only its last max_output_size bytes are kept
+        :rtype bytes:
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        stream_reader = asyncio.StreamReader()
+        transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(stream_reader), os.fdopen(os.dup(pipe.fileno()), 'rb'))
+        try:
+            output = bytearray()
+            while True:
+                data = await stream_reader.read(64 * 1024)
+                if len(data) == 0:
+                    return bytes(output)
+                output += data
+                if len(output) > max_output_size:
+                    if command is not None:
+                        raise CommandOutputTooLarge(command, max_output_size)
+                    del output[:len(output) - max_output_size]
+        finally:
+            transport.close()
+
+    async def _read_output_lines(self, pipe, line_callback):
+        """
+        :param file pipe:
+        :param callable line_callback: called with each line (as bytes, without its end of line)
+        :rtype bytes: an empty output, as the lines are not kept
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        stream_reader = asyncio.StreamReader(limit=self.max_stderr_size)
+        transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(stream_reader), os.fdopen(os.dup(pipe.fileno()), 'rb'))
+        try:
+            while True:
+                try:
+                    line = await stream_reader.readline()
+                except ValueError:
+                    # a line longer than the limit : it's skipped
+                    continue
+                if len(line) == 0:
+                    return b''
+                line_callback(line.rstrip(b'\r\n'))
+        finally:
+            transport.close()
+
+    async def _wait_process(self, pid):
+        """
+        reaps a process once it exits, with wait4 to get its own resource usage
+
+        :param int pid:
+        :rtype resource.struct_rusage, int: the resource usage and the wait status of the process
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        try:
+            pid_fd = os.pidfd_open(pid)
+        except (AttributeError, OSError):
+            # no pidfd (before linux 5.3) : a thread waits for the process
+            _, wait_status, resource_usage = await loop.run_in_executor(None, os.wait4, pid, 0)
+            return resource_usage, wait_status
+        try:
+            exited = loop.create_future()
+            loop.add_reader(pid_fd, lambda: exited.done() or exited.set_result(None))
+            try:
+                await exited
+            finally:
+                loop.remove_reader(pid_fd)
+            _, wait_status, resource_usage = os.wait4(pid, 0)
+            return resource_usage, wait_status
+        finally:
+            os.close(pid_fd)
+
+    async def _terminate_process(self, process):
+        """
+        terminates a process and its children, with SIGTERM then SIGKILL if it doesn't exit in time
+
+        :param subprocess.Popen process:
+        :rtype resource.struct_rusage, int: the resource usage and the wait status of the process
+        """
+        import asyncio
+        wait_task = asyncio.ensure_future(self._wait_process(process.pid))
+        for signal_number in [signal.SIGTERM, signal.SIGKILL]:
+            try:
+                os.killpg(process.pid, signal_number)
+            except ProcessLookupError:
+                pass
+            done_tasks, _ = await asyncio.wait([wait_task], timeout=self.termination_delay)
+            if len(done_tasks) != 0:
+                break
+        resource_usage, wait_status = await wait_task
+        process.returncode = _wait_status_to_returncode(wait_status)
+        return resource_usage, wait_status
+
+
+def _wait_status_to_returncode(wait_status):
+    """
+    :param int wait_status: as returned by os.wait4
+    :rtype int: the return code of the process, as in subprocess (negative signal number if it was killed by a signal)
+    """
+    # os.waitstatus_to_exitcode only exists since python 3.9
+    if os.WIFSIGNALED(wait_status):
+        return -os.WTERMSIG(wait_status)
+    return os.WEXITSTATUS(wait_status)
+
+
+COMMAND_RUNNER = CommandRunner()
+
+
+def execute_command(command, timeout=None, stdout_line_callback=None):
     """
     :param list(str) command:
-    :rtype int,str,str: 
+    :param float or None timeout: in seconds ; by default, the timeout of the program of the command (see CommandRunner.timeouts)
+    :param callable or None stdout_line_callback: if not None, called with each line of the standard output as soon as it's read, instead of keeping the standard output (see CommandRunner.execute_command)
+    :rtype subprocess.CompletedProcess:
     """
+    global COMMAND_RUNNER
     # print('"'+'" "'.join([str(e) for e in command])+'"')
-    completed_process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    completed_process, resource_usage, wall_time = COMMAND_RUNNER.execute_command(command, timeout, stdout_line_callback)
+    record_process_stats(wall_time, resource_usage)
     #print(completed_process.stdout)
     #print(type(completed_process.stdout))
     return completed_process
 
+
+class StageStats:
+    """
+    the resources used by a stage of the processing of a movie file
+    """
+
+    def __init__(self):
+        self.wall_time = 0.0  # in seconds
+        self.cpu_time = 0.0  # in seconds, used by videfix's thread
+        self.child_cpu_time = 0.0  # in seconds, used by the processes spawned by videfix (ffprobe, ffmpeg, rsync)
+        self.num_read_bytes = 0  # read from the storage, by videfix's thread and its processes
+        self.num_written_bytes = 0  # written to the storage, by videfix's thread and its processes
+        self.num_processes = 0
+
+    def to_dict(self):
+        return {
+            'wall_time': self.wall_time,
+            'cpu_time': self.cpu_time,
+            'child_cpu_time': self.child_cpu_time,
+            'read_bytes': self.num_read_bytes,
+            'written_bytes': self.num_written_bytes,
+            'processes': self.num_processes,
+        }
+
+
+class MovieStats:
+    """
+    the resources used by the processing of a movie file, stage by stage
+    """
+
+    def __init__(self, movie_file_path):
+        """
+        :param Path movie_file_path:
+        """
+        self.movie_file_path = movie_file_path
+        self.stages = collections.OrderedDict()  # stage name -> StageStats
+        self.num_rewritten_bytes = 0  # the bytes of the movie file that had to be written to modify it
+
+    def get_stage_stats(self, stage_name):
+        """
+        :param str stage_name:
+        :rtype StageStats:
+        """
+        if stage_name not in self.stages:
+            self.stages[stage_name] = StageStats()
+        return self.stages[stage_name]
+
+    def to_dict(self):
+        return {
+            'movie_file_path': str(self.movie_file_path),
+            'stages': dict([(stage_name, stage_stats.to_dict()) for stage_name, stage_stats in self.stages.items()]),
+            'rewritten_bytes': self.num_rewritten_bytes,
+        }
+
+
+def _read_thread_io_bytes():
+    """
+    :rtype int, int: the number of bytes read from and written to the storage by the current thread so far (0, 0 if the kernel doesn't account them)
+    """
+    try:
+        with open('/proc/thread-self/io', 'rb') as f:
+            io_counters = dict([line.split(b': ') for line in f.read().splitlines()])
+        return int(io_counters[b'read_bytes']), int(io_counters[b'write_bytes'])
+    except (OSError, KeyError, ValueError):
+        return 0, 0
+
+
+# the MovieStats and the stage being measured by the current thread, if any
+_STATS_THREAD_CONTEXT = threading.local()
+
+
+@contextlib.contextmanager
+def measure_stage(stage_name):
+    """
+    measures the resources used by a stage of the processing of the movie file measured by the current thread (see StatsCollector.measure_movie) ; does nothing when no movie file is being measured
+
+    :param str stage_name:
+    """
+    movie_stats = getattr(_STATS_THREAD_CONTEXT, 'movie_stats', None)
+    if movie_stats is None:
+        yield
+        return
+    stage_stats = movie_stats.get_stage_stats(stage_name)
+    outer_stage_stats = getattr(_STATS_THREAD_CONTEXT, 'stage_stats', None)
+    _STATS_THREAD_CONTEXT.stage_stats = stage_stats
+    start_time = time.perf_counter()
+    start_cpu_time = time.thread_time()
+    start_read_bytes, start_written_bytes = _read_thread_io_bytes()
+    try:
+        yield
+    finally:
+        num_read_bytes, num_written_bytes = _read_thread_io_bytes()
+        stage_stats.num_read_bytes += num_read_bytes - start_read_bytes
+        stage_stats.num_written_bytes += num_written_bytes - start_written_bytes
+        stage_stats.cpu_time += time.thread_time() - start_cpu_time
+        stage_stats.wall_time += time.perf_counter() - start_time
+        _STATS_THREAD_CONTEXT.stage_stats = outer_stage_stats
+
+
+def record_process_stats(wall_time, resource_usage):
+    """
+    adds the resources used by a process spawned by the current thread to the stage being measured, if any
+
+    :param float wall_time: in seconds
+    :param resource.struct_rusage resource_usage: the resource usage of the process, as returned by os.wait4
+    """
+    stage_stats = getattr(_STATS_THREAD_CONTEXT, 'stage_stats', None)
+    if stage_stats is None:
+        return
+    stage_stats.num_processes += 1
+    stage_stats.child_cpu_time += resource_usage.ru_utime + resource_usage.ru_stime
+    # ru_inblock and ru_oublock are counted in 512 bytes blocks
+    stage_stats.num_read_bytes += resource_usage.ru_inblock * 512
+    stage_stats.num_written_bytes += resource_usage.ru_oublock * 512
+
+
+def _percentile(values, fraction):
+    """
+    :param list(float) values:
+    :param float fraction: between 0 and 1
+    :rtype float: the nearest-rank percentile of values
+    """
+    sorted_values = sorted(values)
+    return sorted_values[max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))]
+
+
+class StatsCollector:
+    """
+    collects the resources used by the processing of each movie file, writes them as json lines, and aggregates them
+    """
+
+    def __init__(self, stats_file):
+        """
+        :param file stats_file: the text file where a json line is written for each processed movie file, then a json line with the aggregated stats
+        """
+        self.stats_file = stats_file
+        self.start_time = time.perf_counter()
+        self.movie_stats = {}  # movie_file_path -> MovieStats, for the movie files being processed
+        self.finished_movie_stats = []
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def measure_movie(self, movie_file_path):
+        """
+        makes the stages measured by the current thread count for movie_file_path ; the processing of a movie file can span several threads (eg the prompts and the modification)
+
+        :param Path movie_file_path:
+        :rtype MovieStats:
+        """
+        with self.lock:
+            if movie_file_path not in self.movie_stats:
+                self.movie_stats[movie_file_path] = MovieStats(movie_file_path)
+            movie_stats = self.movie_stats[movie_file_path]
+        outer_movie_stats = getattr(_STATS_THREAD_CONTEXT, 'movie_stats', None)
+        _STATS_THREAD_CONTEXT.movie_stats = movie_stats
+        try:
+            yield movie_stats
+        finally:
+            _STATS_THREAD_CONTEXT.movie_stats = outer_movie_stats
+
+    def finish_movie(self, movie_file_path):
+        """
+        writes the stats of a movie file whose processing is over
+
+        :param Path movie_file_path:
+        """
+        with self.lock:
+            movie_stats = self.movie_stats.pop(movie_file_path, None)
+            if movie_stats is None:
+                return
+            self.finished_movie_stats.append(movie_stats)
+            self.stats_file.write(json.dumps(movie_stats.to_dict()) + '\n')
+            self.stats_file.flush()
+
+    def aggregate(self):
+        """
+        :rtype dict: the p50 and p95 of the resources used by each stage, and the totals
+        """
+        stages = collections.OrderedDict()
+        for movie_stats in self.finished_movie_stats:
+            for stage_name, stage_stats in movie_stats.stages.items():
+                stages.setdefault(stage_name, []).append(stage_stats.to_dict())
+        aggregated_stages = {}
+        for stage_name, stage_stats_dicts in stages.items():
+            aggregated_stage = {'count': len(stage_stats_dicts)}
+            for stat_name in stage_stats_dicts[0].keys():
+                values = [stage_stats_dict[stat_name] for stage_stats_dict in stage_stats_dicts]
+                aggregated_stage[stat_name + '_p50'] = _percentile(values, 0.5)
+                aggregated_stage[stat_name + '_p95'] = _percentile(values, 0.95)
+                aggregated_stage[stat_name + '_total'] = sum(values)
+            aggregated_stages[stage_name] = aggregated_stage
+        return {
+            'movie_files': len(self.finished_movie_stats),
+            'wall_time': time.perf_counter() - self.start_time,
+            'stages': aggregated_stages,
+            'rewritten_bytes': sum([movie_stats.num_rewritten_bytes for movie_stats in self.finished_movie_stats]),
+        }
+
+    def close(self):
+        """
+        writes the stats of the unfinished movie files, then the aggregated stats
+        """
+        for movie_file_path in list(self.movie_stats.keys()):
+            self.finish_movie(movie_file_path)
+        self.stats_file.write(json.dumps({'aggregate': self.aggregate()}) + '\n')
+        self.stats_file.flush()
+        if self.stats_file not in [sys.stdout, sys.stderr]:
+            self.stats_file.close()
+
+
+def measure_movie(stats_collector, movie_file_path):
+    """
+    :param StatsCollector or None stats_collector:
+    :param Path movie_file_path:
+    :rtype context manager: StatsCollector.measure_movie, or a context manager that does nothing if stats_collector is None
+    """
+    if stats_collector is None:
+        return contextlib.nullcontext()
+    return stats_collector.measure_movie(movie_file_path)
+
+
+def open_stats_collector(stats_file_path):
+    """
+    :param str or None stats_file_path: the file where the stats are written, '-' for the standard error, or None for no stats
+    :rtype StatsCollector or None:
+    """
+    if stats_file_path is None:
+        return None
+    if stats_file_path == '-':
+        return StatsCollector(sys.stderr)
+    return StatsCollector(open(os.path.expanduser(stats_file_path), 'w', encoding='utf-8'))
+
+def parallel_map_ordered(function, items, jobs):
+    """
+    applies function to each item using a pool of worker threads, and yields the results in the order of the items
+
+    a failure on an item doesn't stop the processing of the other items : its exception is yielded instead of its result. At most 2 * jobs items are taken ahead of the item being yielded, so items can be a lazy iterable.
+
+    :param callable function:
+    :param iterable items:
+    :param int jobs: the number of worker threads
+    :rtype generator((item, result, Exception or None)):
+    """
+    assert jobs >= 1
+    if jobs == 1:
+        for item in items:
+            try:
+                yield item, function(item), None
+            except Exception as e:
+                yield item, None, e
+        return
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending = collections.deque()
+        for item in items:
+            pending.append((item, executor.submit(function, item)))
+            if len(pending) >= 2 * jobs:
+                yield _pop_future_result(pending)
+        while len(pending) != 0:
+            yield _pop_future_result(pending)
+
+def _pop_future_result(pending):
+    item, future = pending.popleft()
+    try:
+        return item, future.result(), None
+    except Exception as e:
+        return item, None, e
+
 def check_language_iso(iso_or_pseudo_iso):
-    language_iso = iso_or_pseudo_iso
-    norm = 'iso 639-2/T'
-    if iso_or_pseudo_iso == 'fre':
-        language_iso = 'fra'
-        norm = 'iso 639-2/B'
-    assert language_iso in Language.isos(), 'unexpected language iso : %s' % language_iso
+    language_iso, norm = LANGUAGE_DEFS.find_language_iso(iso_or_pseudo_iso)
+    assert language_iso is not None, 'unexpected language iso : %s' % iso_or_pseudo_iso
     # https://medium.com/av-transcode/how-to-add-multiple-audio-tracks-to-a-single-video-using-ffmpeg-open-source-tool-27bff8cca30 :
     #   FFmpeg expects the language can be specified as an ISO 639–2/T or ISO 639–2/B (3 letters) code. ISO 639 is a set of international standards that lists shortcodes for language names.
     allowed_norms = ['iso 639-2/T', 'iso 639-2/B']  # not sure which norms are actually allowed
@@ -153,13 +726,225 @@ def check_language_name(name_or_pseudo_name):
     language_name = name_or_pseudo_name
     #if language_name == 'Francais':
     #    language_name = 'French'
-    assert language_name in Language.names(), 'unexpected language name : %s' % language_name
+    assert LANGUAGE_DEFS.language_name_to_id(language_name) is not None, 'unexpected language name : %s' % language_name
     if name_or_pseudo_name != language_name:
         print(RED, 'warning : %s is not an expected language name; replaced with %s' % (name_or_pseudo_name, language_name), RESET)
     return language_name
 
 
-def _find_audio_tracks_defs(ffprobe_stderr):
+class MovieStream:
+
+    def __init__(self, stream_index, codec_type, codec_name, tags, duration=None, num_frames=None, is_attached_picture=False):
+        """
+        :param int stream_index: the index of the stream in the movie file (as in ffmpeg's stream specifier 0:<stream_index>)
+        :param str codec_type: 'video', 'audio', 'subtitle', etc.
+        :param str codec_name:
+        :param dict(str, str) tags:
+        :param float or None duration: the duration of the stream in seconds, if the container tells it
+        :param int or None num_frames: the number of frames of the stream, if the container tells it
+        :param bool is_attached_picture: True if the stream is a still picture (eg a cover art) rather than a video
+        """
+        self.stream_index = stream_index
+        self.codec_type = codec_type
+        self.codec_name = codec_name
+        self.tags = tags
+        self.duration = duration
+        self.num_frames = num_frames
+        self.is_attached_picture = is_attached_picture
+
+    def get_tag(self, tag_name, default=None):
+        return _get_tag(self.tags, tag_name, default)
+
+
+class MovieProbe:
+    """
+    the information that ffprobe gives about a movie file revision, in a compact form
+    """
+
+    def __init__(self, movie_file_path, format_name, duration, tags, streams, is_complete=True):
+        """
+        :param Path movie_file_path:
+        :param str format_name: the container format as named by ffprobe (eg 'avi', 'matroska,webm')
+        :param float or None duration: the duration of the movie in seconds, if known
+        :param dict(str, str) tags: the container level tags (title, IAS<n> riff tags, etc.)
+        :param list(MovieStream) streams:
+        :param bool is_complete: False if the probe was read from the headers of the movie file by videfix itself, in which case it only contains the title and the audio streams
+        """
+        self.movie_file_path = movie_file_path
+        self.format_name = format_name
+        self.duration = duration
+        self.tags = tags
+        self.streams = streams
+        self.is_complete = is_complete
+
+    @classmethod
+    def from_ffprobe_json(cls, movie_file_path, ffprobe_stdout):
+        """
+        :param Path movie_file_path:
+        :param bytes ffprobe_stdout: the output of ffprobe -print_format json -show_format -show_streams
+        :rtype MovieProbe:
+        """
+        try:
+            ffprobe_output = json.loads(str(ffprobe_stdout, encoding='utf-8'))
+        except UnicodeDecodeError as e:  # pylint: disable=unused-variable
+            ffprobe_output = json.loads(str(ffprobe_stdout, encoding='latin_1'))
+        format_def = ffprobe_output.get('format', {})
+        duration = format_def.get('duration')
+        if duration is not None:
+            duration = float(duration)
+        streams = []
+        for stream_def in ffprobe_output.get('streams', []):
+            stream_duration = stream_def.get('duration')
+            if stream_duration is not None:
+                stream_duration = float(stream_duration)
+            num_frames = stream_def.get('nb_frames')
+            if num_frames is not None:
+                num_frames = int(num_frames)
+            is_attached_picture = stream_def.get('disposition', {}).get('attached_pic', 0) == 1
+            streams.append(MovieStream(int(stream_def['index']), stream_def.get('codec_type', ''), stream_def.get('codec_name', ''), stream_def.get('tags', {}), stream_duration, num_frames, is_attached_picture))
+        streams.sort(key=lambda stream: stream.stream_index)
+        return cls(movie_file_path, format_def.get('format_name', ''), duration, format_def.get('tags', {}), streams)
+
+    def get_tag(self, tag_name, default=None):
+        return _get_tag(self.tags, tag_name, default)
+
+    @property
+    def title(self):
+        return self.get_tag('title', '')
+
+    @property
+    def audio_streams(self):
+        return [stream for stream in self.streams if stream.codec_type == 'audio']
+
+
+def _get_tag(tags, tag_name, default=None):
+    """
+    looks up a tag the way ffprobe displays them : depending on the container, the same tag can be named 'title' or 'TITLE'
+    """
+    if tag_name in tags:
+        return tags[tag_name]
+    tag_name = tag_name.lower()
+    for key, value in tags.items():
+        if key.lower() == tag_name:
+            return value
+    return default
+
+
+def _run_ffprobe(movie_file_path):
+    """
+    :param Path movie_file_path:
+    :rtype MovieProbe:
+    """
+    completed_process = execute_command(['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', movie_file_path.expanduser()])
+    assert completed_process.returncode == 0, completed_process.stderr
+    return MovieProbe.from_ffprobe_json(movie_file_path, completed_process.stdout)
+
+
+class MovieProbeCache:
+    """
+    remembers the probe of the last seen revision of each movie file, so that a movie file is only probed once as long as it's not modified
+    """
+
+    def __init__(self, max_num_probes=None):
+        """
+        :param int or None max_num_probes: the maximum number of probes kept, after which the least recently used ones are forgotten (eg in a long lived program) ; by default, all the probes are kept
+        """
+        self.probes = collections.OrderedDict()  # movie file path -> (size, mtime, MovieProbe), the least recently used first
+        self.max_num_probes = max_num_probes
+        self.lock = threading.Lock()
+
+    def get_probe(self, movie_file_path, use_ffprobe=False):
+        """
+        :param Path movie_file_path:
+        :param bool use_ffprobe: if True, the movie file is probed by ffprobe, otherwise its headers are first read by videfix itself, which is much faster
+        :rtype MovieProbe:
+        """
+        assert isinstance(movie_file_path, Path)
+        file_path = movie_file_path.expanduser()
+        file_stat = file_path.stat()
+        revision = (file_stat.st_size, file_stat.st_mtime_ns)
+        with self.lock:
+            cached = self.probes.get(str(file_path))
+            if cached is not None:
+                self.probes.move_to_end(str(file_path))
+        if cached is not None and cached[0:2] == revision and (cached[2].is_complete or not use_ffprobe):
+            return cached[2]
+        movie_probe = None
+        if not use_ffprobe:
+            movie_probe = read_movie_headers(movie_file_path)
+        if movie_probe is None:
+            movie_probe = _run_ffprobe(movie_file_path)
+        with self.lock:
+            self.probes[str(file_path)] = (revision[0], revision[1], movie_probe)
+            self.probes.move_to_end(str(file_path))
+            if self.max_num_probes is not None:
+                while len(self.probes) > self.max_num_probes:
+                    self.probes.popitem(last=False)
+        return movie_probe
+
+    def invalidate(self, movie_file_path):
+        """
+        forgets the probe of the given movie file (to be called when the file is modified, as the mtime resolution of some filesystems is too coarse to detect a modification)
+
+        :param Path movie_file_path:
+        """
+        with self.lock:
+            self.probes.pop(str(movie_file_path.expanduser()), None)
+
+
+MOVIE_PROBE_CACHE = MovieProbeCache()
+
+
+def probe_movie(movie_file_path, use_ffprobe=False):
+    """
+    :param Path movie_file_path:
+    :param bool use_ffprobe: if True, the movie file is probed by ffprobe, even if its headers can be read by videfix itself
+    :rtype MovieProbe:
+    """
+    global MOVIE_PROBE_CACHE
+    return MOVIE_PROBE_CACHE.get_probe(movie_file_path, use_ffprobe)
+
+
+def prefetch_movie_probes(movie_file_paths, lookahead=4):
+    """
+    yields the given movie files while the next ones are probed on background threads, so that the probe of each movie file is in MOVIE_PROBE_CACHE by the time it's yielded (eg while the user answers the prompts about the previous movie files)
+
+    the failures of the probes are ignored here : they happen again when the probes are used, where they're reported.
+
+    :param iterable(Path) movie_file_paths:
+    :param int lookahead: the number of movie files probed ahead of the one being processed ; 0 to disable the prefetching
+    :rtype generator(Path):
+    """
+    if lookahead == 0:
+        yield from movie_file_paths
+        return
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=lookahead, thread_name_prefix='videfix-prefetch')
+    pending = collections.deque()
+    try:
+        for movie_file_path in movie_file_paths:
+            pending.append((movie_file_path, executor.submit(probe_movie, movie_file_path)))
+            if len(pending) > lookahead:
+                yield _pop_prefetched_movie_file_path(pending)
+        while len(pending) != 0:
+            yield _pop_prefetched_movie_file_path(pending)
+    finally:
+        # the probes that haven't started yet are not needed anymore (shutdown's cancel_futures requires python 3.9)
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def _pop_prefetched_movie_file_path(pending):
+    movie_file_path, future = pending.popleft()
+    # waiting for the probe that is running is quicker than probing again
+    concurrent.futures.wait([future])
+    return movie_file_path
+
+
+def _find_audio_tracks_defs(movie_probe):
+    """
+    :param MovieProbe movie_probe:
+    """
     # avi movie files can't store audio track language information in the audiostreams themselves. Instead, these information is stored as riff tags in the header of the file.
     # search for audiotrack language information from header (in IAS<n> riff tags)
     # https://exiftool.org/TagNames/RIFF.html
@@ -167,70 +952,48 @@ def _find_audio_tracks_defs(ffprobe_stderr):
     stream_language_defs = {}
     header_language_defs = {}
 
-    for line in ffprobe_stderr.split(b'\n'):
-        # print('stderr' + line)
-        # match = re.match('^\s*IAS1\s+:\s*[a-zA-Z]+\s+$', line)
-        try:
-            line_as_str = str(line, encoding='utf-8')
-        except UnicodeDecodeError as e:  # pylint: disable=unused-variable
-            line_as_str = str(line, encoding='latin_1')
+    for tag_name, tag_value in movie_probe.tags.items():
         #     IAS1            : English
         #     IAS1            : Japanese
         #     IAS1            : Francais
-        match = re.match(r'^\s*IAS([0-9]+)\s+:\s*([a-zA-Z]+)\s*$', line_as_str)
+        match = re.match(r'^IAS([0-9]+)$', tag_name)
         if match:
             audio_stream_def = {}
             track_index = int(match.groups()[0]) - 1
             assert track_index >= 0
             audio_stream_def['audio_track_id'] = track_index
-            language_name = check_language_name(match.groups()[1])
+            language_name = check_language_name(tag_value.strip())
             language_iso = Language(language_name=language_name).iso
             audio_stream_def['language_iso'] = language_iso
-            audio_stream_def['from_header'] = 'IAS%s:%s' % (match.groups()[0], match.groups()[1])
-            # if match.groups()[1] not in ['und']:
-            #    print(match.groups()[1])
+            audio_stream_def['from_header'] = 'IAS%s:%s' % (match.groups()[0], tag_value)
             header_language_defs[track_index] = audio_stream_def
 
-        # for avi files :
-        # Stream #0:1: Audio: mp3 (U[0][0][0] / 0x0055), 48000 Hz, stereo, s16p, 138 kb/s
-
-        # for mp4 files :
-        # Stream #0:0(und): Video: mpeg4 (mp4v / 0x7634706D), yuv420p, 576x432 [SAR 1:1 DAR 4:3], 1002 kb/s, 23.98 fps, 23.98 tbr, 24k tbn, 2 tbc (default)
-        # Metadata:
-        #   handler_name    : VideoHandler
-        # Stream #0:1(jpn): Audio: mp3 (mp4a / 0x6134706D), 44100 Hz, mono, s16p, 96 kb/s (default)
-        # Metadata:
-        #   handler_name    : SoundHandler
+    # for avi files, the audio streams have no language tag
+    # for mp4 and mkv files, the language of each audio stream is stored in the stream itself, as a 3 letters code
+    for stream in movie_probe.audio_streams:
+        audio_stream_def = {}
+        audio_stream_def['majorid'] = '0'
+        audio_stream_def['minorid'] = '%d' % stream.stream_index
+        stream_id = '%s:%s' % (audio_stream_def['majorid'], audio_stream_def['minorid'])
+        audio_stream_def['stream_id'] = stream_id
 
-        # print(line_as_str)
-        match = re.match(r'^\s*Stream #([0-9]+):([0-9]+)([^\:]*): Audio:\s', line_as_str)
-        if match:
-            audio_stream_def = {}
-            audio_stream_def['majorid'] = match.groups()[0]
-            audio_stream_def['minorid'] = match.groups()[1]
-            stream_id = '%s:%s' % (audio_stream_def['majorid'], audio_stream_def['minorid'])
-            audio_stream_def['stream_id'] = stream_id
-
-            language_substring = match.groups()[2]  # it is expected to look loke "(jpn)"
-            if language_substring != '':
-                # the language of the audio stream is defined
-                match = re.match(r'^\(([a-z]+)\)$', language_substring)
-                assert match, "unexpected case : '%s' is expected to be of the form '(<language-iso-639-code>)' " % language_substring
-                
-                audio_stream_def['language_iso'] = check_language_iso(match.groups()[0])
-                audio_stream_def['from_stream'] = '%s' % match.groups()[0]
-            else:
-                audio_stream_def['language_iso'] = ''
-                audio_stream_def['from_stream'] = ''
-            stream_language_defs[stream_id] = audio_stream_def
+        stream_language = stream.get_tag('language', '')
+        if stream_language != '':
+            # the language of the audio stream is defined
+            assert re.match(r'^[a-z]+$', stream_language), "unexpected case : '%s' is expected to be an iso-639 code" % stream_language
+            audio_stream_def['language_iso'] = check_language_iso(stream_language)
+            audio_stream_def['from_stream'] = '%s' % stream_language
+        else:
+            audio_stream_def['language_iso'] = ''
+            audio_stream_def['from_stream'] = ''
+        stream_language_defs[stream_id] = audio_stream_def
 
     # print(header_language_defs)
     # print(stream_language_defs)
     assert len(header_language_defs) <= len(stream_language_defs), "the number of audio streams found in the header (%d) don't match the actual number of audio streams (%d)" % (len(header_language_defs), len(stream_language_defs))
 
-    # sorted_track_ids = sorted([ audio_stream_def['stream_id'] for audio_stream_def in stream_language_defs.values() ])
-    sorted_track_ids = sorted(stream_language_defs.keys())
-    # print(sorted_track_ids)
+    # the audio streams are sorted by stream index
+    sorted_track_ids = list(stream_language_defs.keys())
 
     for audio_stream_def in header_language_defs.values():
         assert audio_stream_def['audio_track_id'] < len(stream_language_defs), "audio_stream_def %s 's references a non-existing stream index (%d)" % (str(audio_stream_def), audio_stream_def['audio_track_id'])
@@ -252,38 +1015,25 @@ def _find_audio_tracks_defs(ffprobe_stderr):
 
 
 
-def get_movie_title(movie_file_path):
+def get_movie_title(movie_file_path, use_ffprobe=False):
     """
     :param Path movie_file_path:
+    :param bool use_ffprobe: if True, the title is read by ffprobe, even if videfix is able to read it from the headers of the movie file
     :rtype str:
     """
     assert isinstance(movie_file_path, Path)
-    title = ''
-    completed_process = execute_command(['ffprobe', movie_file_path.expanduser()])
-    assert completed_process.returncode == 0, completed_process.stderr
-    ffprobe_stderr = completed_process.stderr
-    for line in ffprobe_stderr.split(b'\n'):
-        try:
-            line_as_str = str(line, encoding='utf-8')
-        except UnicodeDecodeError as e:  # pylint: disable=unused-variable
-            line_as_str = str(line, encoding='latin_1')
-        match = re.match(r'^\s*title\s+: (.+)$', line_as_str)
-        if match:
-            title = match.groups()[0]
-    return title
+    return probe_movie(movie_file_path, use_ffprobe).title
 
-def get_movie_track_languages(movie_file_path):
+def get_movie_track_languages(movie_file_path, use_ffprobe=False):
     """
     :param Path movie_file_path:
+    :param bool use_ffprobe: if True, the languages are read by ffprobe, even if videfix is able to read them from the headers of the movie file
     :rtype list(Language):
     """
     assert isinstance(movie_file_path, Path)
     # print(movie_file_path)
     languages = []
-    completed_process = execute_command(['ffprobe', movie_file_path.expanduser(), '-show_entries', 'stream_tags=language'])
-    assert completed_process.returncode == 0, completed_process.stderr
-    ffprobe_stderr = completed_process.stderr
-    header_language_defs = _find_audio_tracks_defs(ffprobe_stderr)
+    header_language_defs = _find_audio_tracks_defs(probe_movie(movie_file_path, use_ffprobe))
     for audio_stream_def in header_language_defs.values():
         # print(audio_stream_def)
         languages.append(Language(language_iso=audio_stream_def['language_iso']))
@@ -297,52 +1047,551 @@ class MovieContainerType(Enum):
     MKV = auto()
 
 
+MOVIE_FILE_SUFFIXES = {
+    '.avi': MovieContainerType.AVI,
+    '.mp4': MovieContainerType.MP4,
+    '.mkv': MovieContainerType.MKV,
+}
+
+
 def get_movie_container_type(movie_file_path):
     suffix = movie_file_path.suffix
-    if suffix in ['.avi']:
-        return MovieContainerType.AVI
-    if suffix in ['.mp4']:
-        return MovieContainerType.MP4
-    if suffix in ['.mkv']:
-        return MovieContainerType.MKV
-    assert False, 'unexpected suffix : %s' % suffix
-    
+    container_type = MOVIE_FILE_SUFFIXES.get(suffix.lower())
+    assert container_type is not None, 'unexpected suffix : %s' % suffix
+    return container_type
+
+
+BACKUP_FILE_STEM_RE = re.compile(r'\.asof_[0-9]{4}_[0-9]{2}_[0-9]{2}_[0-9]{2}_[0-9]{2}_[0-9]{2}(_[0-9]+)?$')
+
 
-def create_backup(file_path):
+def is_backup_file_path(file_path):
     """
     :param Path file_path:
+    :rtype bool: True if file_path is a backup created by videfix (see create_backup)
     """
-    assert isinstance(file_path, Path)
-    now_date = datetime.datetime.now()
-    backup_file_path = file_path.with_name(file_path.stem + '.asof_' + now_date.strftime("%Y_%m_%d_%H_%M_%S")  + file_path.suffix)
-    # backup_file_path = Path('/tmp/' + file_path.stem + '.asof_' + now_date.strftime("%Y_%m_%d_%H_%M_%S")  + file_path.suffix)
-    # print(backup_file_path)
-    completed_process = execute_command(['rsync', '-va', str(file_path.expanduser()), str(backup_file_path.expanduser())])
-    assert completed_process.returncode == 0, completed_process.stderr
+    return BACKUP_FILE_STEM_RE.search(file_path.stem) is not None
 
-    return backup_file_path
 
-# def read_movie_metadata(src_movie_file_path):
-#     """
-#     :param Path movie_file_path:
-#     :rtype config:
-#     """
-#     ini_file_path = Path('/tmp/ffmetadata.ini')
-#     command = []
-#     command.append('ffmpeg')
-#     command.append('-i')
-#     command.append(src_movie_file_path.expanduser())
-#     command.append('-f')
-#     command.append('ffmetadata')
-#     command.append(ini_file_path.expanduser())
-#     completed_process = execute_command(command)
-#     assert completed_process.returncode == 0, completed_process.stderr
+TEMPORARY_FILE_STEM_RE = re.compile(r'^\..*\.videfix_tmp$')
 
-#     config = configparser.ConfigParser()
-#     config.read(ini_file_path.expanduser())
-#     return config
 
-class BackupMode(Enum):
+def get_temporary_file_path(file_path):
+    """
+    :param Path file_path:
+    :rtype Path: a hidden file next to file_path, with the same suffix so that ffmpeg writes it in the same container, which can replace file_path with an atomic rename
+    """
+    return file_path.with_name('.' + file_path.stem + '.videfix_tmp' + file_path.suffix)
+
+
+def copy_file_attributes(src_file_path, dst_file_path):
+    """
+    gives dst_file_path the permissions, owner and extended attributes of src_file_path, so that it can replace it
+
+    :param Path src_file_path:
+    :param Path dst_file_path:
+    """
+    src_stat = src_file_path.expanduser().stat()
+    shutil.copymode(src_file_path.expanduser(), dst_file_path.expanduser())
+    try:
+        os.chown(dst_file_path.expanduser(), src_stat.st_uid, src_stat.st_gid)
+    except PermissionError:
+        # only root can give away a file : the group is still kept when the user belongs to it
+        try:
+            os.chown(dst_file_path.expanduser(), -1, src_stat.st_gid)
+        except PermissionError:
+            pass
+    try:
+        xattr_names = os.listxattr(src_file_path.expanduser())
+    except OSError:
+        # the filesystem doesn't support extended attributes
+        xattr_names = []
+    for xattr_name in xattr_names:
+        try:
+            os.setxattr(dst_file_path.expanduser(), xattr_name, os.getxattr(src_file_path.expanduser(), xattr_name))
+        except OSError:
+            # eg the security.* attributes that only root can set
+            pass
+    # the permissions are copied again, as chown clears the setuid and setgid bits
+    shutil.copymode(src_file_path.expanduser(), dst_file_path.expanduser())
+
+
+def is_temporary_file_path(file_path):
+    """
+    :param Path file_path:
+    :rtype bool: True if file_path is a temporary file created by videfix (see get_temporary_file_path)
+    """
+    return TEMPORARY_FILE_STEM_RE.search(file_path.stem) is not None
+
+
+def find_movie_files(root_dir_path, changed_since=None):
+    """
+    yields the movie files found in root_dir_path and its subdirectories, as soon as they are found
+
+    the backups and temporary files created by videfix are skipped, and so are the symbolic links to directories, to avoid loops
+
+    :param Path root_dir_path:
+    :param datetime.datetime or None changed_since: if not None, only the movie files modified after this date are yielded
+    :rtype generator(Path):
+    """
+    min_mtime = None
+    if changed_since is not None:
+        min_mtime = changed_since.timestamp()
+    dir_paths = [str(root_dir_path.expanduser())]
+    while len(dir_paths) != 0:
+        dir_path = dir_paths.pop()
+        try:
+            with os.scandir(dir_path) as dir_entries:
+                # sorted for a reproducible order ; only the entries of a single directory are held in memory
+                dir_entries = sorted(dir_entries, key=lambda dir_entry: dir_entry.name)
+        except OSError as e:
+            print(RED, "failed to scan %s : %s" % (dir_path, e), RESET)
+            continue
+        sub_dir_paths = []
+        for dir_entry in dir_entries:
+            if dir_entry.is_dir(follow_symlinks=False):
+                sub_dir_paths.append(dir_entry.path)
+                continue
+            if os.path.splitext(dir_entry.name)[1].lower() not in MOVIE_FILE_SUFFIXES or not dir_entry.is_file():
+                continue
+            movie_file_path = Path(dir_entry.path)
+            if is_backup_file_path(movie_file_path) or is_temporary_file_path(movie_file_path):
+                continue
+            if min_mtime is not None and dir_entry.stat().st_mtime <= min_mtime:
+                continue
+            yield movie_file_path
+        # the stack is popped from its end, so the subdirectories are pushed in reverse order to be visited in alphabetical order
+        dir_paths.extend(reversed(sub_dir_paths))
+
+
+def iter_movie_file_paths(movie_file_paths, recursive_dir_paths, changed_since=None):
+    """
+    yields the movie files given explicitly, then those found in the given directories
+
+    :param list(str) movie_file_paths: the movie files given explicitly
+    :param list(str) recursive_dir_paths: the directories in which movie files are searched recursively
+    :param datetime.datetime or None changed_since: if not None, only the movie files modified after this date are searched
+    :rtype generator(Path):
+    """
+    for movie_file_path in movie_file_paths:
+        yield Path(movie_file_path)
+    for recursive_dir_path in recursive_dir_paths:
+        yield from find_movie_files(Path(recursive_dir_path), changed_since)
+
+
+class MovieInfo:
+    """
+    the metadata of a movie file revision that videfix cares about
+    """
+
+    def __init__(self, movie_file_path, container_type, title, audio_track_languages):
+        """
+        :param Path movie_file_path:
+        :param MovieContainerType container_type:
+        :param str title:
+        :param list(Language) audio_track_languages:
+        """
+        self.movie_file_path = movie_file_path
+        self.container_type = container_type
+        self.title = title
+        self.audio_track_languages = audio_track_languages
+
+
+DEFAULT_LIBRARY_INDEX_FILE_PATH = Path('~/.cache/videfix/library_index.sqlite')
+
+
+class LibraryIndex:
+    """
+    an on-disk index of the metadata of the movie files that have already been probed
+
+    a movie file revision is identified by its (device, inode, size, mtime), so that only new or modified movie files need to be probed again
+    """
+
+    def __init__(self, index_file_path=DEFAULT_LIBRARY_INDEX_FILE_PATH):
+        """
+        :param Path index_file_path:
+        """
+        self.index_file_path = index_file_path.expanduser()
+        import sqlite3
+        self.index_file_path.parent.mkdir(parents=True, exist_ok=True)
+        # the index can be used from the worker threads of parallel_map_ordered, so accesses to the connection are serialized
+        self.connection = sqlite3.connect(str(self.index_file_path), check_same_thread=False)
+        self.lock = threading.Lock()
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('PRAGMA foreign_keys=ON')
+        with self.connection:
+            self.connection.execute("""CREATE TABLE IF NOT EXISTS movies (
+                movie_id INTEGER PRIMARY KEY,
+                device INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                container_type TEXT NOT NULL,
+                title TEXT NOT NULL,
+                UNIQUE (device, inode, size, mtime_ns))""")
+            self.connection.execute('CREATE INDEX IF NOT EXISTS movies_path ON movies (path)')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS movies_title ON movies (title)')
+            self.connection.execute("""CREATE TABLE IF NOT EXISTS audio_tracks (
+                movie_id INTEGER NOT NULL REFERENCES movies (movie_id) ON DELETE CASCADE,
+                track_index INTEGER NOT NULL,
+                language_iso TEXT NOT NULL,
+                PRIMARY KEY (movie_id, track_index))""")
+            self.connection.execute('CREATE INDEX IF NOT EXISTS audio_tracks_language_iso ON audio_tracks (language_iso)')
+
+    def close(self):
+        self.connection.close()
+
+    @staticmethod
+    def _get_file_key(movie_file_path):
+        file_stat = movie_file_path.expanduser().stat()
+        return (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+
+    def get_movie_info(self, movie_file_path):
+        """
+        :param Path movie_file_path:
+        :rtype MovieInfo or None: None if the current revision of this movie file is not in the index
+        """
+        file_key = self._get_file_key(movie_file_path)
+        with self.lock:
+            row = self.connection.execute('SELECT movie_id, container_type, title FROM movies WHERE device=? AND inode=? AND size=? AND mtime_ns=?', file_key).fetchone()
+            if row is None:
+                return None
+            movie_id, container_type, title = row
+            return MovieInfo(movie_file_path, MovieContainerType[container_type], title, self._get_audio_track_languages(movie_id))
+
+    def _get_audio_track_languages(self, movie_id):
+        rows = self.connection.execute('SELECT language_iso FROM audio_tracks WHERE movie_id=? ORDER BY track_index', (movie_id,))
+        return [Language(language_iso=language_iso) for (language_iso,) in rows]
+
+    def update_movie_info(self, movie_info):
+        """
+        :param MovieInfo movie_info: the metadata of the current revision of movie_info.movie_file_path
+        """
+        file_key = self._get_file_key(movie_info.movie_file_path)
+        path = os.path.abspath(movie_info.movie_file_path.expanduser())
+        with self.lock, self.connection:
+            # forget the previous revisions of this movie file
+            self.connection.execute('DELETE FROM movies WHERE path=? OR (device=? AND inode=? AND size=? AND mtime_ns=?)', (path,) + file_key)
+            cursor = self.connection.execute('INSERT INTO movies (device, inode, size, mtime_ns, path, container_type, title) VALUES (?, ?, ?, ?, ?, ?, ?)', file_key + (path, movie_info.container_type.name, movie_info.title))
+            movie_id = cursor.lastrowid
+            self.connection.executemany('INSERT INTO audio_tracks (movie_id, track_index, language_iso) VALUES (?, ?, ?)', [(movie_id, track_index, language.iso) for track_index, language in enumerate(movie_info.audio_track_languages)])
+
+    def query(self, audio_language_iso=None, empty_title=False, title_pattern=None, container_type=None):
+        """
+        finds the indexed movie files matching all the given criteria
+
+        :param str or None audio_language_iso: only the movie files which have at least one audio track in this language
+        :param bool empty_title: only the movie files which have no title
+        :param str or None title_pattern: only the movie files whose title matches this sql LIKE pattern
+        :param MovieContainerType or None container_type: only the movie files of this container type
+        :rtype generator(MovieInfo):
+        """
+        conditions = []
+        parameters = []
+        if audio_language_iso is not None:
+            conditions.append('movie_id IN (SELECT movie_id FROM audio_tracks WHERE language_iso=?)')
+            parameters.append(audio_language_iso)
+        if empty_title:
+            conditions.append("title=''")
+        if title_pattern is not None:
+            conditions.append('title LIKE ?')
+            parameters.append(title_pattern)
+        if container_type is not None:
+            conditions.append('container_type=?')
+            parameters.append(container_type.name)
+        sql = 'SELECT movie_id, path, container_type, title FROM movies'
+        if len(conditions) != 0:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY path'
+        with self.lock:
+            rows = self.connection.execute(sql, parameters).fetchall()
+        for movie_id, path, container_type_name, title in rows:
+            with self.lock:
+                audio_track_languages = self._get_audio_track_languages(movie_id)
+            yield MovieInfo(Path(path), MovieContainerType[container_type_name], title, audio_track_languages)
+
+
+def get_movie_info(movie_file_path, library_index=None):
+    """
+    :param Path movie_file_path:
+    :param LibraryIndex or None library_index: if not None, the movie file is only probed if its current revision is not already in this index
+    :rtype MovieInfo:
+    """
+    if library_index is not None:
+        movie_info = library_index.get_movie_info(movie_file_path)
+        if movie_info is not None:
+            return movie_info
+    movie_info = MovieInfo(movie_file_path, get_movie_container_type(movie_file_path), get_movie_title(movie_file_path), get_movie_track_languages(movie_file_path))
+    if library_index is not None:
+        library_index.update_movie_info(movie_info)
+    return movie_info
+
+
+DEFAULT_DEVICE_LOCK_DIR_PATH = Path('~/.cache/videfix/device_locks')
+
+
+class DeviceSlot:
+    """
+    the right to rewrite a whole file on a storage device, given by DeviceScheduler.rewrite_slot
+    """
+
+    def __init__(self, device):
+        """
+        :param int or None device: the st_dev of the device, or None if the rewrites are not limited
+        """
+        self.device = device
+        self.num_written_bytes = 0  # set by the holder of the slot, for the rate limit of the device
+
+
+class DeviceScheduler:
+    """
+    limits the rewrites of whole movie files (remuxes, backup copies) running at the same time on each storage device, and optionally their throughput
+
+    several rewrites on the same spinning disk or network share make it seek back and forth, which collapses its throughput, while rewrites on different devices don't compete with each other. The devices are identified by their st_dev, and their slots are lock files, so that the limits hold across the threads and the worker processes of videfix (eg the workers of apply-manifest).
+    """
+
+    def __init__(self, max_rewrites_per_device=None, max_rate=None, lock_dir_path=DEFAULT_DEVICE_LOCK_DIR_PATH, clock=time.time, sleep=time.sleep):
+        """
+        :param int or None max_rewrites_per_device: the maximum number of rewrites running at the same time on each device ; None for no limit
+        :param float or None max_rate: the maximum average number of bytes written per second by the rewrites on each device ; None for no limit
+        :param Path lock_dir_path: the directory of the lock files of the device slots
+        :param callable clock: returns the current time in seconds since the epoch, as the available times of the devices are shared by the processes
+        :param callable sleep: waits for the given number of seconds
+        """
+        self.max_rewrites_per_device = max_rewrites_per_device
+        self.max_rate = max_rate
+        self.lock_dir_path = lock_dir_path
+        self.clock = clock
+        self.sleep = sleep
+        self.poll_interval = 0.1  # the time between two attempts to get a slot of a busy device, in seconds
+
+    @contextlib.contextmanager
+    def rewrite_slot(self, file_path):
+        """
+        waits until the device of a file can take one more rewrite, and holds a slot of this device during the rewrite
+
+        :param Path file_path: an existing file (or directory) on the device that is rewritten
+        :rtype DeviceSlot: the holder sets its num_written_bytes, which delays the next rewrites on the device if they exceed max_rate
+        """
+        if self.max_rewrites_per_device is None and self.max_rate is None:
+            yield DeviceSlot(None)
+            return
+        device = os.stat(file_path.expanduser()).st_dev
+        self.lock_dir_path.expanduser().mkdir(parents=True, exist_ok=True)
+        slot_fd = None
+        if self.max_rewrites_per_device is not None:
+            slot_fd = self._acquire_slot(device)
+        try:
+            if self.max_rate is not None:
+                # the rewrites of the device that wrote more than max_rate allows delay this one
+                self.sleep(max(0.0, self._update_available_time(device, lambda available_time: available_time) - self.clock()))
+            device_slot = DeviceSlot(device)
+            start_time = self.clock()
+            yield device_slot
+            if self.max_rate is not None and device_slot.num_written_bytes != 0:
+                self._update_available_time(device, lambda available_time: max(available_time, start_time) + device_slot.num_written_bytes / self.max_rate)
+        finally:
+            if slot_fd is not None:
+                # closing the lock file releases its lock
+                os.close(slot_fd)
+
+    def _acquire_slot(self, device):
+        """
+        :param int device:
+        :rtype int: the file descriptor of the locked lock file of a free slot of the device
+        """
+        slot_fds = [os.open(self.lock_dir_path.expanduser() / ('%x.%d.lock' % (device, slot_index)), os.O_RDWR | os.O_CREAT, 0o644) for slot_index in range(self.max_rewrites_per_device)]
+        acquired_slot_fd = None
+        try:
+            while acquired_slot_fd is None:
+                for slot_fd in slot_fds:
+                    try:
+                        fcntl.flock(slot_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        continue
+                    acquired_slot_fd = slot_fd
+                    break
+                else:
+                    self.sleep(self.poll_interval)
+        finally:
+            for slot_fd in slot_fds:
+                if slot_fd != acquired_slot_fd:
+                    os.close(slot_fd)
+        return acquired_slot_fd
+
+    def _update_available_time(self, device, update):
+        """
+        updates the time from which the device is available for new rewrites, shared by all the processes through a state file
+
+        :param int device:
+        :param callable update: computes the new available time (in seconds since the epoch) from the current one
+        :rtype float: the new available time
+        """
+        state_fd = os.open(self.lock_dir_path.expanduser() / ('%x.rate' % device), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(state_fd, fcntl.LOCK_EX)
+            state = os.pread(state_fd, 8, 0)
+            available_time = update(struct.unpack('=d', state)[0] if len(state) == 8 else 0.0)
+            os.pwrite(state_fd, struct.pack('=d', available_time), 0)
+            return available_time
+        finally:
+            os.close(state_fd)
+
+
+DEVICE_SCHEDULER = DeviceScheduler()
+
+
+class IBackupStrategy(abc.ABC):
+    """
+    a way of creating the backup of a movie file
+    """
+
+    # the name under which the use of this strategy is recorded
+    name = None
+
+    # True if the backup shares its data with the original file, in which case the original file must be replaced by a new file instead of being modified in place
+    shares_original_file = False
+
+    # True if the backup is a copy of the data of the original file, which costs as much as writing the whole file
+    copies_data = False
+
+    @abc.abstractmethod
+    def create_backup(self, file_path, backup_file_path):
+        """
+        :param Path file_path:
+        :param Path backup_file_path:
+        :rtype bool: False if this strategy is not available for this file (eg because the filesystem doesn't support it)
+        """
+        pass
+
+
+class ReflinkBackupStrategy(IBackupStrategy):
+    """
+    creates the backup as a copy-on-write clone of the original file (on btrfs, xfs, etc.), which is instant and takes no extra space
+    """
+
+    name = 'reflink'
+
+    # the FICLONE ioctl request from linux/fs.h
+    FICLONE = 0x40049409
+
+    def create_backup(self, file_path, backup_file_path):
+        with open(file_path.expanduser(), 'rb') as src_file:
+            # an existing file at backup_file_path (FileExistsError) is not ours to remove, nor to replace with another strategy
+            backup_file = open(backup_file_path.expanduser(), 'xb')
+            try:
+                with backup_file:
+                    fcntl.ioctl(backup_file.fileno(), ReflinkBackupStrategy.FICLONE, src_file.fileno())
+            except OSError as e:  # pylint: disable=unused-variable
+                # only the file created above is removed
+                backup_file_path.expanduser().unlink()
+                return False
+        shutil.copystat(file_path.expanduser(), backup_file_path.expanduser())
+        return True
+
+
+class HardlinkBackupStrategy(IBackupStrategy):
+    """
+    creates the backup as a hard link to the original file, which is instant and takes no extra space, provided that the modified movie is written to a new file
+    """
+
+    name = 'hardlink'
+    shares_original_file = True
+
+    def create_backup(self, file_path, backup_file_path):
+        try:
+            os.link(file_path.expanduser(), backup_file_path.expanduser())
+        except FileExistsError:
+            raise
+        except OSError as e:  # pylint: disable=unused-variable
+            return False
+        return True
+
+
+class CopyBackupStrategy(IBackupStrategy):
+    """
+    creates the backup as a full copy of the original file
+    """
+
+    name = 'copy'
+
+    copies_data = True
+
+    def create_backup(self, file_path, backup_file_path):
+        command = ['rsync', '-va']
+        if DEVICE_SCHEDULER.max_rate is not None:
+            # rsync spreads the copy over time, instead of delaying the next rewrites of the device (in KiB/s)
+            command.append('--bwlimit=%d' % max(1, DEVICE_SCHEDULER.max_rate // 1024))
+        completed_process = execute_command(command + [str(file_path.expanduser()), str(backup_file_path.expanduser())])
+        assert completed_process.returncode == 0, completed_process.stderr
+        return True
+
+
+def get_backup_file_path(file_path, suffix=None):
+    """
+    :param Path file_path:
+    :param str or None suffix: the suffix of the backup ; by default, the suffix of file_path
+    :rtype Path: the path of a backup of file_path created now, which doesn't exist yet
+    """
+    if suffix is None:
+        suffix = file_path.suffix
+    now_date = datetime.datetime.now()
+    backup_file_stem = file_path.stem + '.asof_' + now_date.strftime("%Y_%m_%d_%H_%M_%S")
+    backup_file_path = file_path.with_name(backup_file_stem + suffix)
+    # the names have a one second resolution, and a backup of the same second must not be overwritten
+    backup_index = 1
+    while os.path.lexists(backup_file_path.expanduser()):
+        backup_index += 1
+        backup_file_path = file_path.with_name('%s_%d%s' % (backup_file_stem, backup_index, suffix))
+    return backup_file_path
+    # return Path('/tmp/' + file_path.stem + '.asof_' + now_date.strftime("%Y_%m_%d_%H_%M_%S")  + file_path.suffix)
+
+
+def create_backup(file_path, backup_strategies=None, backup_file_path=None):
+    """
+    :param Path file_path:
+    :param list(IBackupStrategy) or None backup_strategies: the strategies to try, in order of preference ; by default, a reflink clone then a full copy
+    :param Path or None backup_file_path: the path of the backup ; by default, see get_backup_file_path
+    :rtype Path, IBackupStrategy: the backup file path and the strategy that created it
+    """
+    assert isinstance(file_path, Path)
+    if backup_strategies is None:
+        backup_strategies = [ReflinkBackupStrategy(), CopyBackupStrategy()]
+    if backup_file_path is None:
+        backup_file_path = get_backup_file_path(file_path)
+    # print(backup_file_path)
+    for backup_strategy in backup_strategies:
+        if backup_strategy.copies_data:
+            with DEVICE_SCHEDULER.rewrite_slot(file_path) as device_slot:
+                if backup_strategy.create_backup(file_path, backup_file_path):
+                    device_slot.num_written_bytes = backup_file_path.expanduser().stat().st_size
+                    return backup_file_path, backup_strategy
+        elif backup_strategy.create_backup(file_path, backup_file_path):
+            return backup_file_path, backup_strategy
+    assert False, 'none of the backup strategies %s could backup %s' % ([backup_strategy.name for backup_strategy in backup_strategies], file_path)
+
+# def read_movie_metadata(src_movie_file_path):
+#     """
+#     :param Path movie_file_path:
+#     :rtype config:
+#     """
+#     ini_file_path = Path('/tmp/ffmetadata.ini')
+#     command = []
+#     command.append('ffmpeg')
+#     command.append('-i')
+#     command.append(src_movie_file_path.expanduser())
+#     command.append('-f')
+#     command.append('ffmetadata')
+#     command.append(ini_file_path.expanduser())
+#     completed_process = execute_command(command)
+#     assert completed_process.returncode == 0, completed_process.stderr
+
+#     config = configparser.ConfigParser()
+#     config.read(ini_file_path.expanduser())
+#     return config
+
+class BackupMode(Enum):
     MODIFY_ORIGINAL=auto()
     MODIFY_BACKUP=auto()
     NO_BACKUP=auto()
@@ -365,6 +1614,22 @@ class IMetadataModifier(abc.ABC):
     def check_modified_movie(self, dst_movie_file_path):
         pass
 
+    def update_metadata_edit(self, metadata_edit):
+        """
+        describes the change of this modifier in metadata_edit, so that it can be performed in place, without remuxing the movie file
+
+        :param MovieMetadataEdit metadata_edit:
+        :rtype bool: False if the change of this modifier can't be described by a MovieMetadataEdit
+        """
+        return False
+
+    def is_applied(self, movie_file_path):
+        """
+        :param Path movie_file_path:
+        :rtype bool: True if the movie file already has the metadata that this modifier sets, in which case the modifier has nothing to do
+        """
+        return False
+
 class TracksLanguageModifier(IMetadataModifier):
 
     def __init__(self, languages):
@@ -381,8 +1646,8 @@ class TracksLanguageModifier(IMetadataModifier):
         return True, ""
 
     def get_ffmpeg_options(self, src_movie_file_path):
+        ffmpeg_options = []
         for track_index in range(len(self.languages)):
-            ffmpeg_options = []
             # track_id = sorted_track_ids[track_index]
             if get_movie_container_type(src_movie_file_path) == MovieContainerType.AVI:
                 # print('avi')
@@ -407,11 +1672,22 @@ class TracksLanguageModifier(IMetadataModifier):
         return ffmpeg_options
 
     def check_modified_movie(self, dst_movie_file_path):
-        dst_audio_track_languages = get_movie_track_languages(dst_movie_file_path)
+        # the result is checked the way players see it
+        dst_audio_track_languages = get_movie_track_languages(dst_movie_file_path, use_ffprobe=True)
         if [l.iso for l in self.languages] != [l.iso for l in dst_audio_track_languages]:
             return False, '%s <> %s' % (str(self.languages), str(dst_audio_track_languages))
         return True, ""
 
+    def update_metadata_edit(self, metadata_edit):
+        metadata_edit.audio_track_languages = self.languages
+        return True
+
+    def is_applied(self, movie_file_path):
+        return [l.iso for l in self.languages] == [l.iso for l in get_movie_track_languages(movie_file_path)]
+
+    def __str__(self):
+        return 'audio track languages %s' % self.languages
+
 
 class ITitleGuesser(abc.ABC):
 
@@ -427,17 +1703,294 @@ class TitleFromFileName(ITitleGuesser):
         :param str filename_reg_exp: python style regular expression with in which it is expected to find a group named title. This group named 'title' is used to find the title of the movie in the file's name
         """
         assert re.search(r'\?P<title>', filename_reg_exp), "regular expression %s is expected to have a group named 'title'" % (filename_reg_exp)
-        self.filename_reg_exp = filename_reg_exp
+        self.filename_reg_exp = re.compile(filename_reg_exp)
 
     def guess_title(self, file_path):
         title = None
-        print(file_path.stem)
-        match = re.match(self.filename_reg_exp, file_path.stem)
+        match = self.filename_reg_exp.match(file_path.stem)
         if match:
             if 'title' in match.groupdict():
                 title = match.groupdict()['title']
         return title
 
+
+# the words of the movie file names after which there's only release information (resolution, source, codecs, languages)
+RELEASE_TAG_RE = re.compile(r'\b(?:480p|576p|720p|1080p|1080i|2160p|4k|uhd|hdr|x264|x265|h264|h265|hevc|xvid|divx|bluray|blu ray|bdrip|brrip|dvdrip|dvdscr|webrip|web dl|webdl|hdtv|hdrip|remux|ac3|dts|aac|multi|vostfr|truefrench|french|proper|repack|extended|unrated|remastered)\b', re.IGNORECASE)
+MOVIE_YEAR_RE = re.compile(r'(?<![0-9])(?:19|20)[0-9]{2}(?![0-9])')
+TITLE_TRIGRAM_BASE = 37  # the characters of the normalized titles : space, a-z and 0-9
+TITLE_TRIGRAM_CHAR_CODES = dict([(' ', 0)] + [(chr(ord('a') + i), 1 + i) for i in range(26)] + [(chr(ord('0') + i), 27 + i) for i in range(10)])
+
+
+def _normalize_title(title):
+    """
+    :param str title:
+    :rtype str: the title in lower case ascii letters and digits separated by single spaces (eg 'le fabuleux destin d amelie poulain')
+    """
+    title = unicodedata.normalize('NFKD', title.lower())
+    title = ''.join([c if c in TITLE_TRIGRAM_CHAR_CODES else ' ' for c in title if not unicodedata.combining(c)])
+    return ' '.join(title.split())
+
+
+def _get_title_trigrams(normalized_title):
+    """
+    :param str normalized_title: as returned by _normalize_title
+    :rtype set(int): the trigrams of the title, padded with a space at both ends, each encoded as an int below TITLE_TRIGRAM_BASE ** 3
+    """
+    char_codes = [TITLE_TRIGRAM_CHAR_CODES[c] for c in ' %s ' % normalized_title]
+    return set([(char_codes[i] * TITLE_TRIGRAM_BASE + char_codes[i + 1]) * TITLE_TRIGRAM_BASE + char_codes[i + 2] for i in range(len(char_codes) - 2)])
+
+
+def _clean_movie_file_stem(file_stem):
+    """
+    extracts the probable title and year of a movie from its file name
+
+    :param str file_stem: eg 'Amelie.2001.1080p.BluRay.x264' or '2001 - amelie [fr]'
+    :rtype str, int or None: the title (eg 'Amelie') and the year, if any
+    """
+    name = re.sub(r'\[[^\]]*\]|\{[^}]*\}', ' ', file_stem)
+    name = ' '.join(re.sub(r'[._]', ' ', name).split())
+    release_tag_match = RELEASE_TAG_RE.search(name)
+    if release_tag_match is not None and release_tag_match.start() > 0:
+        name = name[:release_tag_match.start()]
+    year = None
+    year_matches = list(MOVIE_YEAR_RE.finditer(name))
+    if len(year_matches) != 0:
+        year_match = year_matches[-1]
+        if year_match.start() > 0:
+            # 'amelie (2001)'
+            year = int(year_match.group())
+            name = name[:year_match.start()]
+        elif len(name[year_match.end():].strip(' -()')) != 0:
+            # '2001 - amelie', as named by the default TitleFromFileName
+            year = int(year_match.group())
+            name = name[year_match.end():]
+    return name.strip(' -()'), year
+
+
+def get_title_catalog_index_file_path(catalog_file_path):
+    """
+    :param Path catalog_file_path:
+    :rtype Path: the index file of the catalog, in the cache directory of videfix
+    """
+    catalog_file_path = Path(os.path.abspath(catalog_file_path.expanduser()))
+    return Path('~/.cache/videfix') / ('%s.%08x.trigram_index' % (catalog_file_path.name, zlib.crc32(str(catalog_file_path).encode('utf-8'))))
+
+
+class TitleCatalogIndex:
+    """
+    a trigram index of the titles of a catalog, in a file that is memory-mapped instead of being loaded, so that it can be opened instantly and searched in a few milliseconds even with millions of titles
+
+    the index file is made of a header followed by these arrays, in native byte order :
+    - the offsets of the postings of each of the TITLE_TRIGRAM_BASE ** 3 possible trigrams (uint32)
+    - the postings : the sorted ids of the titles that contain each trigram (uint32)
+    - the offsets of each title in the titles blob (uint32)
+    - the year of each title, 0 if unknown (uint16)
+    - the titles blob : the utf-8 encoded titles, one after the other
+    """
+
+    HEADER_STRUCT = struct.Struct('=4sIqqIII')  # magic, version, catalog size, catalog mtime, number of titles, number of postings, size of the titles blob
+    MAGIC = b'VFTI'
+    VERSION = 1
+    NUM_TRIGRAMS = TITLE_TRIGRAM_BASE ** 3
+    TITLE_COLUMN_NAMES = ['title', 'primaryTitle']  # the first column found is used ; 'primaryTitle' as in imdb's title.basics.tsv
+    YEAR_COLUMN_NAMES = ['year', 'startYear']
+    # with imdb's title.basics.tsv, only the titles that can be movie files are indexed
+    TITLE_TYPES = ['movie', 'tvMovie', 'video', 'short', 'tvShort']
+
+    def __init__(self, index_file_path):
+        """
+        :param Path index_file_path: an index file written by build
+        """
+        self.index_file_path = index_file_path
+        with open(index_file_path.expanduser(), 'rb') as f:
+            self.index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.catalog_size, self.catalog_mtime_ns, self.num_titles, num_postings, blob_size = self.HEADER_STRUCT.unpack_from(self.index_map, 0)
+        assert magic == self.MAGIC and version == self.VERSION, '%s is not a title catalog index' % index_file_path
+        index_view = memoryview(self.index_map)
+        offset = self.HEADER_STRUCT.size
+        self.posting_offsets = index_view[offset:offset + (self.NUM_TRIGRAMS + 1) * 4].cast('I')
+        offset += (self.NUM_TRIGRAMS + 1) * 4
+        self.postings = index_view[offset:offset + num_postings * 4].cast('I')
+        offset += num_postings * 4
+        self.title_offsets = index_view[offset:offset + (self.num_titles + 1) * 4].cast('I')
+        offset += (self.num_titles + 1) * 4
+        self.years = index_view[offset:offset + self.num_titles * 2].cast('H')
+        offset += (self.num_titles * 2 + 3) // 4 * 4
+        self.titles_blob = index_view[offset:offset + blob_size]
+
+    def close(self):
+        for view in [self.posting_offsets, self.postings, self.title_offsets, self.years, self.titles_blob]:
+            view.release()
+        self.index_map.close()
+
+    @classmethod
+    def build(cls, catalog_file_path, index_file_path):
+        """
+        indexes the titles of a catalog
+
+        :param Path catalog_file_path: a csv (or tab separated if its suffix is .tsv) file with a header line naming its columns, among which a title (or primaryTitle) column and optionally a year (or startYear) column, possibly gzip compressed (.gz)
+        :param Path index_file_path: the index file to write
+        """
+        import csv
+        catalog_stat = catalog_file_path.expanduser().stat()
+        catalog_suffixes = [suffix.lower() for suffix in catalog_file_path.suffixes]
+        if catalog_suffixes[-1:] == ['.gz']:
+            import gzip
+            catalog_file = gzip.open(catalog_file_path.expanduser(), 'rt', encoding='utf-8', newline='')
+        else:
+            catalog_file = open(catalog_file_path.expanduser(), 'r', encoding='utf-8', newline='')
+        trigram_postings = [None] * cls.NUM_TRIGRAMS  # trigram -> array('I') of title ids
+        title_offsets = array.array('I', [0])
+        years = array.array('H')
+        titles_blob = bytearray()
+        with catalog_file:
+            if '.tsv' in catalog_suffixes:
+                # imdb's tsv files are not quoted
+                csv_reader = csv.DictReader(catalog_file, delimiter='\t', quoting=csv.QUOTE_NONE)
+            else:
+                csv_reader = csv.DictReader(catalog_file)
+            field_names = csv_reader.fieldnames or []
+            title_column_names = [column_name for column_name in cls.TITLE_COLUMN_NAMES if column_name in field_names]
+            assert len(title_column_names) != 0, '%s is expected to start with a header line naming its columns, among which %s' % (catalog_file_path, ' or '.join(cls.TITLE_COLUMN_NAMES))
+            title_column_name = title_column_names[0]
+            year_column_names = [column_name for column_name in cls.YEAR_COLUMN_NAMES if column_name in field_names]
+            for row in csv_reader:
+                if 'titleType' in row and row['titleType'] not in cls.TITLE_TYPES:
+                    continue
+                title = row.get(title_column_name) or ''
+                trigrams = _get_title_trigrams(_normalize_title(title))
+                if len(title) == 0 or len(trigrams) < 2:
+                    # eg a title with no latin letters or digits
+                    continue
+                year = 0
+                if len(year_column_names) != 0 and (row.get(year_column_names[0]) or '').isdigit():
+                    year = int(row[year_column_names[0]])
+                title_id = len(years)
+                for trigram in trigrams:
+                    if trigram_postings[trigram] is None:
+                        trigram_postings[trigram] = array.array('I')
+                    trigram_postings[trigram].append(title_id)
+                years.append(year if year < 65536 else 0)
+                titles_blob += title.encode('utf-8')
+                title_offsets.append(len(titles_blob))
+        posting_offsets = array.array('I', [0])
+        for postings in trigram_postings:
+            posting_offsets.append(posting_offsets[-1] + (len(postings) if postings is not None else 0))
+        assert len(titles_blob) < 2 ** 32, '%s has too many titles' % catalog_file_path
+        # the index is written next to its final path, then renamed, so that it's never seen partially written
+        index_file_path = index_file_path.expanduser()
+        index_file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_index_file_path = get_temporary_file_path(index_file_path)
+        try:
+            with open(tmp_index_file_path, 'wb') as f:
+                f.write(cls.HEADER_STRUCT.pack(cls.MAGIC, cls.VERSION, catalog_stat.st_size, catalog_stat.st_mtime_ns, len(years), posting_offsets[-1], len(titles_blob)))
+                posting_offsets.tofile(f)
+                for postings in trigram_postings:
+                    if postings is not None:
+                        postings.tofile(f)
+                title_offsets.tofile(f)
+                years.tofile(f)
+                f.write(b'\0' * (len(years) % 2 * 2))
+                f.write(titles_blob)
+            os.replace(tmp_index_file_path, index_file_path)
+        except BaseException:
+            if tmp_index_file_path.exists():
+                tmp_index_file_path.unlink()
+            raise
+
+    @classmethod
+    def open(cls, catalog_file_path, index_file_path=None):
+        """
+        opens the index of a catalog, after (re)building it if the catalog is not indexed yet or has changed since
+
+        :param Path catalog_file_path:
+        :param Path or None index_file_path: by default, the index is kept in the cache directory of videfix (see get_title_catalog_index_file_path)
+        :rtype TitleCatalogIndex:
+        """
+        if index_file_path is None:
+            index_file_path = get_title_catalog_index_file_path(catalog_file_path)
+        catalog_stat = catalog_file_path.expanduser().stat()
+        if index_file_path.expanduser().exists():
+            title_catalog_index = cls(index_file_path)
+            if (title_catalog_index.catalog_size, title_catalog_index.catalog_mtime_ns) == (catalog_stat.st_size, catalog_stat.st_mtime_ns):
+                return title_catalog_index
+            title_catalog_index.close()
+        print("indexing the titles of %s into %s..." % (catalog_file_path, index_file_path))
+        cls.build(catalog_file_path, index_file_path)
+        return cls(index_file_path)
+
+    def get_title(self, title_id):
+        """
+        :param int title_id:
+        :rtype str, int or None: the title and its year, if known
+        """
+        title = str(self.titles_blob[self.title_offsets[title_id]:self.title_offsets[title_id + 1]], encoding='utf-8')
+        return title, self.years[title_id] if self.years[title_id] != 0 else None
+
+    def find_title(self, title, year=None, min_similarity=0.6, max_num_postings=100000, max_num_candidates=64):
+        """
+        finds the title of the catalog that is the most similar to the given title
+
+        the candidates are the titles that share the most trigrams with the given title, counted on the least common trigrams first (up to max_num_postings postings), and the candidates are then ranked by their actual trigram similarity, the year breaking the ties
+
+        :param str title: eg a title cleaned from a file name
+        :param int or None year: the year of the movie, if known
+        :param float min_similarity: the minimum dice coefficient between the trigrams of the titles, from 0 to 1
+        :param int max_num_postings: the maximum number of postings read to find the candidates, which bounds the time of a search
+        :param int max_num_candidates: the number of candidates whose similarity is computed
+        :rtype str, int or None, float or None: the best title, its year and its similarity ; None if no title is similar enough
+        """
+        trigrams = _get_title_trigrams(_normalize_title(title))
+        if len(trigrams) < 2:
+            return None
+        # the rare trigrams are the most selective, and the cheapest to read
+        trigram_postings = sorted([(self.posting_offsets[trigram + 1] - self.posting_offsets[trigram], trigram) for trigram in trigrams])
+        candidate_counts = collections.Counter()
+        num_read_postings = 0
+        for num_postings, trigram in trigram_postings:
+            if num_postings == 0:
+                continue
+            if num_read_postings != 0 and num_read_postings + num_postings > max_num_postings:
+                break
+            candidate_counts.update(self.postings[self.posting_offsets[trigram]:self.posting_offsets[trigram + 1]])
+            num_read_postings += num_postings
+        best_match = None
+        best_score = None
+        for title_id, _ in candidate_counts.most_common(max_num_candidates):
+            candidate_title, candidate_year = self.get_title(title_id)
+            candidate_trigrams = _get_title_trigrams(_normalize_title(candidate_title))
+            similarity = 2.0 * len(trigrams & candidate_trigrams) / (len(trigrams) + len(candidate_trigrams))
+            if similarity < min_similarity:
+                continue
+            year_distance = abs(year - candidate_year) if year is not None and candidate_year is not None else None
+            score = (similarity + (0.1 if year_distance == 0 else 0.05 if year_distance == 1 else 0.0), -title_id)
+            if best_score is None or score > best_score:
+                best_match = (candidate_title, candidate_year, similarity)
+                best_score = score
+        return best_match
+
+
+class TitleFromCatalog(ITitleGuesser):
+    """
+    guesses the title of a movie file by looking up its cleaned up file name in a local catalog of titles (eg imdb's title.basics.tsv.gz)
+    """
+
+    def __init__(self, catalog_file_path, min_similarity=0.6):
+        """
+        :param Path catalog_file_path: see TitleCatalogIndex.build
+        :param float min_similarity: the minimum similarity between the file name and the guessed title, from 0 to 1
+        """
+        self.title_catalog_index = TitleCatalogIndex.open(catalog_file_path)
+        self.min_similarity = min_similarity
+
+    def guess_title(self, file_path):
+        title, year = _clean_movie_file_stem(file_path.stem)
+        best_match = self.title_catalog_index.find_title(title, year, self.min_similarity)
+        if best_match is None:
+            return None
+        return best_match[0]
+
+
 class TitleModifier(IMetadataModifier):
 
     def __init__(self, new_title):
@@ -456,174 +2009,3054 @@ class TitleModifier(IMetadataModifier):
         return ffmpeg_options
 
     def check_modified_movie(self, dst_movie_file_path):
+        dst_title = get_movie_title(dst_movie_file_path, use_ffprobe=True)
+        if dst_title != self.new_title:
+            return False, "'%s' <> '%s'" % (self.new_title, dst_title)
         return True, ""
 
-def modify_movie_metadata(movie_file_path, modifiers):
+    def update_metadata_edit(self, metadata_edit):
+        metadata_edit.title = self.new_title
+        return True
+
+    def is_applied(self, movie_file_path):
+        return get_movie_title(movie_file_path) == self.new_title
+
+    def __str__(self):
+        return "title '%s'" % self.new_title
+
+
+class MovieMetadataEdit:
     """
-    :param Path movie_file_path:
-    :param list(IMetadataModifier) modifiers:
+    the metadata changes requested by a set of modifiers, in a form that the in place editors understand
     """
-    assert isinstance(movie_file_path, Path)
 
-    for modifier in modifiers:
-        is_suitable, error_message = modifier.movie_is_suitable(movie_file_path)
-        if not is_suitable:
-            assert False, error_message
+    def __init__(self):
+        self.title = None  # the new title, or None if the title is not changed
+        self.audio_track_languages = None  # the new list(Language) of the audio tracks, or None if they're not changed
 
-    backup_mode = BackupMode.MODIFY_ORIGINAL
 
-    movie_backup_file_path = create_backup(movie_file_path)
+class IInPlaceEditor(abc.ABC):
+    """
+    an editor that changes the metadata of a movie file by patching the few bytes that store them, instead of remuxing the whole movie file
+    """
 
-    if backup_mode == BackupMode.MODIFY_BACKUP:
-        src_movie_file_path = movie_file_path
-        dst_movie_file_path = movie_backup_file_path
-    elif backup_mode in [BackupMode.MODIFY_ORIGINAL, BackupMode.NO_BACKUP]:
-        src_movie_file_path = movie_backup_file_path
-        dst_movie_file_path = movie_file_path
-    else:
-        assert False
-    # sorted_track_ids = sorted(audio_track_languages.keys())
-    command = []
-    command.append('ffmpeg')
+    @abc.abstractmethod
+    def get_patches(self, movie_file_path, metadata_edit):
+        """
+        :param Path movie_file_path:
+        :param MovieMetadataEdit metadata_edit:
+        :rtype list((int, bytes)) or None: the (offset, data) writes that perform the edit, or None if the edit can't be performed in place (in which case the movie file needs to be remuxed)
+        """
+        pass
+
+    @abc.abstractmethod
+    def read_metadata(self, movie_file_path):
+        """
+        reads the metadata that this editor is able to edit, from the headers of the movie file only
+
+        :param Path movie_file_path:
+        :rtype MovieMetadataEdit: the current title and audio track languages of the movie file
+        """
+        pass
+
+    def check_patched_movie(self, movie_file_path, metadata_edit):
+        """
+        checks that the patched headers of the movie file contain the expected metadata
+
+        :param Path movie_file_path:
+        :param MovieMetadataEdit metadata_edit:
+        :rtype bool, str:
+        """
+        movie_metadata = self.read_metadata(movie_file_path)
+        if metadata_edit.title is not None and movie_metadata.title != metadata_edit.title:
+            return False, "'%s' <> '%s'" % (metadata_edit.title, movie_metadata.title)
+        if metadata_edit.audio_track_languages is not None and [l.iso for l in movie_metadata.audio_track_languages] != [l.iso for l in metadata_edit.audio_track_languages]:
+            return False, '%s <> %s' % (str(metadata_edit.audio_track_languages), str(movie_metadata.audio_track_languages))
+        return True, ""
+
+
+@contextlib.contextmanager
+def _map_movie_file(movie_file_path):
+    """
+    memory-maps a movie file for reading its headers : only the pages that are actually read are loaded from the disk
+
+    :param Path movie_file_path:
+    :rtype mmap: a read only memory map, that can be read with seek and read like a file
+    """
+    with open(movie_file_path.expanduser(), 'rb') as f:
+        assert os.fstat(f.fileno()).st_size != 0, '%s is empty' % movie_file_path
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as movie_map:
+            if hasattr(mmap, 'MADV_RANDOM'):
+                # the headers are scattered, so reading ahead would only load media data
+                movie_map.madvise(mmap.MADV_RANDOM)
+            yield movie_map
+
+
+def apply_file_patches(file_path, patches):
+    """
+    :param Path file_path:
+    :param list((int, bytes)) patches: the (offset, data) writes to perform on the file
+    """
+    with open(file_path.expanduser(), 'r+b') as f:
+        for offset, data in patches:
+            f.seek(offset)
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_undo_record(file_path, patches):
+    """
+    reads what the given patches are about to overwrite, so that they can be undone without a copy of the whole file
+
+    :param Path file_path:
+    :param list((int, bytes)) patches: the (offset, data) writes about to be performed on the file
+    :rtype dict: the size of the file, the (offset, hex data, patch size) of the bytes that the patches overwrite and the crc-32 of the patches, as a json compatible dict
+    """
+    with open(file_path.expanduser(), 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        overwritten_ranges = []
+        for offset, data in patches:
+            f.seek(offset)
+            # the patches that extend the file (eg a mp4 moov box moved to the end) are undone by the truncation
+            overwritten_ranges.append([offset, f.read(len(data)).hex(), len(data)])
+    return {'file_size': file_size, 'overwritten_ranges': overwritten_ranges, 'patches_crc32': zlib.crc32(b''.join([data for _, data in patches]))}
+
+
+def apply_undo_record(file_path, undo_record):
+    """
+    restores the bytes that were overwritten by patches
+
+    :param Path file_path:
+    :param dict undo_record: as returned by read_undo_record
+    """
+    with open(file_path.expanduser(), 'r+b') as f:
+        # the ranges are restored in reverse order, in case the patches overlapped
+        for offset, hex_data, _ in reversed(undo_record['overwritten_ranges']):
+            f.seek(offset)
+            f.write(bytes.fromhex(hex_data))
+        f.truncate(undo_record['file_size'])
+        f.flush()
+        os.fsync(f.fileno())
+
+
+UNDO_RECORD_FILE_SUFFIX = '.videfix_undo'
+
+
+def write_undo_record_file(undo_record_file_path, undo_record):
+    """
+    :param Path undo_record_file_path: a file that doesn't exist yet
+    :param dict undo_record: as returned by read_undo_record
+    """
+    # an existing file (FileExistsError) is not ours to overwrite
+    with open(undo_record_file_path.expanduser(), 'x', encoding='utf-8') as f:
+        json.dump(undo_record, f)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def restore_undo_record_file(movie_file_path, undo_record_file_path):
+    """
+    undoes the in place patch of a movie file, from the undo record file kept as its backup
+
+    :param Path movie_file_path:
+    :param Path undo_record_file_path:
+    """
+    with open(undo_record_file_path.expanduser(), 'r', encoding='utf-8') as f:
+        undo_record = json.load(f)
+    # the movie file must still be as the patches left it, otherwise restoring the overwritten bytes would corrupt it
+    with open(movie_file_path.expanduser(), 'rb') as f:
+        patched_data = b''
+        for offset, _, patch_size in undo_record['overwritten_ranges']:
+            f.seek(offset)
+            patched_data += f.read(patch_size)
+    assert zlib.crc32(patched_data) == undo_record['patches_crc32'], '%s has been modified since %s was recorded' % (movie_file_path, undo_record_file_path)
+    apply_undo_record(movie_file_path, undo_record)
+    MOVIE_PROBE_CACHE.invalidate(movie_file_path)
+
+
+class RiffChunk:
+
+    def __init__(self, chunk_id, offset, data_size, list_type=None):
+        """
+        :param bytes chunk_id: eg b'LIST', b'JUNK', b'avih'
+        :param int offset: the position of the chunk in the file
+        :param int data_size: the size of the chunk data (excluding the 8 bytes chunk header and the pad byte)
+        :param bytes or None list_type: the type of the list (eg b'hdrl', b'INFO') if the chunk is a LIST
+        """
+        self.chunk_id = chunk_id
+        self.offset = offset
+        self.data_size = data_size
+        self.list_type = list_type
+
+    @property
+    def total_size(self):
+        # riff chunks are word aligned
+        return 8 + self.data_size + (self.data_size & 1)
+
+    def is_list(self, list_type):
+        return self.chunk_id == b'LIST' and self.list_type == list_type
+
+
+def _read_riff_chunks(f, start_offset, end_offset):
+    """
+    :param file f:
+    :param int start_offset: the position of the first chunk
+    :param int end_offset: the end of the parent chunk
+    :rtype generator(RiffChunk):
+    """
+    offset = start_offset
+    while offset + 8 <= end_offset:
+        f.seek(offset)
+        chunk_header = f.read(12)
+        if len(chunk_header) < 8:
+            return
+        chunk_id, data_size = struct.unpack('<4sI', chunk_header[0:8])
+        list_type = None
+        if chunk_id in [b'LIST', b'RIFF'] and len(chunk_header) == 12:
+            list_type = chunk_header[8:12]
+        chunk = RiffChunk(chunk_id, offset, data_size, list_type)
+        if offset + chunk.total_size > end_offset + 1:
+            # truncated chunk
+            return
+        yield chunk
+        offset += chunk.total_size
+
+
+def _decode_riff_string(value):
+    """
+    :param bytes value: a null terminated riff tag value
+    :rtype str:
+    """
+    value = value.split(b'\0')[0]
+    try:
+        return str(value, encoding='utf-8')
+    except UnicodeDecodeError as e:  # pylint: disable=unused-variable
+        return str(value, encoding='latin_1')
+
+
+def _build_riff_chunk(chunk_id, data):
+    """
+    :param bytes chunk_id:
+    :param bytes data:
+    :rtype bytes:
+    """
+    chunk = chunk_id + struct.pack('<I', len(data)) + data
+    if len(data) & 1:
+        chunk += b'\0'
+    return chunk
+
+
+class AviInfoEditor(IInPlaceEditor):
+    """
+    edits the riff tags of the LIST/INFO chunk of an avi file (IAS<n> for the audio track languages, INAM for the title)
+
+    the LIST/INFO chunk is rewritten in place when the space it occupies, along with the JUNK chunks that follow it (ffmpeg leaves a 1kB JUNK chunk for easier tag edition), is large enough to hold the new tags.
+    """
+
+    def _read_header_chunks(self, movie_file_path):
+        """
+        :param Path movie_file_path:
+        :rtype list(list(RiffChunk)), RiffChunk or None, list((bytes, bytes)), int: the chunk sequences in which a LIST/INFO chunk can be found (the top level chunks of the riff and the children of the hdrl list, up to the movie data), the LIST/INFO chunk, its (tag_id, value) riff tags in their original order and the number of audio streams ; or None if the file is not a riff avi file
+        """
+        with _map_movie_file(movie_file_path) as f:
+            riff_header = f.read(12)
+            if len(riff_header) < 12 or riff_header[0:4] != b'RIFF' or riff_header[8:12] != b'AVI ':
+                return None
+            riff_end = 8 + struct.unpack('<I', riff_header[4:8])[0]
+            chunk_sequences = []
+            top_level_chunks = []
+            num_audio_streams = 0
+            for chunk in _read_riff_chunks(f, 12, riff_end):
+                if chunk.is_list(b'movi'):
+                    break
+                top_level_chunks.append(chunk)
+                if chunk.is_list(b'hdrl'):
+                    hdrl_chunks = list(_read_riff_chunks(f, chunk.offset + 12, chunk.offset + 8 + chunk.data_size))
+                    chunk_sequences.append(hdrl_chunks)
+                    for hdrl_chunk in hdrl_chunks:
+                        if hdrl_chunk.is_list(b'strl'):
+                            for strl_chunk in _read_riff_chunks(f, hdrl_chunk.offset + 12, hdrl_chunk.offset + 8 + hdrl_chunk.data_size):
+                                if strl_chunk.chunk_id == b'strh':
+                                    f.seek(strl_chunk.offset + 8)
+                                    if f.read(4) == b'auds':
+                                        num_audio_streams += 1
+            chunk_sequences.append(top_level_chunks)
+
+            info_chunk = None
+            info_tags = []
+            for chunks in chunk_sequences:
+                for chunk in chunks:
+                    if chunk.is_list(b'INFO'):
+                        assert info_chunk is None, 'unexpected case : %s has more than one LIST/INFO chunk' % movie_file_path
+                        info_chunk = chunk
+                        for tag_chunk in _read_riff_chunks(f, chunk.offset + 12, chunk.offset + 8 + chunk.data_size):
+                            f.seek(tag_chunk.offset + 8)
+                            info_tags.append((tag_chunk.chunk_id, f.read(tag_chunk.data_size)))
+        return chunk_sequences, info_chunk, info_tags, num_audio_streams
+
+    def read_metadata(self, movie_file_path):
+        header_chunks = self._read_header_chunks(movie_file_path)
+        assert header_chunks is not None, '%s is not a riff avi file' % movie_file_path
+        info_tags = dict(header_chunks[2])
+        num_audio_streams = header_chunks[3]
+        movie_metadata = MovieMetadataEdit()
+        movie_metadata.title = _decode_riff_string(info_tags.get(b'INAM', b''))
+        movie_metadata.audio_track_languages = []
+        for track_index in range(num_audio_streams):
+            language_name = _decode_riff_string(info_tags.get(b'IAS%d' % (track_index + 1), b''))
+            if language_name == '':
+                movie_metadata.audio_track_languages.append(Language(language_iso='und'))
+            else:
+                movie_metadata.audio_track_languages.append(Language(language_name=check_language_name(language_name)))
+        return movie_metadata
+
+    def get_patches(self, movie_file_path, metadata_edit):
+        header_chunks = self._read_header_chunks(movie_file_path)
+        if header_chunks is None:
+            return None
+        chunk_sequences, info_chunk, info_tags, _ = header_chunks
+
+        new_info_chunk = self._build_info_chunk(info_tags, metadata_edit)
+
+        # the free spaces where the new LIST/INFO chunk could be written : (offset, size, chunks to overwrite)
+        free_spaces = []
+        for chunks in chunk_sequences:
+            for chunk_index in range(len(chunks)):
+                chunk = chunks[chunk_index]
+                if chunk is info_chunk or (chunk.chunk_id == b'JUNK' and (chunk_index == 0 or chunks[chunk_index - 1].chunk_id != b'JUNK')):
+                    space_size = chunk.total_size
+                    for next_chunk in chunks[chunk_index + 1:]:
+                        if next_chunk.chunk_id != b'JUNK':
+                            break
+                        space_size += next_chunk.total_size
+                    free_spaces.append((chunk.offset, space_size, chunk is info_chunk))
+        # prefer overwriting the existing LIST/INFO chunk
+        free_spaces.sort(key=lambda free_space: not free_space[2])
+        for offset, space_size, contains_info_chunk in free_spaces:
+            data = self._fit_info_chunk(new_info_chunk, space_size)
+            if data is None:
+                continue
+            patches = [(offset, data)]
+            if info_chunk is not None and not contains_info_chunk:
+                # the old LIST/INFO chunk is turned into a JUNK chunk of the same size
+                patches.append((info_chunk.offset, b'JUNK'))
+            return patches
+        return None
+
+    @staticmethod
+    def _build_info_chunk(info_tags, metadata_edit):
+        """
+        :param list((bytes, bytes)) info_tags: the existing riff tags
+        :param MovieMetadataEdit metadata_edit:
+        :rtype list((bytes, bytes)): the new riff tags
+        """
+        new_values = {}
+        if metadata_edit.title is not None:
+            new_values[b'INAM'] = metadata_edit.title
+        if metadata_edit.audio_track_languages is not None:
+            for track_index in range(len(metadata_edit.audio_track_languages)):
+                new_values[b'IAS%d' % (track_index + 1)] = metadata_edit.audio_track_languages[track_index].name
+        new_info_tags = []
+        for tag_id, value in info_tags:
+            if tag_id in new_values:
+                value = new_values.pop(tag_id)
+                if value == '':
+                    continue
+                value = value.encode('utf-8') + b'\0'
+            new_info_tags.append((tag_id, value))
+        for tag_id, value in new_values.items():
+            if value != '':
+                new_info_tags.append((tag_id, value.encode('utf-8') + b'\0'))
+        return new_info_tags
+
+    @staticmethod
+    def _fit_info_chunk(info_tags, space_size):
+        """
+        :param list((bytes, bytes)) info_tags:
+        :param int space_size: the size of the space in which the LIST/INFO chunk is written
+        :rtype bytes or None: the LIST/INFO chunk followed by a JUNK chunk header that fills the remaining space, or None if the LIST/INFO chunk doesn't fit
+        """
+        info_chunk = _build_riff_chunk(b'LIST', b'INFO' + b''.join([_build_riff_chunk(tag_id, value) for tag_id, value in info_tags]))
+        remaining_size = space_size - len(info_chunk)
+        if remaining_size == 0:
+            return info_chunk
+        if remaining_size >= 8:
+            # the content of the JUNK chunk doesn't matter, so only its header is written
+            return info_chunk + b'JUNK' + struct.pack('<I', remaining_size - 8)
+        if remaining_size > 0 and len(info_tags) != 0:
+            # the remaining space is too small for a JUNK chunk : it's absorbed by extra null characters at the end of the last tag value
+            tag_id, value = info_tags[-1]
+            return AviInfoEditor._fit_info_chunk(info_tags[:-1] + [(tag_id, value + b'\0' * remaining_size)], space_size)
+        return None
+
+
+EBML_ID_HEADER = 0x1A45DFA3
+EBML_ID_DOCTYPE = 0x4282
+EBML_ID_VOID = 0xEC
+EBML_ID_CRC32 = 0xBF
+MKV_ID_SEGMENT = 0x18538067
+MKV_ID_SEEKHEAD = 0x114D9B74
+MKV_ID_SEEK = 0x4DBB
+MKV_ID_SEEKID = 0x53AB
+MKV_ID_SEEKPOSITION = 0x53AC
+MKV_ID_INFO = 0x1549A966
+MKV_ID_TITLE = 0x7BA9
+MKV_ID_TRACKS = 0x1654AE6B
+MKV_ID_TRACKENTRY = 0xAE
+MKV_ID_TRACKTYPE = 0x83
+MKV_ID_LANGUAGE = 0x22B59C
+MKV_ID_LANGUAGE_BCP47 = 0x22B59D
+MKV_ID_TAGS = 0x1254C367
+MKV_ID_TAG = 0x7373
+MKV_ID_SIMPLETAG = 0x67C8
+MKV_ID_TAGNAME = 0x45A3
+MKV_ID_CLUSTER = 0x1F43B675
+MKV_TRACK_TYPE_AUDIO = 2
+
+
+class EbmlElement:
+
+    def __init__(self, element_id, offset, header_size, data_size):
+        """
+        :param int element_id: the element id, including its vint marker bits (eg 0x1549A966 for the Info element)
+        :param int offset: the position of the element (relative to the start of the file or of the parent data, depending on the context)
+        :param int header_size: the size of the element id and element size fields
+        :param int or None data_size: the size of the element data, or None if the size is unknown
+        """
+        self.element_id = element_id
+        self.offset = offset
+        self.header_size = header_size
+        self.data_size = data_size
+
+    @property
+    def data_offset(self):
+        return self.offset + self.header_size
+
+    @property
+    def total_size(self):
+        return self.header_size + self.data_size
+
+
+def _read_ebml_vint(data, pos, keep_marker=False):
+    """
+    :param bytes data:
+    :param int pos: the position of the variable size integer in data
+    :param bool keep_marker: if True, the length marker bit is kept in the value (as for element ids)
+    :rtype int or None, int: the value (None if all its value bits are set, which means an unknown size) and the length of the variable size integer
+    """
+    if pos >= len(data):
+        raise EOFError()
+    first_byte = data[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first_byte & mask:
+        mask >>= 1
+        length += 1
+    assert length <= 8, 'invalid ebml variable size integer'
+    if pos + length > len(data):
+        raise EOFError()
+    value = first_byte if keep_marker else first_byte & (mask - 1)
+    all_ones = (first_byte & (mask - 1)) == mask - 1
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+        all_ones = all_ones and byte == 0xFF
+    if all_ones and not keep_marker:
+        return None, length
+    return value, length
+
+
+def _read_ebml_element_header(data, pos):
+    """
+    :param bytes data:
+    :param int pos:
+    :rtype EbmlElement:
+    """
+    element_id, id_length = _read_ebml_vint(data, pos, keep_marker=True)
+    data_size, size_length = _read_ebml_vint(data, pos + id_length)
+    return EbmlElement(element_id, pos, id_length + size_length, data_size)
+
+
+def _read_ebml_element_header_at(f, offset):
+    """
+    :param file f:
+    :param int offset: the position of the element in the file
+    :rtype EbmlElement or None: None at the end of the file
+    """
+    f.seek(offset)
+    try:
+        element = _read_ebml_element_header(f.read(12), 0)
+    except EOFError:
+        return None
+    element.offset = offset
+    return element
+
+
+def _parse_ebml_children(data):
+    """
+    :param bytes data: the data of a master element
+    :rtype list(EbmlElement): the child elements, with offsets relative to data
+    """
+    children = []
+    pos = 0
+    while pos < len(data):
+        child = _read_ebml_element_header(data, pos)
+        assert child.data_size is not None and child.offset + child.total_size <= len(data), 'unexpected case : truncated ebml element %x' % child.element_id
+        children.append(child)
+        pos += child.total_size
+    return children
+
+
+def _encode_ebml_id(element_id):
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big')
+
+
+def _encode_ebml_size(size, length=None):
+    """
+    :param int size:
+    :param int or None length: the number of bytes of the encoded size ; the shortest if None
+    :rtype bytes:
+    """
+    if length is None:
+        length = 1
+        while size >= (1 << (7 * length)) - 1:
+            length += 1
+    assert 1 <= length <= 8 and size < (1 << (7 * length)) - 1
+    return ((1 << (7 * length)) | size).to_bytes(length, 'big')
+
+
+def _build_ebml_element(element_id, payload, size_length=None):
+    return _encode_ebml_id(element_id) + _encode_ebml_size(len(payload), size_length) + payload
+
+
+def _build_ebml_void_header(space_size):
+    """
+    :param int space_size: the total size of the void element
+    :rtype bytes: the header of a void element that fills space_size bytes (its content doesn't matter)
+    """
+    assert space_size >= 2
+    if space_size - 2 < 127:
+        return _encode_ebml_id(EBML_ID_VOID) + _encode_ebml_size(space_size - 2, 1)
+    return _encode_ebml_id(EBML_ID_VOID) + _encode_ebml_size(space_size - 9, 8)
+
+
+def _build_ebml_master_element(element_id, children, size_length=None):
+    """
+    :param int element_id:
+    :param list((int, bytes)) children: the (element id, encoded element) of the children
+    :rtype bytes:
+    """
+    if len(children) != 0 and children[0][0] == EBML_ID_CRC32:
+        # the crc-32 of a master element covers all its other children
+        payload = b''.join([child for _, child in children[1:]])
+        children = [(EBML_ID_CRC32, _build_ebml_element(EBML_ID_CRC32, struct.pack('<I', zlib.crc32(payload))))] + children[1:]
+    return _build_ebml_element(element_id, b''.join([child for _, child in children]), size_length)
+
+
+class MkvEbmlEditor(IInPlaceEditor):
+    """
+    edits the title (Segment/Info/Title) and the audio track languages (Segment/Tracks/TrackEntry/Language) of a matroska file
+
+    the Info and Tracks elements are rewritten in place, and their change of size is absorbed by the Void elements that follow them, the way mkvpropedit does.
+    """
+
+    def _read_segment_elements(self, f):
+        """
+        :param mmap f:
+        :rtype dict(int, EbmlElement): the level 1 elements of the segment that matter to this editor, with absolute offsets ; or None if the file is not a matroska file
+        """
+        header = _read_ebml_element_header_at(f, 0)
+        if header is None or header.element_id != EBML_ID_HEADER:
+            return None
+        header_data = self._read_element_data(f, header)
+        header_children = _parse_ebml_children(header_data)
+        doc_types = [header_data[child.data_offset:child.data_offset + child.data_size] for child in header_children if child.element_id == EBML_ID_DOCTYPE]
+        if doc_types not in [[b'matroska'], [b'webm']]:
+            return None
+        segment = _read_ebml_element_header_at(f, header.total_size)
+        if segment is None or segment.element_id != MKV_ID_SEGMENT:
+            return None
+        segment_elements = {}
+        # scan the level 1 elements up to the first cluster ...
+        offset = segment.data_offset
+        seek_positions = []
+        while True:
+            element = _read_ebml_element_header_at(f, offset)
+            if element is None or element.element_id == MKV_ID_CLUSTER or element.data_size is None:
+                break
+            if element.element_id not in segment_elements:
+                segment_elements[element.element_id] = element
+            if element.element_id == MKV_ID_SEEKHEAD:
+                f.seek(element.data_offset)
+                seek_positions += self._read_seek_positions(f.read(element.data_size))
+            offset += element.total_size
+        # ... and find the other ones (usually the Tags element, at the end of the file) from the seek heads
+        for element_id, seek_position in seek_positions:
+            if element_id in [MKV_ID_INFO, MKV_ID_TRACKS, MKV_ID_TAGS] and element_id not in segment_elements:
+                element = _read_ebml_element_header_at(f, segment.data_offset + seek_position)
+                if element is not None and element.element_id == element_id and element.data_size is not None:
+                    segment_elements[element_id] = element
+        return segment_elements
+
+    @staticmethod
+    def _read_seek_positions(seek_head_data):
+        """
+        :rtype list((int, int)): the (element id, position relative to the segment data) of the seek entries
+        """
+        seek_positions = []
+        for seek in _parse_ebml_children(seek_head_data):
+            if seek.element_id != MKV_ID_SEEK:
+                continue
+            seek_data = seek_head_data[seek.data_offset:seek.data_offset + seek.data_size]
+            seek_id = None
+            seek_position = None
+            for seek_child in _parse_ebml_children(seek_data):
+                value = seek_data[seek_child.data_offset:seek_child.data_offset + seek_child.data_size]
+                if seek_child.element_id == MKV_ID_SEEKID:
+                    seek_id = int.from_bytes(value, 'big')
+                elif seek_child.element_id == MKV_ID_SEEKPOSITION:
+                    seek_position = int.from_bytes(value, 'big')
+            if seek_id is not None and seek_position is not None:
+                seek_positions.append((seek_id, seek_position))
+        return seek_positions
+
+    @staticmethod
+    def _read_element_data(f, element):
+        f.seek(element.data_offset)
+        data = f.read(element.data_size)
+        assert len(data) == element.data_size, 'unexpected case : truncated ebml element %x' % element.element_id
+        return data
+
+    @staticmethod
+    def _get_children(data):
+        """
+        :rtype list((int, bytes)): the (element id, encoded element) of the children of a master element
+        """
+        return [(child.element_id, data[child.offset:child.offset + child.total_size]) for child in _parse_ebml_children(data)]
+
+    @staticmethod
+    def _get_payload(element_bytes):
+        element = _read_ebml_element_header(element_bytes, 0)
+        return element_bytes[element.data_offset:element.data_offset + element.data_size]
+
+    def _get_audio_track_entries(self, tracks_data):
+        """
+        :rtype list(list((int, bytes))): the children of the audio TrackEntry elements
+        """
+        audio_track_entries = []
+        for element_id, track_entry in self._get_children(tracks_data):
+            if element_id != MKV_ID_TRACKENTRY:
+                continue
+            track_entry_children = self._get_children(self._get_payload(track_entry))
+            track_types = [int.from_bytes(self._get_payload(child), 'big') for child_id, child in track_entry_children if child_id == MKV_ID_TRACKTYPE]
+            if track_types == [MKV_TRACK_TYPE_AUDIO]:
+                audio_track_entries.append(track_entry_children)
+        return audio_track_entries
+
+    def _get_tag_names(self, tags_data):
+        """
+        :rtype set(str): the names of the simple tags of the Tags element
+        """
+        tag_names = set()
+        for tag_id, tag in self._get_children(tags_data):
+            if tag_id != MKV_ID_TAG:
+                continue
+            for simple_tag_id, simple_tag in self._get_children(self._get_payload(tag)):
+                if simple_tag_id != MKV_ID_SIMPLETAG:
+                    continue
+                for child_id, child in self._get_children(self._get_payload(simple_tag)):
+                    if child_id == MKV_ID_TAGNAME:
+                        tag_names.add(str(self._get_payload(child), encoding='utf-8', errors='replace').upper())
+        return tag_names
+
+    def read_metadata(self, movie_file_path):
+        with _map_movie_file(movie_file_path) as f:
+            segment_elements = self._read_segment_elements(f)
+            assert segment_elements is not None, '%s is not a matroska file' % movie_file_path
+            if MKV_ID_TAGS in segment_elements:
+                # ffmpeg would let these tags override the title and the track languages
+                assert len(self._get_tag_names(self._read_element_data(f, segment_elements[MKV_ID_TAGS])) & set(['TITLE', 'LANGUAGE'])) == 0, 'the tags of %s override its title or its track languages' % movie_file_path
+            movie_metadata = MovieMetadataEdit()
+            movie_metadata.title = ''
+            if MKV_ID_INFO in segment_elements:
+                for child_id, child in self._get_children(self._read_element_data(f, segment_elements[MKV_ID_INFO])):
+                    if child_id == MKV_ID_TITLE:
+                        movie_metadata.title = str(self._get_payload(child), encoding='utf-8', errors='replace').rstrip('\0')
+            movie_metadata.audio_track_languages = []
+            if MKV_ID_TRACKS in segment_elements:
+                for track_entry_children in self._get_audio_track_entries(self._read_element_data(f, segment_elements[MKV_ID_TRACKS])):
+                    # the default language of a matroska track is english
+                    language_iso = 'eng'
+                    for child_id, child in track_entry_children:
+                        if child_id == MKV_ID_LANGUAGE:
+                            language_iso = str(self._get_payload(child), encoding='ascii', errors='replace').rstrip('\0')
+                    movie_metadata.audio_track_languages.append(Language(language_iso=check_language_iso(language_iso)))
+        return movie_metadata
+
+    def get_patches(self, movie_file_path, metadata_edit):
+        patches = []
+        with _map_movie_file(movie_file_path) as f:
+            segment_elements = self._read_segment_elements(f)
+            if segment_elements is None:
+                return None
+            tag_names = set()
+            if MKV_ID_TAGS in segment_elements:
+                tag_names = self._get_tag_names(self._read_element_data(f, segment_elements[MKV_ID_TAGS]))
+
+            if metadata_edit.title is not None:
+                if MKV_ID_INFO not in segment_elements or 'TITLE' in tag_names:
+                    # a TITLE tag would override the title of the Info element
+                    return None
+                info = segment_elements[MKV_ID_INFO]
+                info_children = [child for child in self._get_children(self._read_element_data(f, info)) if child[0] != MKV_ID_TITLE]
+                if metadata_edit.title != '':
+                    info_children.append((MKV_ID_TITLE, _build_ebml_element(MKV_ID_TITLE, metadata_edit.title.encode('utf-8'))))
+                info_patches = self._fit_element(f, info, MKV_ID_INFO, info_children)
+                if info_patches is None:
+                    return None
+                patches += info_patches
+
+            if metadata_edit.audio_track_languages is not None:
+                if MKV_ID_TRACKS not in segment_elements or 'LANGUAGE' in tag_names:
+                    return None
+                tracks = segment_elements[MKV_ID_TRACKS]
+                tracks_children = self._get_children(self._read_element_data(f, tracks))
+                audio_track_index = 0
+                new_tracks_children = []
+                for element_id, track_entry in tracks_children:
+                    if element_id == MKV_ID_TRACKENTRY:
+                        track_entry_children = self._get_children(self._get_payload(track_entry))
+                        track_types = [int.from_bytes(self._get_payload(child), 'big') for child_id, child in track_entry_children if child_id == MKV_ID_TRACKTYPE]
+                        if track_types == [MKV_TRACK_TYPE_AUDIO]:
+                            if audio_track_index >= len(metadata_edit.audio_track_languages) or MKV_ID_LANGUAGE_BCP47 in [child_id for child_id, _ in track_entry_children]:
+                                # the bcp47 language would take precedence over the language we set
+                                return None
+                            language_iso = metadata_edit.audio_track_languages[audio_track_index].iso
+                            track_entry_children = [child for child in track_entry_children if child[0] != MKV_ID_LANGUAGE]
+                            track_entry_children.append((MKV_ID_LANGUAGE, _build_ebml_element(MKV_ID_LANGUAGE, language_iso.encode('ascii'))))
+                            track_entry = _build_ebml_master_element(MKV_ID_TRACKENTRY, track_entry_children)
+                            audio_track_index += 1
+                    new_tracks_children.append((element_id, track_entry))
+                if audio_track_index != len(metadata_edit.audio_track_languages):
+                    return None
+                tracks_patches = self._fit_element(f, tracks, MKV_ID_TRACKS, new_tracks_children)
+                if tracks_patches is None:
+                    return None
+                patches += tracks_patches
+        return patches
+
+    def _fit_element(self, f, element, element_id, children):
+        """
+        :param file f:
+        :param EbmlElement element: the element to replace
+        :param int element_id:
+        :param list((int, bytes)) children: the children of the new element
+        :rtype list((int, bytes)) or None: the patches that replace the element with the new one, the remaining space being filled with a Void element ; None if the new element doesn't fit in the space occupied by the element and the Void elements that follow it
+        """
+        space_size = element.total_size
+        while True:
+            next_element = _read_ebml_element_header_at(f, element.offset + space_size)
+            if next_element is None or next_element.element_id != EBML_ID_VOID or next_element.data_size is None:
+                break
+            space_size += next_element.total_size
+        new_element = _build_ebml_master_element(element_id, children)
+        remaining_size = space_size - len(new_element)
+        if remaining_size == 1:
+            # a void element takes at least 2 bytes : the byte left is absorbed by a longer encoding of the size of the new element
+            size_length = len(new_element) - len(_encode_ebml_id(element_id)) - len(self._get_payload(new_element)) + 1
+            if size_length > 8:
+                # the size is already encoded on the maximum number of bytes, so the byte left can't be absorbed
+                return None
+            new_element = _build_ebml_master_element(element_id, children, size_length=size_length)
+            remaining_size = 0
+        if remaining_size < 0:
+            return None
+        patch_data = new_element
+        if remaining_size > 0:
+            # the content of the Void element doesn't matter, so only its header is written
+            patch_data += _build_ebml_void_header(remaining_size)
+        return [(element.offset, patch_data)]
+
+
+class Mp4Box:
+
+    def __init__(self, box_type, offset, header_size, data_size):
+        """
+        :param bytes box_type: eg b'moov', b'trak'
+        :param int offset: the position of the box (in the file or in the data it was parsed from)
+        :param int header_size: the size of the size and type fields (8 or 16 bytes)
+        :param int data_size: the size of the box payload
+        """
+        self.box_type = box_type
+        self.offset = offset
+        self.header_size = header_size
+        self.data_size = data_size
+        self.extends_to_end = False  # True if the size of the box is 0, which means that it extends to the end of its parent
+
+    @property
+    def data_offset(self):
+        return self.offset + self.header_size
+
+    @property
+    def total_size(self):
+        return self.header_size + self.data_size
+
+
+def _read_mp4_box_header(data, pos, end):
+    """
+    :param bytes data:
+    :param int pos: the position of the box in data
+    :param int end: the end of the parent box (a box of size 0 extends to the end of its parent)
+    :rtype Mp4Box:
+    """
+    assert pos + 8 <= len(data), 'unexpected case : truncated mp4 box header'
+    size, box_type = struct.unpack('>I4s', data[pos:pos + 8])
+    header_size = 8
+    if size == 1:
+        assert pos + 16 <= len(data), 'unexpected case : truncated mp4 box header'
+        size = struct.unpack('>Q', data[pos + 8:pos + 16])[0]
+        header_size = 16
+    extends_to_end = size == 0
+    if extends_to_end:
+        size = end - pos
+    assert size >= header_size, 'unexpected case : invalid size for mp4 box %s' % box_type
+    box = Mp4Box(box_type, pos, header_size, size - header_size)
+    box.extends_to_end = extends_to_end
+    return box
+
+
+def _parse_mp4_children(data, start, end):
+    """
+    :param bytes data:
+    :param int start: the position of the first child box in data
+    :param int end: the end of the children in data
+    :rtype list(Mp4Box): the child boxes, with offsets relative to data
+    """
+    children = []
+    pos = start
+    while pos + 8 <= end:
+        child = _read_mp4_box_header(data, pos, end)
+        assert child.offset + child.total_size <= end, 'unexpected case : truncated mp4 box %s' % child.box_type
+        children.append(child)
+        pos += child.total_size
+    return children
+
+
+def _find_mp4_child(data, box, box_type, payload_offset=0):
+    """
+    :param bytes data:
+    :param Mp4Box box: the parent box
+    :param bytes box_type:
+    :param int payload_offset: the size of the fields that precede the children in the payload of the parent box (eg 4 for the version and flags of a full box)
+    :rtype Mp4Box or None: the first child of the given type
+    """
+    for child in _parse_mp4_children(data, box.data_offset + payload_offset, box.data_offset + box.data_size):
+        if child.box_type == box_type:
+            return child
+    return None
+
+
+def _build_mp4_box(box_type, payload):
+    if len(payload) + 8 < (1 << 32):
+        return struct.pack('>I4s', len(payload) + 8, box_type) + payload
+    return struct.pack('>I4sQ', 1, box_type, len(payload) + 16) + payload
+
+
+def _build_mp4_free_box(space_size):
+    """
+    :param int space_size: the total size of the free box
+    :rtype bytes: the header of a free box that fills space_size bytes (its content doesn't matter)
+    """
+    assert space_size >= 8
+    if space_size < (1 << 32):
+        return struct.pack('>I4s', space_size, b'free')
+    return struct.pack('>I4sQ', 1, b'free', space_size)
+
+
+# the old fashioned macintosh language codes that may be found in mdhd boxes, as decoded by ffmpeg
+MP4_MACINTOSH_LANGUAGE_CODES = ['eng', 'fra', 'ger', 'ita', 'dut', 'sve', 'spa', 'dan', 'por', 'nor', 'heb', 'jpn', 'ara', 'fin', 'gre', 'ice', 'mlt', 'tur', None, 'chi', 'urd', 'hin', 'tha', 'kor']
+
+
+def _decode_mp4_language(packed_language):
+    """
+    :param int packed_language: the language field of a mdhd box
+    :rtype str: the iso 639-2 code of the language
+    """
+    if packed_language == 0x7FFF:
+        return 'und'
+    if packed_language >= 0x400:
+        # 3 characters packed as 5 bits offsets from 0x60
+        return ''.join([chr(0x60 + ((packed_language >> shift) & 0x1F)) for shift in [10, 5, 0]])
+    assert packed_language < len(MP4_MACINTOSH_LANGUAGE_CODES) and MP4_MACINTOSH_LANGUAGE_CODES[packed_language] is not None, 'unexpected macintosh language code %d' % packed_language
+    return MP4_MACINTOSH_LANGUAGE_CODES[packed_language]
+
+
+def _encode_mp4_language(language_iso):
+    """
+    :param str language_iso:
+    :rtype bytes: the language field of a mdhd box
+    """
+    assert re.match(r'^[a-z]{3}$', language_iso), 'unexpected language iso : %s' % language_iso
+    packed_language = 0
+    for c in language_iso:
+        packed_language = (packed_language << 5) | (ord(c) - 0x60)
+    return struct.pack('>H', packed_language)
+
+
+class Mp4AtomEditor(IInPlaceEditor):
+    """
+    edits the audio track languages (moov/trak/mdia/mdhd) and the title (moov/udta/meta/ilst/\xa9nam) of a mp4 file without touching its media data
+
+    the languages are fixed size fields, patched in place. When the moov box has to grow for the title, it uses the free boxes that follow it, or it's moved to the end of the file (which doesn't move the media data, so the chunk offsets of the stco/co64 boxes stay valid).
+    """
+
+    def _read_moov(self, f):
+        """
+        :param mmap f:
+        :rtype list(Mp4Box), Mp4Box, bytes: the top level boxes, the moov box and its content ; or None if the file is not a mp4 file
+        """
+        file_size = len(f)
+        top_level_boxes = []
+        offset = 0
+        while offset + 8 <= file_size:
+            f.seek(offset)
+            try:
+                box = _read_mp4_box_header(f.read(16), 0, file_size - offset)
+            except AssertionError:
+                return None
+            box.offset = offset
+            top_level_boxes.append(box)
+            offset += box.total_size
+        if b'ftyp' not in [box.box_type for box in top_level_boxes]:
+            return None
+        moov_boxes = [box for box in top_level_boxes if box.box_type == b'moov']
+        if len(moov_boxes) != 1:
+            return None
+        moov = moov_boxes[0]
+        f.seek(moov.offset)
+        moov_data = f.read(moov.total_size)
+        assert len(moov_data) == moov.total_size, 'unexpected case : truncated moov box'
+        return top_level_boxes, moov, moov_data
+
+    @staticmethod
+    def _get_audio_mdhd_boxes(moov_data):
+        """
+        :rtype list(Mp4Box): the mdhd boxes of the audio tracks, with offsets relative to moov_data
+        """
+        moov = _read_mp4_box_header(moov_data, 0, len(moov_data))
+        mdhd_boxes = []
+        for trak in _parse_mp4_children(moov_data, moov.data_offset, moov.data_offset + moov.data_size):
+            if trak.box_type != b'trak':
+                continue
+            mdia = _find_mp4_child(moov_data, trak, b'mdia')
+            if mdia is None:
+                continue
+            hdlr = _find_mp4_child(moov_data, mdia, b'hdlr')
+            mdhd = _find_mp4_child(moov_data, mdia, b'mdhd')
+            if hdlr is not None and mdhd is not None and moov_data[hdlr.data_offset + 8:hdlr.data_offset + 12] == b'soun':
+                mdhd_boxes.append(mdhd)
+        return mdhd_boxes
+
+    @staticmethod
+    def _get_mdhd_language_offset(moov_data, mdhd):
+        # the language follows the creation time, modification time, timescale and duration, whose sizes depend on the version of the box
+        version = moov_data[mdhd.data_offset]
+        return mdhd.data_offset + (4 + 16 if version == 0 else 4 + 28)
+
+    @staticmethod
+    def _get_meta_payload_offset(moov_data, meta):
+        # the iso meta box is a full box, whereas the quicktime one is not
+        if moov_data[meta.data_offset + 4:meta.data_offset + 8] == b'hdlr':
+            return 0
+        return 4
+
+    def _find_title_item(self, moov_data):
+        """
+        :rtype Mp4Box or None: the \xa9nam item of moov/udta/meta/ilst
+        """
+        moov = _read_mp4_box_header(moov_data, 0, len(moov_data))
+        udta = _find_mp4_child(moov_data, moov, b'udta')
+        if udta is None:
+            return None
+        meta = _find_mp4_child(moov_data, udta, b'meta')
+        if meta is None:
+            return None
+        ilst = _find_mp4_child(moov_data, meta, b'ilst', self._get_meta_payload_offset(moov_data, meta))
+        if ilst is None:
+            return None
+        return _find_mp4_child(moov_data, ilst, b'\xa9nam')
+
+    @staticmethod
+    def _has_other_title_boxes(moov_data):
+        """
+        :rtype bool: True if the moov box has a title that ffmpeg would read from elsewhere than moov/udta/meta/ilst
+        """
+        moov = _read_mp4_box_header(moov_data, 0, len(moov_data))
+        if _find_mp4_child(moov_data, moov, b'meta') is not None:
+            return True
+        udta = _find_mp4_child(moov_data, moov, b'udta')
+        # a quicktime style title
+        return udta is not None and _find_mp4_child(moov_data, udta, b'\xa9nam') is not None
+
+    def read_metadata(self, movie_file_path):
+        with _map_movie_file(movie_file_path) as f:
+            moov_boxes = self._read_moov(f)
+        assert moov_boxes is not None, '%s is not a mp4 file' % movie_file_path
+        moov_data = moov_boxes[2]
+        assert not self._has_other_title_boxes(moov_data), 'the title of %s is not stored in moov/udta/meta/ilst' % movie_file_path
+        movie_metadata = MovieMetadataEdit()
+        movie_metadata.title = ''
+        title_item = self._find_title_item(moov_data)
+        if title_item is not None:
+            data = _find_mp4_child(moov_data, title_item, b'data')
+            if data is not None:
+                # the data box starts with a type indicator and a locale
+                movie_metadata.title = str(moov_data[data.data_offset + 8:data.data_offset + data.data_size], encoding='utf-8', errors='replace')
+        movie_metadata.audio_track_languages = []
+        for mdhd in self._get_audio_mdhd_boxes(moov_data):
+            language_offset = self._get_mdhd_language_offset(moov_data, mdhd)
+            language_iso = _decode_mp4_language(struct.unpack('>H', moov_data[language_offset:language_offset + 2])[0])
+            movie_metadata.audio_track_languages.append(Language(language_iso=check_language_iso(language_iso)))
+        return movie_metadata
+
+    def get_patches(self, movie_file_path, metadata_edit):
+        with _map_movie_file(movie_file_path) as f:
+            moov_boxes = self._read_moov(f)
+        if moov_boxes is None:
+            return None
+        top_level_boxes, moov, old_moov_data = moov_boxes
+        moov_data = bytearray(old_moov_data)
+        patches = []
+
+        if metadata_edit.audio_track_languages is not None:
+            mdhd_boxes = self._get_audio_mdhd_boxes(moov_data)
+            if len(mdhd_boxes) != len(metadata_edit.audio_track_languages):
+                return None
+            for mdhd, language in zip(mdhd_boxes, metadata_edit.audio_track_languages):
+                language_offset = self._get_mdhd_language_offset(moov_data, mdhd)
+                moov_data[language_offset:language_offset + 2] = _encode_mp4_language(language.iso)
+                patches.append((moov.offset + language_offset, bytes(moov_data[language_offset:language_offset + 2])))
+
+        if metadata_edit.title is None:
+            return patches
+
+        new_moov_data = self._build_moov_with_title(bytes(moov_data), metadata_edit.title)
+        if new_moov_data is None:
+            return None
+        return self._fit_moov(top_level_boxes, moov, old_moov_data, new_moov_data)
+
+    def _build_moov_with_title(self, moov_data, title):
+        """
+        :param bytes moov_data: the moov box
+        :param str title:
+        :rtype bytes or None: the moov box with the new title, without its free child boxes (the space they occupy is reused) ; None if the title can't be set by this editor
+        """
+        if self._has_other_title_boxes(moov_data):
+            return None
+        moov = _read_mp4_box_header(moov_data, 0, len(moov_data))
+        moov_children = _parse_mp4_children(moov_data, moov.data_offset, moov.data_offset + moov.data_size)
+        udta = _find_mp4_child(moov_data, moov, b'udta')
+        udta_children = []
+        if udta is not None:
+            udta_children = _parse_mp4_children(moov_data, udta.data_offset, udta.data_offset + udta.data_size)
+        meta = _find_mp4_child(moov_data, udta, b'meta') if udta is not None else None
+        if meta is not None:
+            meta_payload_offset = self._get_meta_payload_offset(moov_data, meta)
+            meta_children = _parse_mp4_children(moov_data, meta.data_offset + meta_payload_offset, meta.data_offset + meta.data_size)
+            hdlr = _find_mp4_child(moov_data, meta, b'hdlr', meta_payload_offset)
+            if hdlr is None or moov_data[hdlr.data_offset + 8:hdlr.data_offset + 12] != b'mdir':
+                return None
+            meta_header = moov_data[meta.data_offset:meta.data_offset + meta_payload_offset]
+        else:
+            # an itunes style metadata box, as written by ffmpeg
+            hdlr_box = _build_mp4_box(b'hdlr', struct.pack('>II4s4sII', 0, 0, b'mdir', b'appl', 0, 0) + b'\0')
+            meta_children = []
+            meta_header = struct.pack('>I', 0)
+        ilst = _find_mp4_child(moov_data, meta, b'ilst', meta_payload_offset) if meta is not None else None
+        ilst_items = []
+        if ilst is not None:
+            ilst_items = [moov_data[item.offset:item.offset + item.total_size] for item in _parse_mp4_children(moov_data, ilst.data_offset, ilst.data_offset + ilst.data_size) if item.box_type != b'\xa9nam']
+        if title != '':
+            # a data box of well-known type 1 (utf-8) with the default locale
+            ilst_items.append(_build_mp4_box(b'\xa9nam', _build_mp4_box(b'data', struct.pack('>II', 1, 0) + title.encode('utf-8'))))
+        new_ilst = _build_mp4_box(b'ilst', b''.join(ilst_items))
+
+        if meta is not None:
+            new_meta_payload = meta_header + b''.join([new_ilst if child.box_type == b'ilst' else moov_data[child.offset:child.offset + child.total_size] for child in meta_children])
+            if ilst is None:
+                new_meta_payload += new_ilst
+        else:
+            new_meta_payload = meta_header + hdlr_box + new_ilst
+        new_meta = _build_mp4_box(b'meta', new_meta_payload)
+
+        new_udta_payload = b''.join([new_meta if child.box_type == b'meta' else moov_data[child.offset:child.offset + child.total_size] for child in udta_children])
+        if meta is None:
+            new_udta_payload += new_meta
+        new_udta = _build_mp4_box(b'udta', new_udta_payload)
+
+        new_moov_payload = b''.join([new_udta if child.box_type == b'udta' else moov_data[child.offset:child.offset + child.total_size] for child in moov_children if child.box_type not in [b'free', b'skip']])
+        if udta is None:
+            new_moov_payload += new_udta
+        return _build_mp4_box(b'moov', new_moov_payload)
+
+    @staticmethod
+    def _get_changed_bytes_patches(offset, old_data, new_data):
+        """
+        :rtype list((int, bytes)): the patches that turn old_data into new_data, written at offset, skipping their common prefix (except the box header)
+        """
+        moov_header_size = _read_mp4_box_header(new_data, 0, len(new_data)).header_size
+        common_prefix_size = moov_header_size
+        while common_prefix_size < min(len(old_data), len(new_data)) and old_data[common_prefix_size] == new_data[common_prefix_size]:
+            common_prefix_size += 1
+        patches = [(offset, new_data[0:moov_header_size])]
+        if common_prefix_size < len(new_data):
+            patches.append((offset + common_prefix_size, new_data[common_prefix_size:]))
+        return patches
+
+    def _fit_moov(self, top_level_boxes, moov, old_moov_data, new_moov_data):
+        """
+        :rtype list((int, bytes)) or None: the patches that replace the moov box with new_moov_data
+        """
+        moov_index = top_level_boxes.index(moov)
+        space_size = moov.total_size
+        for box in top_level_boxes[moov_index + 1:]:
+            if box.box_type not in [b'free', b'skip']:
+                break
+            space_size += box.total_size
+        is_last_box = moov_index + 1 == len(top_level_boxes) or all([box.box_type in [b'free', b'skip'] for box in top_level_boxes[moov_index + 1:]])
+        remaining_size = space_size - len(new_moov_data)
+        if remaining_size == 0:
+            return self._get_changed_bytes_patches(moov.offset, old_moov_data, new_moov_data)
+        if remaining_size >= 8:
+            # the remaining space is filled with a free box
+            return self._get_changed_bytes_patches(moov.offset, old_moov_data, new_moov_data + _build_mp4_free_box(remaining_size))
+        if is_last_box:
+            # the file is extended (or a free box is extended to the end of the file if the remaining space is too small for a free box)
+            if remaining_size > 0:
+                new_moov_data += _build_mp4_free_box(8)
+            return self._get_changed_bytes_patches(moov.offset, old_moov_data, new_moov_data)
+        if top_level_boxes[-1].extends_to_end or b'moof' in [box.box_type for box in top_level_boxes]:
+            # the moov box can't be appended after a box that extends to the end of the file, and fragmented mp4 files are left to ffmpeg
+            return None
+        # the moov box is moved to the end of the file, and its old space is turned into a free box
+        file_end = top_level_boxes[-1].offset + top_level_boxes[-1].total_size
+        moov_type_offset = moov.offset + 4
+        return [(file_end, new_moov_data), (moov_type_offset, b'free')]
+
+
+def get_in_place_editor(container_type):
+    """
+    :param MovieContainerType container_type:
+    :rtype IInPlaceEditor or None:
+    """
+    if container_type == MovieContainerType.AVI:
+        return AviInfoEditor()
+    if container_type == MovieContainerType.MKV:
+        return MkvEbmlEditor()
+    if container_type == MovieContainerType.MP4:
+        return Mp4AtomEditor()
+    return None
+
+def read_movie_headers(movie_file_path):
+    """
+    reads the title and the audio track languages of a movie file from its headers, without spawning ffprobe
+
+    :param Path movie_file_path:
+    :rtype MovieProbe or None: a partial probe, that only contains the title and the audio streams (whose stream index is the audio track index), or None if videfix can't read the headers of this movie file
+    """
+    try:
+        container_type = get_movie_container_type(movie_file_path)
+        in_place_editor = get_in_place_editor(container_type)
+        if in_place_editor is None:
+            return None
+        movie_metadata = in_place_editor.read_metadata(movie_file_path)
+    except (AssertionError, ValueError, EOFError, struct.error) as e:  # pylint: disable=unused-variable
+        # anything unexpected is left to ffprobe
+        return None
+    streams = [MovieStream(track_index, 'audio', '', {'language': language.iso}) for track_index, language in enumerate(movie_metadata.audio_track_languages)]
+    return MovieProbe(movie_file_path, container_type.name.lower(), None, {'title': movie_metadata.title}, streams, is_complete=False)
+
+
+# the number of lines of ffmpeg's standard error reported when a remux fails
+REMUX_ERROR_NUM_LINES = 20
+
+
+class RemuxProgress:
+    """
+    follows the progress of an ffmpeg remux from the key=value lines that ffmpeg writes with -progress, and reports it periodically
+    """
+
+    def __init__(self, movie_file_path, duration, report_interval=5.0):
+        """
+        :param Path movie_file_path: the movie file being remuxed, for the reports
+        :param float or None duration: the duration of the movie, in seconds, if known
+        :param float report_interval: the minimum time between two reports, in seconds
+        """
+        self.movie_file_path = movie_file_path
+        self.duration = duration
+        self.report_interval = report_interval
+        self.start_time = time.monotonic()
+        self.last_report_time = self.start_time
+        self.position = 0.0  # in seconds
+        self.num_written_bytes = 0
+        self.speed = None  # relative to the playback speed
+        self.progress_values = {}
+
+    def on_progress_line(self, line):
+        """
+        :param bytes line: a line of ffmpeg's -progress output (eg out_time_us=1000000)
+        """
+        key, _, value = str(line, encoding='utf-8', errors='replace').partition('=')
+        self.progress_values[key.strip()] = value.strip()
+        if key != 'progress':
+            return
+        # the progress line ends a block of values
+        try:
+            self.position = int(self.progress_values.get('out_time_us', '0')) / 1000000.0
+        except ValueError:
+            pass  # N/A at the beginning
+        try:
+            self.num_written_bytes = int(self.progress_values.get('total_size', '0'))
+        except ValueError:
+            pass
+        speed = self.progress_values.get('speed', '').rstrip('x')
+        try:
+            self.speed = float(speed)
+        except ValueError:
+            pass
+        now = time.monotonic()
+        if value.strip() == 'end' or now - self.last_report_time >= self.report_interval:
+            self.last_report_time = now
+            print(self)
+
+    def __str__(self):
+        elapsed_time = max(time.monotonic() - self.start_time, 1e-6)
+        position = '%s' % datetime.timedelta(seconds=int(self.position))
+        if self.duration:
+            position += ' / %s (%.1f%%)' % (datetime.timedelta(seconds=int(self.duration)), min(100.0, 100.0 * self.position / self.duration))
+        speed = ', %.1fx' % self.speed if self.speed is not None else ''
+        return "remuxing %s : %s%s, %.1f MB/s" % (self.movie_file_path, position, speed, self.num_written_bytes / elapsed_time / 1000000.0)
+
+
+def remux_movie(src_movie_file_path, dst_movie_file_path, movie_file_path, modifiers):
+    """
+    rewrites the whole movie file with ffmpeg, applying the changes of the given modifiers
+
+    :param Path src_movie_file_path:
+    :param Path dst_movie_file_path:
+    :param Path movie_file_path: the movie file the modifiers were designed for
+    :param list(IMetadataModifier) modifiers:
+    """
+    command = []
+    command.append('ffmpeg')
     command.append('-y')
+    # the progress is read from ffmpeg's standard output, instead of its statistics which would pile up in its standard error
+    command.append('-nostats')
+    command.append('-progress')
+    command.append('pipe:1')
     command.append('-i')
     command.append(src_movie_file_path.expanduser())
 
-    # https://stackoverflow.com/questions/37820083/ffmpeg-not-copying-all-audio-streams
-    # FFmpeg have option to map all streams to output, you have to use option -map 0 to map all streams from input to output.
-    command.append('-c')
-    command.append('copy')
-    command.append('-map')
-    command.append('0')
+    # https://stackoverflow.com/questions/37820083/ffmpeg-not-copying-all-audio-streams
+    # FFmpeg have option to map all streams to output, you have to use option -map 0 to map all streams from input to output.
+    command.append('-c')
+    command.append('copy')
+    command.append('-map')
+    command.append('0')
+
+    for modifier in modifiers:
+        command += modifier.get_ffmpeg_options(movie_file_path)
+
+    command.append(dst_movie_file_path.expanduser())
+
+    # ffmpeg -i input.mp4 -map 0 -codec copy -metadata:s:a:0 language=eng -metadata:s:a:1 language=rus output.mp4
+    # the headers read by videfix itself don't tell the duration, whereas ffprobe does ; its probe is cached for the verification of the remuxed movie file anyway
+    remux_progress = RemuxProgress(movie_file_path, probe_movie(src_movie_file_path, use_ffprobe=True).duration)
+    completed_process = execute_command(command, stdout_line_callback=remux_progress.on_progress_line)
+    MOVIE_PROBE_CACHE.invalidate(dst_movie_file_path)
+    # only the end of ffmpeg's standard error is kept (see CommandRunner), and only its last lines are relevant
+    assert completed_process.returncode == 0, str(b'\n'.join(completed_process.stderr.splitlines()[-REMUX_ERROR_NUM_LINES:]), encoding='utf-8', errors='replace')
+
+
+class VerificationDepth(Enum):
+    HEADER = auto()  # the streams layout, durations and frame counts, as told by the container headers
+    SAMPLED = auto()  # in addition, the hashes of the packets read at a few sampled positions
+    FULL = auto()  # in addition, the hashes of all the packets
+
+
+class VerificationReference:
+    """
+    the content of an original movie file, as read by MovieVerifier to be compared with the modified movie file
+
+    it's read before the modification when the original movie file doesn't survive it (eg when it's patched in place, without a copy)
+    """
+
+    def __init__(self, movie_file_path, probe, file_size):
+        """
+        :param Path movie_file_path:
+        :param MovieProbe probe: the ffprobe probe of the original movie file
+        :param int file_size:
+        """
+        self.movie_file_path = movie_file_path
+        self.probe = probe
+        self.file_size = file_size
+        self.packets = None  # the packets read for each stream index (see MovieVerifier._read_packets), unless the depth is HEADER
+        self.read_intervals = None  # the ffprobe -read_intervals option with which the packets were sampled, for the SAMPLED depth
+        self.window_start_times = None  # the time at which each sample window starts, for the SAMPLED depth
+
+
+class MovieVerifier:
+    """
+    checks that a modified movie file still has the same content as the original movie file
+    """
+
+    def __init__(self, depth=VerificationDepth.SAMPLED, sample_positions=(0.1, 0.5, 0.9), num_sample_packets=32, max_sample_duration=2.0):
+        """
+        :param VerificationDepth depth:
+        :param tuple(float) sample_positions: the positions (as fractions of the movie duration) at which packets are compared, for the SAMPLED depth
+        :param int num_sample_packets: the maximum number of packets of each stream compared at each sample position
+        :param float max_sample_duration: the maximum time range read at each sample position, in seconds, so that a stream whose packets are sparse isn't read to the end
+        """
+        self.depth = depth
+        self.sample_positions = sample_positions
+        self.num_sample_packets = num_sample_packets
+        self.max_sample_duration = max_sample_duration
+
+    def verify(self, src_movie_file_path, dst_movie_file_path):
+        """
+        :param Path src_movie_file_path: the original movie file
+        :param Path dst_movie_file_path: the modified movie file
+        :rtype bool, str:
+        """
+        return self.verify_reference(self.read_reference(src_movie_file_path), dst_movie_file_path)
+
+    def read_reference(self, src_movie_file_path):
+        """
+        :param Path src_movie_file_path: the original movie file
+        :rtype VerificationReference: what the modified movie file is compared to
+        """
+        src_probe = probe_movie(src_movie_file_path, use_ffprobe=True)
+        reference = VerificationReference(src_movie_file_path, src_probe, src_movie_file_path.expanduser().stat().st_size)
+        if self.depth == VerificationDepth.FULL:
+            reference.packets = self._read_packets(src_movie_file_path)
+        elif self.depth == VerificationDepth.SAMPLED and src_probe.duration is not None:
+            # each stream is sampled on its own, so that the sampled windows don't depend on the interleaving of the streams, which remuxing may change. The windows are bounded by time, as a packet count could take ffprobe to the end of the file for a stream whose packets are sparse
+            reference.window_start_times = [src_probe.duration * sample_position for sample_position in self.sample_positions]
+            reference.read_intervals = ','.join(['%f%%+%f' % (window_start_time, self.max_sample_duration) for window_start_time in reference.window_start_times])
+            reference.packets = {}
+            for stream in src_probe.streams:
+                # the other streams (subtitles, attachments, cover arts) have too few packets to be sampled, and are checked by the headers
+                if stream.codec_type not in ['video', 'audio'] or stream.is_attached_picture:
+                    continue
+                reference.packets[stream.stream_index] = self._read_packets(src_movie_file_path, reference.read_intervals, stream.stream_index).get(stream.stream_index, [])
+        return reference
+
+    def verify_reference(self, reference, dst_movie_file_path):
+        """
+        :param VerificationReference reference: as returned by read_reference for the original movie file
+        :param Path dst_movie_file_path: the modified movie file
+        :rtype bool, str:
+        """
+        src_movie_file_path = reference.movie_file_path
+        dst_probe = probe_movie(dst_movie_file_path, use_ffprobe=True)
+        is_valid, error_message = self._check_headers(reference, dst_movie_file_path, dst_probe)
+        if not is_valid or self.depth == VerificationDepth.HEADER:
+            return is_valid, error_message
+        if self.depth == VerificationDepth.FULL:
+            src_packets = reference.packets
+            dst_packets = self._read_packets(dst_movie_file_path)
+            if sorted(src_packets.keys()) != sorted(dst_packets.keys()):
+                return False, 'the packets of %s belong to streams %s, whereas those of %s belong to streams %s' % (src_movie_file_path, sorted(src_packets.keys()), dst_movie_file_path, sorted(dst_packets.keys()))
+            for stream_index in src_packets.keys():
+                # the interleaving of the streams may change, but not the sequence of packets of each stream
+                if [packet[1:] for packet in src_packets[stream_index]] != [packet[1:] for packet in dst_packets[stream_index]]:
+                    return False, 'the packets of stream #%d differ between %s (%d packets) and %s (%d packets)' % (stream_index, src_movie_file_path, len(src_packets[stream_index]), dst_movie_file_path, len(dst_packets[stream_index]))
+            return True, ""
+        if reference.packets is None:
+            return False, "the duration of %s is unknown, packets can't be sampled" % src_movie_file_path
+        for stream_index, src_packets in reference.packets.items():
+            dst_packets = self._read_packets(dst_movie_file_path, reference.read_intervals, stream_index).get(stream_index, [])
+            if not self._sampled_packets_match(src_packets, dst_packets, reference.window_start_times, self.num_sample_packets):
+                return False, 'the packets of stream #%d differ between %s (%d packets read) and %s (%d packets read)' % (stream_index, src_movie_file_path, len(src_packets), dst_movie_file_path, len(dst_packets))
+        return True, ""
+
+    @staticmethod
+    def _check_headers(reference, dst_movie_file_path, dst_probe):
+        src_movie_file_path = reference.movie_file_path
+        src_probe = reference.probe
+        src_streams = [(stream.codec_type, stream.codec_name) for stream in src_probe.streams]
+        dst_streams = [(stream.codec_type, stream.codec_name) for stream in dst_probe.streams]
+        if src_streams != dst_streams:
+            return False, 'the streams of %s %s differ from the streams of %s %s' % (src_movie_file_path, src_streams, dst_movie_file_path, dst_streams)
+        durations = [(src_probe.duration, dst_probe.duration)] + [(src_stream.duration, dst_stream.duration) for src_stream, dst_stream in zip(src_probe.streams, dst_probe.streams)]
+        for src_duration, dst_duration in durations:
+            # remuxing may slightly change the durations that the containers tell
+            if src_duration is not None and dst_duration is not None and abs(src_duration - dst_duration) > max(0.5, 0.005 * src_duration):
+                return False, 'the duration of %s (%f s) differs from the duration of %s (%f s)' % (src_movie_file_path, src_duration, dst_movie_file_path, dst_duration)
+        for src_stream, dst_stream in zip(src_probe.streams, dst_probe.streams):
+            if src_stream.num_frames is not None and dst_stream.num_frames is not None and src_stream.num_frames != dst_stream.num_frames:
+                return False, 'stream #%d has %d frames in %s and %d frames in %s' % (src_stream.stream_index, src_stream.num_frames, src_movie_file_path, dst_stream.num_frames, dst_movie_file_path)
+        src_file_size = reference.file_size
+        dst_file_size = dst_movie_file_path.expanduser().stat().st_size
+        # the container overhead may change, but not the media data
+        if abs(src_file_size - dst_file_size) > max(64 * 1024, 0.02 * src_file_size):
+            return False, 'the size of %s (%d bytes) is too different from the size of %s (%d bytes)' % (dst_movie_file_path, dst_file_size, src_movie_file_path, src_file_size)
+        return True, ""
+
+    @staticmethod
+    def _read_packets(movie_file_path, read_intervals=None, stream_index=None):
+        """
+        :param Path movie_file_path:
+        :param str or None read_intervals: the ffprobe -read_intervals option, or None to read all the packets
+        :param int or None stream_index: the stream whose packets are read, or None to read the packets of all the streams
+        :rtype dict(int, list((str, str, str))): the (timestamp, size, data hash) of the packets read, for each stream index
+        """
+        command = ['ffprobe', '-v', 'error', '-show_data_hash', 'CRC32', '-show_entries', 'packet=stream_index,pts_time,dts_time,size,data_hash', '-print_format', 'compact']
+        if read_intervals is not None:
+            command += ['-read_intervals', read_intervals]
+        if stream_index is not None:
+            command += ['-select_streams', '%d' % stream_index]
+        command.append(movie_file_path.expanduser())
+        completed_process = execute_command(command)
+        assert completed_process.returncode == 0, completed_process.stderr
+        packets = {}
+        for line in completed_process.stdout.split(b'\n'):
+            # packet|stream_index=1|pts_time=12.345000|dts_time=12.345000|size=418|data_hash=CRC32:5e0a3f6d
+            fields = dict([field.split(b'=', 1) for field in line.strip().split(b'|')[1:] if b'=' in field])
+            if b'stream_index' not in fields:
+                continue
+            # the packets of some containers (eg the b-frames of avi files) have no presentation timestamp
+            timestamp = fields.get(b'pts_time', b'N/A')
+            if timestamp == b'N/A':
+                timestamp = fields.get(b'dts_time', b'N/A')
+            if timestamp != b'N/A':
+                # the time bases of both movie files may differ
+                timestamp = b'%.3f' % float(timestamp)
+            packets.setdefault(int(fields[b'stream_index']), []).append((str(timestamp, encoding='ascii'), str(fields.get(b'size', b''), encoding='ascii'), str(fields.get(b'data_hash', b''), encoding='ascii')))
+        return packets
+
+    @staticmethod
+    def _sampled_packets_match(src_packets, dst_packets, window_start_times, max_num_window_packets=None):
+        """
+        :param list((str, str, str)) src_packets: the (timestamp, size, data hash) of the packets of a stream, read at the sampled positions of the original movie file
+        :param list((str, str, str)) dst_packets: the same for the modified movie file
+        :param list(float) window_start_times: the time at which each sample window starts
+        :param int or None max_num_window_packets: the maximum number of packets compared in each sample window, or None to compare all the packets read
+        :rtype bool: True if the packets of both movie files match
+
+        the seek may land on different packets in both movie files (their indexes may differ), so only the packets whose timestamps are within the time range read in both movie files are compared, by timestamp
+        """
+        if len(src_packets) == 0 or len(dst_packets) == 0:
+            return len(src_packets) == len(dst_packets)
+        if any(packet[0] == 'N/A' for packet in src_packets + dst_packets):
+            # without timestamps, the packet sequences are aligned on the first packet they share
+            src_packets = [packet[1:] for packet in src_packets]
+            dst_packets = [packet[1:] for packet in dst_packets]
+            for src_start in range(len(src_packets)):
+                if src_packets[src_start] in dst_packets:
+                    dst_start = dst_packets.index(src_packets[src_start])
+                    overlap_size = min(len(src_packets) - src_start, len(dst_packets) - dst_start)
+                    return src_packets[src_start:src_start + overlap_size] == dst_packets[dst_start:dst_start + overlap_size] and overlap_size * 2 >= min(len(src_packets), len(dst_packets))
+            return False
+        src_windows = MovieVerifier._split_sample_windows(src_packets, window_start_times, max_num_window_packets)
+        dst_windows = MovieVerifier._split_sample_windows(dst_packets, window_start_times, max_num_window_packets)
+        num_compared_packets = 0
+        for src_window, dst_window in zip(src_windows, dst_windows):
+            if len(src_window) == 0 or len(dst_window) == 0:
+                if len(src_window) != len(dst_window):
+                    return False
+                continue
+            # only the time range read in both movie files is compared
+            overlap_start = max(min(src_window.keys()), min(dst_window.keys()))
+            overlap_end = min(max(src_window.keys()), max(dst_window.keys()))
+            src_overlap = dict([(timestamp, packets) for timestamp, packets in src_window.items() if overlap_start <= timestamp <= overlap_end])
+            dst_overlap = dict([(timestamp, packets) for timestamp, packets in dst_window.items() if overlap_start <= timestamp <= overlap_end])
+            if src_overlap != dst_overlap:
+                return False
+            num_compared_packets += sum([len(packets) for packets in src_overlap.values()])
+        num_src_packets = sum([len(packets) for window in src_windows for packets in window.values()])
+        num_dst_packets = sum([len(packets) for window in dst_windows for packets in window.values()])
+        return num_compared_packets * 2 >= min(num_src_packets, num_dst_packets)
+
+    @staticmethod
+    def _split_sample_windows(packets, window_start_times, max_num_window_packets=None):
+        """
+        :param list((str, str, str)) packets: the (timestamp, size, data hash) of the packets read at the sampled positions
+        :param list(float) window_start_times: the time at which each sample window starts
+        :param int or None max_num_window_packets: if not None, only the first packets (in time) of each window are kept, up to this number
+        :rtype list(dict(float, list((str, str)))): the (size, data hash) of the packets of each sample window, for each timestamp
+        """
+        windows = [{} for _ in window_start_times]
+        for timestamp, size, data_hash in packets:
+            timestamp = float(timestamp)
+            # the packets are assigned to the window that starts the nearest, as the seek may land a bit before the start of the window
+            window_index = min(range(len(window_start_times)), key=lambda i: abs(timestamp - window_start_times[i]))
+            windows[window_index].setdefault(timestamp, []).append((size, data_hash))
+        if max_num_window_packets is not None:
+            for window_index, window in enumerate(windows):
+                kept_window = {}
+                num_kept_packets = 0
+                for timestamp in sorted(window.keys()):
+                    if num_kept_packets >= max_num_window_packets:
+                        break
+                    kept_window[timestamp] = window[timestamp]
+                    num_kept_packets += len(window[timestamp])
+                windows[window_index] = kept_window
+        return windows
+
+
+class ModificationReport:
+    """
+    records how a movie file has been modified
+    """
+
+    def __init__(self, movie_file_path):
+        """
+        :param Path movie_file_path:
+        """
+        self.movie_file_path = movie_file_path
+        self.edit_strategy = None  # 'unchanged', 'in place' or 'remux'
+        self.backup_file_path = None
+        self.backup_strategy_name = None  # the name of the IBackupStrategy that created the backup, or 'undo record' if only the overwritten bytes were saved
+        self.num_rewritten_bytes = 0  # the bytes of the movie file that had to be written to modify it
+
+    def __str__(self):
+        if self.edit_strategy == 'unchanged':
+            return "%s unchanged : it already has the requested metadata" % self.movie_file_path
+        if self.backup_file_path is None:
+            return "%s modified (%s), no backup" % (self.movie_file_path, self.edit_strategy)
+        return "%s modified (%s), backup : %s (%s)" % (self.movie_file_path, self.edit_strategy, self.backup_file_path, self.backup_strategy_name)
+
+
+class JournalPhase(Enum):
+    PROBED = auto()  # the modification is planned ; the movie file is untouched
+    BACKING_UP = auto()  # the backup is being created ; the movie file is untouched
+    BACKED_UP = auto()
+    MODIFIED = auto()  # the movie file is patched or remuxed, but not verified yet
+    PATCHING = auto()  # the movie file is being patched in place ; the undo record of the entry restores it
+    REMUXING = auto()  # the movie file is being remuxed into a temporary file ; the movie file is untouched
+    VERIFIED = auto()
+    DONE = auto()  # the backup is dropped if it has to, and the modification is over
+    ROLLED_BACK = auto()  # an interrupted modification has been undone by restoring the backup
+
+
+DEFAULT_JOURNAL_DIR_PATH = Path('~/.cache/videfix/journals')
+
+
+def get_default_journal_file_path(movie_file_paths, recursive_dir_paths):
+    """
+    :param list(str) movie_file_paths:
+    :param list(str) recursive_dir_paths:
+    :rtype Path: the journal of the runs of modify-metadata on these video files and directories, so that the runs on other video files don't share it
+    """
+    target_paths = sorted(set([os.path.abspath(os.path.expanduser(path)) for path in movie_file_paths + recursive_dir_paths]))
+    return DEFAULT_JOURNAL_DIR_PATH / ('modify_metadata_%08x.jsonl' % zlib.crc32('\n'.join(target_paths).encode('utf-8')))
+
+
+class ModificationJournal:
+    """
+    a write-ahead journal of the phases of the modifications of movie files, so that an interrupted batch can be resumed
+
+    each phase is appended to the journal file as a json line, and flushed to the storage before the next phase starts. The journal file can be shared by several processes, as each line is appended with a single write.
+    """
+
+    def __init__(self, journal_file_path):
+        """
+        :param Path journal_file_path:
+        """
+        self.journal_file_path = journal_file_path.expanduser()
+        self.journal_file_path.parent.mkdir(parents=True, exist_ok=True)
+        self.journal_fd = os.open(self.journal_file_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def lock(self):
+        """
+        makes sure that no other run uses this journal, until it's closed (the worker processes of the run don't lock it)
+        """
+        try:
+            fcntl.flock(self.journal_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            assert False, 'the journal %s is used by another run' % self.journal_file_path
+
+    def get_unfinished_file_paths(self):
+        """
+        :rtype list(str): the movie files whose modification has been interrupted, which a resume would finish or roll back
+        """
+        return [path for path, entry in self.read_last_entries().items() if entry['phase'] not in ['done', 'rolled_back']]
+
+    def clear(self, discard_unfinished=False):
+        """
+        forgets the modifications of the previous batches
+
+        :param bool discard_unfinished: if False, the journal is only cleared if none of its modifications is unfinished, as they couldn't be resumed anymore
+        """
+        if not discard_unfinished:
+            unfinished_file_paths = self.get_unfinished_file_paths()
+            assert len(unfinished_file_paths) == 0, 'the journal %s records %d unfinished modifications (eg %s)' % (self.journal_file_path, len(unfinished_file_paths), unfinished_file_paths[0])
+        os.ftruncate(self.journal_fd, 0)
+
+    def close(self):
+        os.close(self.journal_fd)
+
+    def record(self, movie_file_path, phase, **details):
+        """
+        :param Path movie_file_path:
+        :param JournalPhase phase:
+        :param dict details: what is needed to resume the modification from this phase (eg the backup file path)
+        """
+        entry = {'path': os.path.abspath(movie_file_path.expanduser()), 'phase': phase.name.lower()}
+        entry.update(details)
+        os.write(self.journal_fd, (json.dumps(entry) + '\n').encode('utf-8'))
+        os.fsync(self.journal_fd)
+
+    def read_last_entries(self):
+        """
+        :rtype dict(str, dict): the last journal entry of each movie file, indexed by its absolute path
+        """
+        last_entries = {}
+        with open(self.journal_file_path, 'r', encoding='utf-8') as journal_file:
+            for line in journal_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # the last line may have been cut by a crash
+                    continue
+                last_entries[entry['path']] = entry
+        return last_entries
+
+    def resume(self, movie_file_path, last_entries):
+        """
+        brings a movie file back to a consistent state after an interrupted batch : an unfinished modification is either finished (if it was already verified) or rolled back
+
+        :param Path movie_file_path:
+        :param dict(str, dict) last_entries: as returned by read_last_entries
+        :rtype bool: True if the modification of this movie file is over, in which case it doesn't have to be done again
+        """
+        entry = last_entries.get(os.path.abspath(movie_file_path.expanduser()))
+        if entry is None:
+            return False
+        phase = JournalPhase[entry['phase'].upper()]
+        if phase == JournalPhase.DONE:
+            # the movie file may have been modified again since then
+            movie_file_stat = movie_file_path.expanduser().stat()
+            return (movie_file_stat.st_size, movie_file_stat.st_mtime_ns) == (entry['size'], entry['mtime_ns'])
+        temporary_file_path = Path(entry['temporary_file_path']) if entry.get('temporary_file_path') is not None else None
+        if phase == JournalPhase.VERIFIED:
+            if temporary_file_path is not None and temporary_file_path.exists():
+                # the verified temporary file hasn't replaced the movie file yet
+                os.replace(temporary_file_path, movie_file_path.expanduser())
+                MOVIE_PROBE_CACHE.invalidate(movie_file_path)
+            if entry['drop_backup'] and entry['backup_file_path'] is not None and Path(entry['backup_file_path']).exists():
+                Path(entry['backup_file_path']).unlink()
+            self.record_done(movie_file_path)
+            return True
+        if phase == JournalPhase.BACKING_UP:
+            # the backup may be incomplete, but the movie file is untouched
+            if Path(entry['backup_file_path']).exists():
+                Path(entry['backup_file_path']).unlink()
+        if temporary_file_path is not None and temporary_file_path.exists():
+            # the movie file is untouched, the temporary file is remuxed again
+            temporary_file_path.unlink()
+            return False
+        if phase == JournalPhase.PATCHING:
+            # the movie file may be partially patched : the bytes that the patches overwrite are restored
+            apply_undo_record(movie_file_path, entry['undo_record'])
+            MOVIE_PROBE_CACHE.invalidate(movie_file_path)
+            if entry['backup_file_path'] is not None and Path(entry['backup_file_path']).exists():
+                Path(entry['backup_file_path']).unlink()
+            self.record(movie_file_path, JournalPhase.ROLLED_BACK, backup_file_path=entry['backup_file_path'])
+            print(RED, "the interrupted modification of %s has been rolled back" % movie_file_path, RESET)
+        if phase in [JournalPhase.BACKED_UP, JournalPhase.MODIFIED] and entry.get('destination_file_path') == entry['backup_file_path']:
+            # the backup was being modified (BackupMode.MODIFY_BACKUP) : the movie file is untouched, and the backup may be half written
+            backup_file_path = Path(entry['backup_file_path'])
+            if backup_file_path.exists():
+                backup_file_path.unlink()
+            self.record(movie_file_path, JournalPhase.ROLLED_BACK, backup_file_path=str(backup_file_path))
+            print(RED, "the interrupted modification of %s has been rolled back" % movie_file_path, RESET)
+        elif phase in [JournalPhase.BACKED_UP, JournalPhase.MODIFIED]:
+            # the movie file may be half written, but the backup has its original content
+            backup_file_path = Path(entry['backup_file_path'])
+            assert backup_file_path.exists(), 'the modification of %s has been interrupted, but its backup %s is missing' % (movie_file_path, backup_file_path)
+            os.replace(backup_file_path, movie_file_path.expanduser())
+            MOVIE_PROBE_CACHE.invalidate(movie_file_path)
+            self.record(movie_file_path, JournalPhase.ROLLED_BACK, backup_file_path=str(backup_file_path))
+            print(RED, "the interrupted modification of %s has been rolled back" % movie_file_path, RESET)
+        return False
+
+    def record_done(self, movie_file_path):
+        """
+        :param Path movie_file_path: a movie file whose modification is over
+        """
+        movie_file_stat = movie_file_path.expanduser().stat()
+        self.record(movie_file_path, JournalPhase.DONE, size=movie_file_stat.st_size, mtime_ns=movie_file_stat.st_mtime_ns)
+
+
+class ModificationPlan:
+    """
+    how modify_movie_metadata modifies a movie file, worked out from the headers of the movie file without modifying it
+    """
+
+    def __init__(self, movie_file_path, modifiers, backup_mode):
+        """
+        :param Path movie_file_path:
+        :param list(IMetadataModifier) modifiers: the modifiers that have something to do
+        :param BackupMode backup_mode:
+        """
+        self.movie_file_path = movie_file_path
+        self.modifiers = modifiers
+        self.backup_mode = backup_mode
+        self.edit_strategy = None  # 'unchanged', 'in place' or 'remux'
+        self.metadata_edit = None  # the MovieMetadataEdit of the modifiers, if they can all describe their change with it
+        self.in_place_editor = None  # the IInPlaceEditor that patches the movie file, if it can be patched in place
+        self.patches = None  # the (offset, data) writes of the in place editor, if the movie file can be patched in place
+        self.backup_strategies = []  # the IBackupStrategy tried in order to create the backup, if there's one
+
+
+def plan_movie_modification(movie_file_path, modifiers, backup_mode=BackupMode.MODIFY_ORIGINAL):
+    """
+    works out how modify_movie_metadata would modify a movie file : the modifiers that have something to do, and whether the movie file is patched in place or remuxed
+
+    :param Path movie_file_path:
+    :param list(IMetadataModifier) modifiers:
+    :param BackupMode backup_mode:
+    :rtype ModificationPlan:
+    """
+    assert isinstance(movie_file_path, Path)
+    for modifier in modifiers:
+        is_suitable, error_message = modifier.movie_is_suitable(movie_file_path)
+        if not is_suitable:
+            assert False, error_message
+
+    modification_plan = ModificationPlan(movie_file_path, [modifier for modifier in modifiers if not modifier.is_applied(movie_file_path)], backup_mode)
+    if len(modification_plan.modifiers) == 0:
+        # the movie file is left untouched, without even a backup
+        modification_plan.edit_strategy = 'unchanged'
+        return modification_plan
+
+    # when possible, the metadata are patched in place instead of remuxing the whole movie file
+    metadata_edit = MovieMetadataEdit()
+    if all([modifier.update_metadata_edit(metadata_edit) for modifier in modification_plan.modifiers]):
+        modification_plan.metadata_edit = metadata_edit
+        modification_plan.in_place_editor = get_in_place_editor(get_movie_container_type(movie_file_path))
+        if modification_plan.in_place_editor is not None:
+            modification_plan.patches = modification_plan.in_place_editor.get_patches(movie_file_path, metadata_edit)
+    if modification_plan.patches is not None:
+        modification_plan.edit_strategy = 'in place'
+        if backup_mode == BackupMode.MODIFY_BACKUP:
+            # the backup is patched, so it can't share the data of the movie file
+            modification_plan.backup_strategies = [ReflinkBackupStrategy(), CopyBackupStrategy()]
+        # otherwise, the movie file is patched in place : only the bytes that the patches overwrite are saved (see read_undo_record)
+    else:
+        modification_plan.edit_strategy = 'remux'
+        # the remux writes a new file, so the backup can share the data of the original file
+        if backup_mode == BackupMode.MODIFY_BACKUP:
+            modification_plan.backup_strategies = [ReflinkBackupStrategy(), HardlinkBackupStrategy(), CopyBackupStrategy()]
+        elif backup_mode == BackupMode.MODIFY_ORIGINAL:
+            modification_plan.backup_strategies = [HardlinkBackupStrategy(), ReflinkBackupStrategy(), CopyBackupStrategy()]
+    return modification_plan
+
+
+def modify_movie_metadata(movie_file_path, modifiers, movie_verifier=None, journal=None, backup_mode=BackupMode.MODIFY_ORIGINAL):
+    """
+    :param Path movie_file_path:
+    :param list(IMetadataModifier) modifiers: the modifiers that the movie file already complies with are skipped, and so is the movie file if it complies with all of them
+    :param MovieVerifier or None movie_verifier: checks the content of the modified movie file ; by default, sampled packets are compared
+    :param ModificationJournal or None journal: if not None, records the phases of the modification, so that it can be resumed if it's interrupted
+    :param BackupMode backup_mode: MODIFY_ORIGINAL keeps the original content in a backup file (only the overwritten bytes, in an undo record file, when the movie file is patched in place), MODIFY_BACKUP modifies a copy of the movie file, NO_BACKUP keeps nothing
+    :rtype ModificationReport:
+    """
+    assert isinstance(movie_file_path, Path)
+
+    with measure_stage('plan'):
+        modification_plan = plan_movie_modification(movie_file_path, modifiers, backup_mode)
+    modifiers = modification_plan.modifiers
+    patches = modification_plan.patches
+    in_place_editor = modification_plan.in_place_editor
+    metadata_edit = modification_plan.metadata_edit
 
-    for modifier in modifiers:
-        command += modifier.get_ffmpeg_options(movie_file_path)
+    if modification_plan.edit_strategy == 'unchanged':
+        if journal is not None:
+            journal.record_done(movie_file_path)
+        modification_report = ModificationReport(movie_file_path)
+        modification_report.edit_strategy = 'unchanged'
+        return modification_report
+    if journal is not None:
+        journal.record(movie_file_path, JournalPhase.PROBED)
+    if patches is None and backup_mode != BackupMode.MODIFY_BACKUP:
+        return _remux_movie_atomically(movie_file_path, modifiers, movie_verifier, journal, backup_mode, modification_plan.backup_strategies)
+    if patches is not None and backup_mode != BackupMode.MODIFY_BACKUP:
+        return _patch_movie_in_place(modification_plan, movie_verifier, journal)
 
-    command.append(dst_movie_file_path.expanduser())
+    # the backup is modified, and the movie file is left untouched
+    assert backup_mode == BackupMode.MODIFY_BACKUP
 
-    # ffmpeg -i input.mp4 -map 0 -codec copy -metadata:s:a:0 language=eng -metadata:s:a:1 language=rus output.mp4
-    completed_process = execute_command(command)
-    assert completed_process.returncode == 0, completed_process.stderr
+    backup_strategies = modification_plan.backup_strategies
+    movie_backup_file_path = get_backup_file_path(movie_file_path)
+    if journal is not None:
+        journal.record(movie_file_path, JournalPhase.BACKING_UP, backup_file_path=os.path.abspath(movie_backup_file_path.expanduser()))
+    with measure_stage('backup'):
+        movie_backup_file_path, backup_strategy = create_backup(movie_file_path, backup_strategies, movie_backup_file_path)
+    modification_report = ModificationReport(movie_file_path)
+    modification_report.backup_file_path = movie_backup_file_path
+    modification_report.backup_strategy_name = backup_strategy.name
+
+    src_movie_file_path = movie_file_path
+    dst_movie_file_path = movie_backup_file_path
+    # on resume, the file being written is the one that may be half written
+    source_and_destination = {'source_file_path': os.path.abspath(src_movie_file_path.expanduser()), 'destination_file_path': os.path.abspath(dst_movie_file_path.expanduser())}
+    if journal is not None:
+        journal.record(movie_file_path, JournalPhase.BACKED_UP, backup_file_path=os.path.abspath(movie_backup_file_path.expanduser()), backup_strategy=backup_strategy.name, **source_and_destination)
+    if patches is not None:
+        with measure_stage('patch'):
+            # the destination is still identical to the source at this point
+            apply_file_patches(dst_movie_file_path, patches)
+            MOVIE_PROBE_CACHE.invalidate(dst_movie_file_path)
+            # a cheap check of the headers, before the checks of the modifiers, which probe the whole movie file
+            patch_succeeded, error_message = in_place_editor.check_patched_movie(dst_movie_file_path, metadata_edit)
+            assert patch_succeeded, error_message
+        modification_report.edit_strategy = 'in place'
+        modification_report.num_rewritten_bytes = sum([len(patch_data) for _, patch_data in patches])
+    else:
+        with measure_stage('remux'), DEVICE_SCHEDULER.rewrite_slot(movie_file_path) as device_slot:
+            if backup_strategy.shares_original_file:
+                # ffmpeg must write a new file instead of overwriting the data shared by the source and the destination
+                dst_movie_file_path.unlink()
+            remux_movie(src_movie_file_path, dst_movie_file_path, movie_file_path, modifiers)
+            device_slot.num_written_bytes = dst_movie_file_path.expanduser().stat().st_size
+        modification_report.edit_strategy = 'remux'
+        modification_report.num_rewritten_bytes = dst_movie_file_path.stat().st_size
+    if backup_strategy.copies_data:
+        # copying the movie file rewrites it too
+        modification_report.num_rewritten_bytes += movie_backup_file_path.stat().st_size
+    if journal is not None:
+        journal.record(movie_file_path, JournalPhase.MODIFIED, backup_file_path=os.path.abspath(movie_backup_file_path.expanduser()), edit_strategy=modification_report.edit_strategy, **source_and_destination)
 
     check_result = True
     if check_result:
-        for modifier in modifiers:
-            modification_succeeded, error_message = modifier.check_modified_movie(dst_movie_file_path)
-            if not modification_succeeded:
-                assert False, error_message
+        with measure_stage('check'):
+            for modifier in modifiers:
+                modification_succeeded, error_message = modifier.check_modified_movie(dst_movie_file_path)
+                if not modification_succeeded:
+                    assert False, error_message
 
-
-        src_file_size = src_movie_file_path.stat().st_size
-        dst_file_size = dst_movie_file_path.stat().st_size
-        # print(src_file_size, dst_file_size)
-        assert 0.99 < float(dst_file_size)/float(src_file_size) < 1.02
-        # assert abs(src_file_size - dst_file_size) < 1000
+        with measure_stage('verify'):
+            if movie_verifier is None:
+                movie_verifier = MovieVerifier()
+            content_is_preserved, error_message = movie_verifier.verify(src_movie_file_path, dst_movie_file_path)
+            assert content_is_preserved, error_message
 
         # src_metadata = read_movie_metadata(src_movie_file_path)
         # dst_metadata = read_movie_metadata(dst_movie_file_path)
+    if journal is not None:
+        journal.record(movie_file_path, JournalPhase.VERIFIED, backup_file_path=os.path.abspath(movie_backup_file_path.expanduser()), drop_backup=False)
+        journal.record_done(movie_file_path)
+
+    return modification_report
+
+
+def _patch_movie_in_place(modification_plan, movie_verifier, journal):
+    """
+    patches the headers of a movie file in place, without copying it : the bytes that the patches overwrite are saved in an undo record instead, which restores the movie file if the modification fails or is interrupted
+
+    the undo record is kept in the journal, and also in a small file next to the movie file when a backup is requested (see restore_undo_record_file).
+
+    :param ModificationPlan modification_plan: the plan of an in place modification, with MODIFY_ORIGINAL or NO_BACKUP
+    :param MovieVerifier or None movie_verifier:
+    :param ModificationJournal or None journal:
+    :rtype ModificationReport:
+    """
+    movie_file_path = modification_plan.movie_file_path
+    patches = modification_plan.patches
+    if movie_verifier is None:
+        movie_verifier = MovieVerifier()
+    modification_report = ModificationReport(movie_file_path)
+    modification_report.edit_strategy = 'in place'
+    with measure_stage('verify'):
+        # the original content doesn't survive the patch, so it's read beforehand
+        verification_reference = movie_verifier.read_reference(movie_file_path)
+    undo_record = read_undo_record(movie_file_path, patches)
+    undo_record_file_path = None
+    if modification_plan.backup_mode == BackupMode.MODIFY_ORIGINAL:
+        undo_record_file_path = get_backup_file_path(movie_file_path, movie_file_path.suffix + UNDO_RECORD_FILE_SUFFIX)
+        if journal is not None:
+            journal.record(movie_file_path, JournalPhase.BACKING_UP, backup_file_path=os.path.abspath(undo_record_file_path.expanduser()))
+        with measure_stage('backup'):
+            write_undo_record_file(undo_record_file_path, undo_record)
+        modification_report.backup_file_path = undo_record_file_path
+        modification_report.backup_strategy_name = 'undo record'
+    backup_file_path = os.path.abspath(undo_record_file_path.expanduser()) if undo_record_file_path is not None else None
+    if journal is not None:
+        journal.record(movie_file_path, JournalPhase.PATCHING, backup_file_path=backup_file_path, undo_record=undo_record)
+    try:
+        with measure_stage('patch'):
+            apply_file_patches(movie_file_path, patches)
+            MOVIE_PROBE_CACHE.invalidate(movie_file_path)
+            # a cheap check of the headers, before the checks of the modifiers, which probe the whole movie file
+            patch_succeeded, error_message = modification_plan.in_place_editor.check_patched_movie(movie_file_path, modification_plan.metadata_edit)
+            assert patch_succeeded, error_message
+        modification_report.num_rewritten_bytes = sum([len(patch_data) for _, patch_data in patches])
+
+        with measure_stage('check'):
+            for modifier in modification_plan.modifiers:
+                modification_succeeded, error_message = modifier.check_modified_movie(movie_file_path)
+                assert modification_succeeded, error_message
+
+        with measure_stage('verify'):
+            content_is_preserved, error_message = movie_verifier.verify_reference(verification_reference, movie_file_path)
+            assert content_is_preserved, error_message
+    except BaseException:
+        # the movie file is restored, and the undo record file is not needed anymore
+        apply_undo_record(movie_file_path, undo_record)
+        MOVIE_PROBE_CACHE.invalidate(movie_file_path)
+        if undo_record_file_path is not None:
+            undo_record_file_path.expanduser().unlink()
+        if journal is not None:
+            journal.record(movie_file_path, JournalPhase.ROLLED_BACK, backup_file_path=backup_file_path)
+        raise
+    if journal is not None:
+        journal.record(movie_file_path, JournalPhase.VERIFIED, backup_file_path=backup_file_path, drop_backup=False)
+        journal.record_done(movie_file_path)
+    return modification_report
+
+
+def _remux_movie_atomically(movie_file_path, modifiers, movie_verifier, journal, backup_mode, backup_strategies):
+    """
+    remuxes a movie file into a temporary file next to it, which replaces the movie file once verified
+
+    the movie file is written only once (instead of being copied to a backup then remuxed from it), and it's never seen partially written. The original movie file is kept as a hardlink when a backup is requested.
+
+    :param Path movie_file_path:
+    :param list(IMetadataModifier) modifiers:
+    :param MovieVerifier or None movie_verifier:
+    :param ModificationJournal or None journal:
+    :param BackupMode backup_mode: MODIFY_ORIGINAL or NO_BACKUP
+    :param list(IBackupStrategy) backup_strategies: the strategies tried to create the backup, with MODIFY_ORIGINAL
+    :rtype ModificationReport:
+    """
+    modification_report = ModificationReport(movie_file_path)
+    modification_report.edit_strategy = 'remux'
+    temporary_file_path = get_temporary_file_path(movie_file_path)
+    if journal is not None:
+        journal.record(movie_file_path, JournalPhase.REMUXING, temporary_file_path=os.path.abspath(temporary_file_path.expanduser()))
+    try:
+        with measure_stage('remux'), DEVICE_SCHEDULER.rewrite_slot(movie_file_path) as device_slot:
+            remux_movie(movie_file_path, temporary_file_path, movie_file_path, modifiers)
+            device_slot.num_written_bytes = temporary_file_path.expanduser().stat().st_size
+        modification_report.num_rewritten_bytes = device_slot.num_written_bytes
+
+        with measure_stage('check'):
+            for modifier in modifiers:
+                modification_succeeded, error_message = modifier.check_modified_movie(temporary_file_path)
+                assert modification_succeeded, error_message
+
+        with measure_stage('verify'):
+            if movie_verifier is None:
+                movie_verifier = MovieVerifier()
+            content_is_preserved, error_message = movie_verifier.verify(movie_file_path, temporary_file_path)
+            assert content_is_preserved, error_message
+
+        # the temporary file was created with the umask and the owner of this process
+        copy_file_attributes(movie_file_path, temporary_file_path)
+
+        if backup_mode == BackupMode.MODIFY_ORIGINAL:
+            movie_backup_file_path = get_backup_file_path(movie_file_path)
+            if journal is not None:
+                journal.record(movie_file_path, JournalPhase.BACKING_UP, backup_file_path=os.path.abspath(movie_backup_file_path.expanduser()), temporary_file_path=os.path.abspath(temporary_file_path.expanduser()))
+            with measure_stage('backup'):
+                # the original movie file is about to be unlinked by the rename, so the backup can share its data
+                movie_backup_file_path, backup_strategy = create_backup(movie_file_path, backup_strategies, movie_backup_file_path)
+            modification_report.backup_file_path = movie_backup_file_path
+            modification_report.backup_strategy_name = backup_strategy.name
+            if backup_strategy.copies_data:
+                modification_report.num_rewritten_bytes += movie_backup_file_path.stat().st_size
+    except BaseException:
+        # the movie file is untouched
+        if temporary_file_path.expanduser().exists():
+            temporary_file_path.expanduser().unlink()
+        raise
+    # from now on, an interrupted modification is finished on resume
+    if journal is not None:
+        journal.record(movie_file_path, JournalPhase.VERIFIED, backup_file_path=os.path.abspath(modification_report.backup_file_path.expanduser()) if modification_report.backup_file_path is not None else None, temporary_file_path=os.path.abspath(temporary_file_path.expanduser()), drop_backup=False)
+    os.replace(temporary_file_path.expanduser(), movie_file_path.expanduser())
+    MOVIE_PROBE_CACHE.invalidate(movie_file_path)
+    MOVIE_PROBE_CACHE.invalidate(temporary_file_path)
+    if journal is not None:
+        journal.record_done(movie_file_path)
+    return modification_report
+
+
+class ModificationQueue:
+    """
+    modifies movie files on background worker threads, so that the user can keep answering prompts while the movie files are being modified
+    """
+
+    def __init__(self, jobs=1, queue_size=16, movie_verifier=None, stats_collector=None, journal=None, backup_mode=BackupMode.MODIFY_ORIGINAL):
+        """
+        :param int jobs: the number of movie files modified concurrently
+        :param int queue_size: the maximum number of movie files waiting to be modified ; submit blocks when this number is reached
+        :param MovieVerifier or None movie_verifier: checks the content of the modified movie files
+        :param StatsCollector or None stats_collector: if not None, measures the resources used by the modification of each movie file
+        :param ModificationJournal or None journal: if not None, records the phases of the modification of each movie file
+        :param BackupMode backup_mode:
+        """
+        self.movie_verifier = movie_verifier
+        self.stats_collector = stats_collector
+        self.journal = journal
+        self.backup_mode = backup_mode
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=jobs)
+        self.free_slots = threading.BoundedSemaphore(jobs + queue_size)
+        self.futures = []  # (movie_file_path, future)
+        self.print_lock = threading.Lock()
+
+    def submit(self, movie_file_path, modifiers):
+        """
+        :param Path movie_file_path:
+        :param list(IMetadataModifier) modifiers:
+        """
+        if not self.free_slots.acquire(blocking=False):
+            with self.print_lock:
+                print("waiting for the modification of the queued video files...")
+            self.free_slots.acquire()
+        self.futures.append((movie_file_path, self.executor.submit(self._modify_movie_metadata, movie_file_path, modifiers)))
+
+    def _modify_movie_metadata(self, movie_file_path, modifiers):
+        try:
+            with measure_movie(self.stats_collector, movie_file_path) as movie_stats:
+                modification_report = modify_movie_metadata(movie_file_path, modifiers, self.movie_verifier, self.journal, self.backup_mode)
+                if movie_stats is not None:
+                    movie_stats.num_rewritten_bytes = modification_report.num_rewritten_bytes
+            with self.print_lock:
+                print("%s%s%s" % (GREEN, modification_report, RESET))
+            return modification_report
+        except Exception as e:
+            with self.print_lock:
+                print(RED, "failed to modify %s : %s" % (movie_file_path, e), RESET)
+            raise
+        finally:
+            if self.stats_collector is not None:
+                self.stats_collector.finish_movie(movie_file_path)
+            self.free_slots.release()
+
+    def join(self):
+        """
+        waits for the modification of all the submitted movie files
+
+        :rtype list((Path, ModificationReport or None, Exception or None)): the outcome of each modification, in submission order
+        """
+        self.executor.shutdown(wait=True)
+        results = []
+        for movie_file_path, future in self.futures:
+            try:
+                results.append((movie_file_path, future.result(), None))
+            except Exception as e:
+                results.append((movie_file_path, None, e))
+        return results
+
+
+class ManifestRow:
+    """
+    a row of a manifest : the metadata that a movie file is expected to have
+    """
+
+    def __init__(self, line_number, movie_file_path, audio_track_language_isos, title):
+        """
+        :param int line_number: the line of the row in the manifest file, for the error messages
+        :param Path movie_file_path:
+        :param list(str) or None audio_track_language_isos: the languages of the audio tracks, or None to leave them unchanged
+        :param str or None title: the title, or None to leave it unchanged
+        """
+        self.line_number = line_number
+        self.movie_file_path = movie_file_path
+        self.audio_track_language_isos = audio_track_language_isos
+        self.title = title
+
+
+def read_manifest(manifest_file_path):
+    """
+    reads a manifest, either as csv (with a header line naming the columns path, languages and title) or as json lines (objects with the keys path, languages and title), depending on its suffix
+
+    in csv manifests, the languages are separated by spaces and an empty cell leaves the languages or the title unchanged ; in json lines manifests, a missing or null value does.
+
+    :param Path manifest_file_path:
+    :rtype list(ManifestRow):
+    """
+    import csv
+    manifest_rows = []
+    with open(manifest_file_path.expanduser(), 'r', encoding='utf-8', newline='') as manifest_file:
+        if manifest_file_path.suffix.lower() in ['.jsonl', '.json']:
+            for line_index, line in enumerate(manifest_file):
+                if line.strip() == '':
+                    continue
+                row = json.loads(line)
+                assert isinstance(row, dict) and 'path' in row, 'line %d of %s : a json object with a path is expected' % (line_index + 1, manifest_file_path)
+                manifest_rows.append(ManifestRow(line_index + 1, Path(row['path']), row.get('languages'), row.get('title')))
+        else:
+            csv_reader = csv.DictReader(manifest_file)
+            assert csv_reader.fieldnames is not None and 'path' in csv_reader.fieldnames, '%s is expected to start with a header line naming its columns (path, languages, title)' % manifest_file_path
+            for row in csv_reader:
+                languages = row.get('languages') or ''
+                title = row.get('title') or ''
+                manifest_rows.append(ManifestRow(csv_reader.line_num, Path(row['path']), languages.split() if languages.strip() != '' else None, title if title != '' else None))
+    return manifest_rows
+
+
+def validate_manifest_row(manifest_row):
+    """
+    checks that a manifest row can be applied, from the cached probe of its movie file
+
+    :param ManifestRow manifest_row:
+    :rtype list(IMetadataModifier): the modifiers that apply the row ; empty if the movie file already has the metadata of the row
+    """
+    movie_file_path = manifest_row.movie_file_path
+    assert movie_file_path.expanduser().is_file(), '%s is not a file' % movie_file_path
+    get_movie_container_type(movie_file_path)
+    modifiers = []
+    if manifest_row.audio_track_language_isos is not None:
+        languages = [Language(language_iso=check_language_iso(language_iso)) for language_iso in manifest_row.audio_track_language_isos]
+        old_languages = get_movie_track_languages(movie_file_path)
+        assert len(languages) == len(old_languages), '%d languages are given for the %d audio tracks of %s' % (len(languages), len(old_languages), movie_file_path)
+        if [language.iso for language in languages] != [language.iso for language in old_languages]:
+            modifiers.append(TracksLanguageModifier(languages))
+    if manifest_row.title is not None and manifest_row.title != get_movie_title(movie_file_path):
+        modifiers.append(TitleModifier(manifest_row.title))
+    return modifiers
+
+
+def _apply_manifest_row(movie_file_path, audio_track_language_isos, title, verification_depth, journal_file_path, backup_mode):
+    """
+    applies a validated manifest row, in a worker process of apply_manifest
+
+    :param Path movie_file_path:
+    :param list(str) or None audio_track_language_isos:
+    :param str or None title:
+    :param VerificationDepth verification_depth:
+    :param Path or None journal_file_path:
+    :param BackupMode backup_mode:
+    :rtype ModificationReport:
+    """
+    modifiers = validate_manifest_row(ManifestRow(0, movie_file_path, audio_track_language_isos, title))
+    journal = None
+    if journal_file_path is not None:
+        journal = ModificationJournal(journal_file_path)
+    try:
+        return modify_movie_metadata(movie_file_path, modifiers, MovieVerifier(verification_depth), journal, backup_mode)
+    finally:
+        if journal is not None:
+            journal.close()
+
+
+def apply_manifest(manifest_rows, report_file, jobs=1, verification_depth=VerificationDepth.SAMPLED, skip_invalid_rows=False, journal=None, resume=False, backup_mode=BackupMode.MODIFY_ORIGINAL):
+    """
+    validates all the rows of a manifest, then applies them with a pool of worker processes
+
+    :param list(ManifestRow) manifest_rows:
+    :param file report_file: the text file where the status of each row is written as a json line
+    :param int jobs: the number of movie files modified concurrently
+    :param VerificationDepth verification_depth:
+    :param bool skip_invalid_rows: if False, no row is applied when a row is invalid
+    :param ModificationJournal or None journal: if not None, records the phases of the modification of each movie file
+    :param bool resume: if True, the rows whose modification is over according to journal are neither validated nor applied again, and the interrupted modifications are rolled back first
+    :param BackupMode backup_mode:
+    :rtype dict(str, int): the number of rows for each status (done, invalid, skipped, unchanged, modified, failed)
+    """
+    status_counts = collections.OrderedDict([(status, 0) for status in ['done', 'invalid', 'skipped', 'unchanged', 'modified', 'failed']])
+
+    def write_status(manifest_row, status, message='', modification_report=None):
+        status_counts[status] += 1
+        row_report = {'line': manifest_row.line_number, 'path': str(manifest_row.movie_file_path), 'status': status, 'message': message}
+        if modification_report is not None:
+            row_report['edit_strategy'] = modification_report.edit_strategy
+            row_report['backup'] = str(modification_report.backup_file_path) if modification_report.backup_file_path is not None else None
+        report_file.write(json.dumps(row_report) + '\n')
+        report_file.flush()
+
+    if resume:
+        last_journal_entries = journal.read_last_entries()
+        remaining_rows = []
+        for manifest_row in manifest_rows:
+            try:
+                is_done = journal.resume(manifest_row.movie_file_path, last_journal_entries)
+            except Exception as e:
+                write_status(manifest_row, 'invalid', str(e))
+                continue
+            if is_done:
+                write_status(manifest_row, 'done', 'already applied by a previous run')
+            else:
+                remaining_rows.append(manifest_row)
+        manifest_rows = remaining_rows
+    elif journal is not None:
+        journal.clear()
+
+    # validation, from the probes that are cheap to get (the headers, or the library index)
+    movie_file_paths = set()
+    valid_rows = []
+    for manifest_row, modifiers, exception in parallel_map_ordered(validate_manifest_row, manifest_rows, jobs):
+        if exception is None and os.path.abspath(manifest_row.movie_file_path.expanduser()) in movie_file_paths:
+            exception = AssertionError('%s is already listed in a previous row' % manifest_row.movie_file_path)
+        if exception is not None:
+            write_status(manifest_row, 'invalid', str(exception))
+            continue
+        movie_file_paths.add(os.path.abspath(manifest_row.movie_file_path.expanduser()))
+        if len(modifiers) == 0:
+            write_status(manifest_row, 'unchanged')
+            if journal is not None:
+                journal.record_done(manifest_row.movie_file_path)
+        else:
+            valid_rows.append(manifest_row)
+    if status_counts['invalid'] != 0 and not skip_invalid_rows:
+        for manifest_row in valid_rows:
+            write_status(manifest_row, 'skipped', 'not applied because of the invalid rows of the manifest')
+        return status_counts
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [(manifest_row, executor.submit(_apply_manifest_row, manifest_row.movie_file_path, manifest_row.audio_track_language_isos, manifest_row.title, verification_depth, journal.journal_file_path if journal is not None else None, backup_mode)) for manifest_row in valid_rows]
+        for manifest_row, future in futures:
+            try:
+                write_status(manifest_row, 'modified', modification_report=future.result())
+            except Exception as e:
+                write_status(manifest_row, 'failed', str(e))
+    return status_counts
+
+
+# the filesystems on which reflink backups are possible (on xfs and zfs, only when their reflink or block cloning feature is enabled)
+REFLINK_FILESYSTEM_TYPES = ['btrfs', 'xfs', 'bcachefs', 'ocfs2', 'zfs']
+
+
+def get_filesystem_type(file_path):
+    """
+    :param Path file_path:
+    :rtype str or None: the type of the filesystem of file_path (eg 'ext4', 'btrfs', 'nfs'), as listed in /proc/self/mounts
+    """
+    real_path = os.path.realpath(file_path.expanduser())
+    filesystem_type = None
+    mount_point_length = -1
+    try:
+        with open('/proc/self/mounts', 'r') as mounts_file:
+            for line in mounts_file:
+                fields = line.split()
+                # the spaces of the mount points are escaped as \040
+                mount_point = fields[1].replace('\\040', ' ')
+                if (real_path == mount_point or real_path.startswith(mount_point.rstrip('/') + '/')) and len(mount_point) >= mount_point_length:
+                    filesystem_type = fields[2]
+                    mount_point_length = len(mount_point)
+    except OSError as e:  # pylint: disable=unused-variable
+        return None
+    return filesystem_type
+
+
+class ModificationCost:
+    """
+    the estimated storage reads and writes of a planned modification
+    """
+
+    def __init__(self):
+        self.num_read_bytes = 0
+        self.num_written_bytes = 0  # including the backup
+        self.backup_strategy_name = None  # the name of the IBackupStrategy expected to create the backup (or 'undo record'), if there's one
+        self.num_backup_bytes = 0  # the bytes written by the backup
+
+
+def estimate_modification_cost(modification_plan, verification_depth=VerificationDepth.SAMPLED):
+    """
+    :param ModificationPlan modification_plan:
+    :param VerificationDepth verification_depth:
+    :rtype ModificationCost:
+    """
+    modification_cost = ModificationCost()
+    if modification_plan.edit_strategy == 'unchanged':
+        return modification_cost
+    file_size = modification_plan.movie_file_path.expanduser().stat().st_size
+    for backup_strategy in modification_plan.backup_strategies:
+        if isinstance(backup_strategy, ReflinkBackupStrategy) and get_filesystem_type(modification_plan.movie_file_path) not in REFLINK_FILESYSTEM_TYPES:
+            continue
+        modification_cost.backup_strategy_name = backup_strategy.name
+        if backup_strategy.copies_data:
+            modification_cost.num_read_bytes += file_size
+            modification_cost.num_backup_bytes = file_size
+        break
+    if modification_plan.edit_strategy == 'in place' and modification_plan.backup_mode == BackupMode.MODIFY_ORIGINAL:
+        # only the bytes that the patches overwrite are saved
+        modification_cost.backup_strategy_name = 'undo record'
+        modification_cost.num_backup_bytes = sum([len(patch_data) for _, patch_data in modification_plan.patches])
+    modification_cost.num_written_bytes += modification_cost.num_backup_bytes
+    if modification_plan.edit_strategy == 'in place':
+        modification_cost.num_written_bytes += sum([len(patch_data) for _, patch_data in modification_plan.patches])
+    else:
+        modification_cost.num_read_bytes += file_size
+        modification_cost.num_written_bytes += file_size
+    if verification_depth == VerificationDepth.FULL:
+        # the packets of the original and the modified movie files are all read
+        modification_cost.num_read_bytes += 2 * file_size
+    return modification_cost
+
+
+def measure_read_throughput(file_path, num_bytes=64 * 1024 * 1024):
+    """
+    measures the sequential read throughput of the storage of a file, by reading a part of the file that is first evicted from the page cache
+
+    :param Path file_path:
+    :param int num_bytes: the number of bytes read
+    :rtype float or None: in bytes per second ; None if the file is too small for a meaningful measure
+    """
+    with open(file_path.expanduser(), 'rb', buffering=0) as f:
+        file_size = os.fstat(f.fileno()).st_size
+        num_bytes = min(num_bytes, file_size)
+        if num_bytes < 4 * 1024 * 1024:
+            return None
+        offset = (file_size - num_bytes) // 2
+        offset -= offset % mmap.PAGESIZE
+        os.posix_fadvise(f.fileno(), offset, num_bytes, os.POSIX_FADV_DONTNEED)
+        f.seek(offset)
+        num_read_bytes = 0
+        start_time = time.perf_counter()
+        while num_read_bytes < num_bytes:
+            data = f.read(min(num_bytes - num_read_bytes, 1024 * 1024))
+            if len(data) == 0:
+                break
+            num_read_bytes += len(data)
+        return num_read_bytes / max(time.perf_counter() - start_time, 1e-6)
+
+
+def _format_size(num_bytes):
+    return '%.1f MB' % (num_bytes / 1000000.0)
+
+
+def _plan_manifest_row(manifest_row, verification_depth, backup_mode):
+    """
+    :param ManifestRow manifest_row:
+    :param VerificationDepth verification_depth:
+    :param BackupMode backup_mode:
+    :rtype ModificationPlan, ModificationCost:
+    """
+    modification_plan = plan_movie_modification(manifest_row.movie_file_path, validate_manifest_row(manifest_row), backup_mode)
+    return modification_plan, estimate_modification_cost(modification_plan, verification_depth)
+
+
+def plan_manifest(manifest_rows, jobs=1, verification_depth=VerificationDepth.SAMPLED, backup_mode=BackupMode.MODIFY_ORIGINAL, throughput=None):
+    """
+    prints what apply-manifest would do to each movie file of a manifest, without modifying them : the modifiers, the edit strategy and the estimated storage reads and writes, followed by their totals and a projected runtime
+
+    :param list(ManifestRow) manifest_rows:
+    :param int jobs: the number of movie files planned concurrently
+    :param VerificationDepth verification_depth:
+    :param BackupMode backup_mode:
+    :param float or None throughput: the throughput of the storage devices, in bytes per second ; by default, the read throughput of each device is measured on its largest movie file to modify
+    :rtype dict(str, int): the number of rows for each status (invalid, unchanged, in place, remux)
+    """
+    status_counts = collections.OrderedDict([(status, 0) for status in ['invalid', 'unchanged', 'in place', 'remux']])
+    device_costs = {}  # st_dev -> [number of bytes read and written, largest movie file to modify, its size]
+    total_cost = ModificationCost()
+    movie_file_paths = set()
+    for manifest_row, result, exception in parallel_map_ordered(lambda manifest_row: _plan_manifest_row(manifest_row, verification_depth, backup_mode), manifest_rows, jobs):
+        if exception is None and os.path.abspath(manifest_row.movie_file_path.expanduser()) in movie_file_paths:
+            exception = AssertionError('%s is already listed in a previous row' % manifest_row.movie_file_path)
+        if exception is not None:
+            status_counts['invalid'] += 1
+            print(RED, "line %d : %s : %s" % (manifest_row.line_number, manifest_row.movie_file_path, exception), RESET)
+            continue
+        movie_file_paths.add(os.path.abspath(manifest_row.movie_file_path.expanduser()))
+        modification_plan, modification_cost = result
+        status_counts[modification_plan.edit_strategy] += 1
+        if modification_plan.edit_strategy == 'unchanged':
+            print("%s : unchanged" % manifest_row.movie_file_path)
+            continue
+        backup = 'no backup'
+        if modification_cost.backup_strategy_name is not None:
+            backup = 'backup : %s (%s)' % (modification_cost.backup_strategy_name, _format_size(modification_cost.num_backup_bytes))
+        print("%s : %s%s%s (%s), reads %s, writes %s, %s" % (manifest_row.movie_file_path, BLUE, modification_plan.edit_strategy, RESET, ', '.join([str(modifier) for modifier in modification_plan.modifiers]), _format_size(modification_cost.num_read_bytes), _format_size(modification_cost.num_written_bytes), backup))
+        total_cost.num_read_bytes += modification_cost.num_read_bytes
+        total_cost.num_written_bytes += modification_cost.num_written_bytes
+        total_cost.num_backup_bytes += modification_cost.num_backup_bytes
+        file_stat = manifest_row.movie_file_path.expanduser().stat()
+        device_cost = device_costs.setdefault(file_stat.st_dev, [0, None, 0])
+        device_cost[0] += modification_cost.num_read_bytes + modification_cost.num_written_bytes
+        if file_stat.st_size > device_cost[2]:
+            device_cost[1:3] = [manifest_row.movie_file_path, file_stat.st_size]
+
+    print(', '.join(['%d %s' % (count, status) for status, count in status_counts.items()]))
+    print("total : reads %s, writes %s (of which backups %s)" % (_format_size(total_cost.num_read_bytes), _format_size(total_cost.num_written_bytes), _format_size(total_cost.num_backup_bytes)))
+    # the devices work in parallel (see DeviceScheduler), so the runtime is the one of the busiest device
+    projected_runtime = 0.0
+    for device, (num_bytes, largest_movie_file_path, _) in device_costs.items():
+        device_throughput = throughput
+        if device_throughput is None:
+            device_throughput = measure_read_throughput(largest_movie_file_path)
+            if device_throughput is None:
+                print("the throughput of device %x can't be measured on small video files : use --throughput" % device)
+                projected_runtime = None
+                break
+            print("measured throughput of device %x : %.1f MB/s" % (device, device_throughput / 1000000.0))
+        if DEVICE_SCHEDULER.max_rate is not None:
+            device_throughput = min(device_throughput, DEVICE_SCHEDULER.max_rate)
+        projected_runtime = max(projected_runtime, num_bytes / device_throughput)
+    if projected_runtime is not None:
+        print("projected runtime : %s" % datetime.timedelta(seconds=int(projected_runtime)))
+    return status_counts
+
+
+class IFileWatcher(abc.ABC):
+    """
+    reports the movie files that are created or modified in a directory tree
+    """
+
+    @abc.abstractmethod
+    def wait_for_changes(self, timeout):
+        """
+        :param float or None timeout: the maximum time to wait for changes, in seconds, or None to wait until a change happens
+        :rtype set(Path): the movie files that have been created or modified since the last call (possibly none if the timeout expired)
+        """
+        pass
+
+    def close(self):
+        pass
+
+
+class InotifyFileWatcher(IFileWatcher):
+    """
+    a file watcher that uses linux's inotify, so that the work done for each change doesn't depend on the number of files in the directory tree
+    """
+
+    # from linux/inotify.h
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    EVENT_HEADER_FORMAT = 'iIII'  # wd, mask, cookie, len
+
+    def __init__(self, root_dir_path):
+        """
+        :param Path root_dir_path:
+        """
+        import ctypes
+        import ctypes.util
+        self.root_dir_path = root_dir_path.expanduser()
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.inotify_fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.inotify_fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, 'inotify_init1 failed : %s' % os.strerror(errno))
+        self.watched_dir_paths = {}  # watch descriptor -> directory path
+        self._watch_dir_tree(self.root_dir_path)
+
+    def _watch_dir_tree(self, root_dir_path):
+        """
+        :param Path root_dir_path:
+        :rtype set(Path): the movie files already in the directory tree
+        """
+        movie_file_paths = set()
+        for dir_path, dir_names, file_names in os.walk(root_dir_path):
+            watch_descriptor = self.libc.inotify_add_watch(self.inotify_fd, os.fsencode(dir_path), InotifyFileWatcher.IN_MODIFY | InotifyFileWatcher.IN_CLOSE_WRITE | InotifyFileWatcher.IN_MOVED_TO | InotifyFileWatcher.IN_CREATE)
+            if watch_descriptor >= 0:
+                self.watched_dir_paths[watch_descriptor] = Path(dir_path)
+            movie_file_paths.update([Path(dir_path) / file_name for file_name in file_names])
+        return movie_file_paths
+
+    def wait_for_changes(self, timeout):
+        readable_fds, _, _ = select.select([self.inotify_fd], [], [], timeout)
+        changed_file_paths = set()
+        if len(readable_fds) == 0:
+            return changed_file_paths
+        header_size = struct.calcsize(InotifyFileWatcher.EVENT_HEADER_FORMAT)
+        while True:
+            try:
+                events_data = os.read(self.inotify_fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            event_offset = 0
+            while event_offset < len(events_data):
+                watch_descriptor, mask, _, name_size = struct.unpack_from(InotifyFileWatcher.EVENT_HEADER_FORMAT, events_data, event_offset)
+                name = events_data[event_offset + header_size:event_offset + header_size + name_size].rstrip(b'\0')
+                event_offset += header_size + name_size
+                if mask & InotifyFileWatcher.IN_Q_OVERFLOW:
+                    # some events are lost : the whole tree has to be checked again
+                    print(RED, "warning : too many changes in %s at once, scanning it again" % self.root_dir_path, RESET)
+                    changed_file_paths.update(self._watch_dir_tree(self.root_dir_path))
+                    continue
+                dir_path = self.watched_dir_paths.get(watch_descriptor)
+                if dir_path is None or name == b'':
+                    continue
+                changed_path = dir_path / os.fsdecode(name)
+                if mask & InotifyFileWatcher.IN_ISDIR:
+                    if mask & (InotifyFileWatcher.IN_CREATE | InotifyFileWatcher.IN_MOVED_TO):
+                        changed_file_paths.update(self._watch_dir_tree(changed_path))
+                else:
+                    changed_file_paths.add(changed_path)
+        return changed_file_paths
+
+    def close(self):
+        os.close(self.inotify_fd)
+
+
+class PollingFileWatcher(IFileWatcher):
+    """
+    a file watcher that scans the directory tree periodically, for the systems or filesystems (eg network shares) where inotify is not available
+    """
+
+    def __init__(self, root_dir_path, poll_interval=10.0):
+        """
+        :param Path root_dir_path:
+        :param float poll_interval: the time between two scans, in seconds
+        """
+        self.root_dir_path = root_dir_path
+        self.poll_interval = poll_interval
+        self.file_states = self._scan()
+        self.last_scan_time = time.monotonic()
+
+    def _scan(self):
+        """
+        :rtype dict(Path, (int, int)): the size and modification time of each movie file
+        """
+        file_states = {}
+        for movie_file_path in find_movie_files(self.root_dir_path):
+            try:
+                movie_file_stat = movie_file_path.stat()
+            except FileNotFoundError:
+                continue
+            file_states[movie_file_path] = (movie_file_stat.st_size, movie_file_stat.st_mtime_ns)
+        return file_states
+
+    def wait_for_changes(self, timeout):
+        time_before_scan = self.last_scan_time + self.poll_interval - time.monotonic()
+        if timeout is not None and timeout < time_before_scan:
+            time.sleep(timeout)
+            return set()
+        time.sleep(max(0.0, time_before_scan))
+        file_states = self._scan()
+        self.last_scan_time = time.monotonic()
+        changed_file_paths = set([movie_file_path for movie_file_path, file_state in file_states.items() if self.file_states.get(movie_file_path) != file_state])
+        self.file_states = file_states
+        return changed_file_paths
+
+
+def create_file_watcher(root_dir_path, use_polling=False, poll_interval=10.0):
+    """
+    :param Path root_dir_path:
+    :param bool use_polling: if True, the directory tree is scanned periodically, even if inotify is available
+    :param float poll_interval: the time between two scans, in seconds, when polling
+    :rtype IFileWatcher:
+    """
+    if not use_polling:
+        try:
+            return InotifyFileWatcher(root_dir_path)
+        except (OSError, AttributeError) as e:
+            print(RED, "warning : inotify is not available (%s) : %s will be scanned every %s seconds" % (e, root_dir_path, poll_interval), RESET)
+    return PollingFileWatcher(root_dir_path, poll_interval)
+
+
+class WatchPolicy:
+    """
+    decides, without asking the user, how the metadata of a new movie file are fixed
+    """
+
+    def __init__(self, title_guessers=None, default_language_iso=None):
+        """
+        :param list(ITitleGuesser) or None title_guessers: if not None, the title of the movie files with no title is guessed by the first of these guessers that succeeds
+        :param str or None default_language_iso: if not None, the language given to the undefined audio tracks
+        """
+        self.title_guessers = title_guessers if title_guessers is not None else []
+        self.default_language_iso = default_language_iso
+
+    def get_modifiers(self, movie_info):
+        """
+        :param MovieInfo movie_info:
+        :rtype list(IMetadataModifier):
+        """
+        modifiers = []
+        if self.default_language_iso is not None and 'und' in [language.iso for language in movie_info.audio_track_languages]:
+            modifiers.append(TracksLanguageModifier([Language(language_iso=self.default_language_iso) if language.iso == 'und' else language for language in movie_info.audio_track_languages]))
+        if not movie_info.title:
+            for title_guesser in self.title_guessers:
+                guessed_title = title_guesser.guess_title(movie_info.movie_file_path)
+                if guessed_title:
+                    modifiers.append(TitleModifier(guessed_title))
+                    break
+        return modifiers
+
+
+def watch_directory(root_dir_path, watch_policy, file_watcher, settle_time=5.0, library_index=None, movie_verifier=None):
+    """
+    fixes the metadata of the movie files created or modified in a directory tree, once they stop changing, until interrupted
+
+    :param Path root_dir_path:
+    :param WatchPolicy watch_policy:
+    :param IFileWatcher file_watcher:
+    :param float settle_time: the time during which a movie file must not change before it's processed, in seconds
+    :param LibraryIndex or None library_index: if not None, remembers the metadata of the processed movie files
+    :param MovieVerifier or None movie_verifier:
+    """
+    print("watching %s" % root_dir_path)
+    unsettled_files = {}  # movie file path -> (size, mtime_ns, time of the last change)
+    processed_file_states = {}  # movie file path -> (size, mtime_ns) after its processing, to ignore the changes made by videfix itself
+    while True:
+        changed_file_paths = file_watcher.wait_for_changes(settle_time / 2 if len(unsettled_files) != 0 else None)
+        now = time.monotonic()
+        for changed_file_path in changed_file_paths:
+            if changed_file_path.suffix.lower() not in MOVIE_FILE_SUFFIXES or is_backup_file_path(changed_file_path) or is_temporary_file_path(changed_file_path):
+                continue
+            unsettled_files[changed_file_path] = (None, None, now)
+        for movie_file_path, (size, mtime_ns, change_time) in list(unsettled_files.items()):
+            try:
+                movie_file_stat = movie_file_path.stat()
+            except FileNotFoundError:
+                del unsettled_files[movie_file_path]
+                continue
+            file_state = (movie_file_stat.st_size, movie_file_stat.st_mtime_ns)
+            if file_state != (size, mtime_ns):
+                # the movie file is still being written
+                unsettled_files[movie_file_path] = file_state + (now,)
+                continue
+            if now - change_time < settle_time:
+                continue
+            del unsettled_files[movie_file_path]
+            if processed_file_states.get(movie_file_path) == file_state:
+                continue
+            try:
+                modifiers = watch_policy.get_modifiers(get_movie_info(movie_file_path, library_index))
+                if len(modifiers) != 0:
+                    print("%s%s%s" % (GREEN, modify_movie_metadata(movie_file_path, modifiers, movie_verifier), RESET))
+                else:
+                    print("%s : nothing to fix" % movie_file_path)
+                movie_file_stat = movie_file_path.stat()
+                processed_file_states[movie_file_path] = (movie_file_stat.st_size, movie_file_stat.st_mtime_ns)
+            except Exception as e:
+                print(RED, "failed to process %s : %s" % (movie_file_path, e), RESET)
+
+
+class Session:
+    """
+    the entry point of videfix for python programs : a long lived session probes and modifies any number of movie files, without starting a videfix process for each of them
 
-    if backup_mode == BackupMode.NO_BACKUP:
-        # delete the backup
-        src_movie_file_path.unlink()
+    the session owns what its operations share : the worker threads of submit, the backup policy and the verification of the modified movie files. The probes are cached in the probe cache of the process (MOVIE_PROBE_CACHE), which is shared by all the sessions, as the modifiers probe the movie files through it : a long lived program bounds it with MOVIE_PROBE_CACHE.max_num_probes.
+
+        with videfix.Session(jobs=4) as session:
+            movie_info = session.probe('~/movies/film.mkv')
+            modifiers = session.plan('~/movies/film.mkv', audio_track_language_isos=['fra', 'eng'])
+            if len(modifiers) != 0:
+                session.apply('~/movies/film.mkv', modifiers)
+    """
+
+    def __init__(self, jobs=1, backup_mode=BackupMode.MODIFY_ORIGINAL, verification_depth=VerificationDepth.SAMPLED, library_index_file_path=None, journal_file_path=None):
+        """
+        :param int jobs: the number of movie files modified concurrently by submit
+        :param BackupMode backup_mode: MODIFY_ORIGINAL keeps the original content of the modified movie files in backup files, NO_BACKUP doesn't
+        :param VerificationDepth verification_depth: how thoroughly the modified movie files are compared to the original ones
+        :param Path or None library_index_file_path: if not None, the metadata of the probed movie files are remembered in this index
+        :param Path or None journal_file_path: if not None, the phases of the modifications are recorded in this journal (see ModificationJournal)
+        """
+        self.backup_mode = backup_mode
+        self.movie_verifier = MovieVerifier(verification_depth)
+        self.library_index = LibraryIndex(Path(library_index_file_path)) if library_index_file_path is not None else None
+        self.journal = ModificationJournal(Path(journal_file_path)) if journal_file_path is not None else None
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=jobs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        waits for the submitted modifications, then releases the resources of the session
+        """
+        self.executor.shutdown(wait=True)
+        if self.library_index is not None:
+            self.library_index.close()
+        if self.journal is not None:
+            self.journal.close()
+
+    def probe(self, movie_file_path):
+        """
+        :param Path or str movie_file_path:
+        :rtype MovieInfo:
+        """
+        return get_movie_info(Path(movie_file_path), self.library_index)
+
+    def plan(self, movie_file_path, audio_track_language_isos=None, title=None):
+        """
+        works out how to give a movie file the given metadata, without modifying it
+
+        :param Path or str movie_file_path:
+        :param list(str) or None audio_track_language_isos: the languages of the audio tracks, or None to leave them unchanged
+        :param str or None title: the title, or None to leave it unchanged
+        :rtype list(IMetadataModifier): the modifiers to apply ; empty if the movie file already has these metadata
+        """
+        return validate_manifest_row(ManifestRow(0, Path(movie_file_path), audio_track_language_isos, title))
+
+    def apply(self, movie_file_path, modifiers):
+        """
+        modifies a movie file, in the calling thread
+
+        :param Path or str movie_file_path:
+        :param list(IMetadataModifier) modifiers: as returned by plan
+        :rtype ModificationReport:
+        """
+        movie_file_path = Path(movie_file_path)
+        modification_report = modify_movie_metadata(movie_file_path, modifiers, self.movie_verifier, self.journal, self.backup_mode)
+        if self.library_index is not None:
+            # the next probe of the modified movie file finds its new revision in the index
+            get_movie_info(movie_file_path, self.library_index)
+        return modification_report
+
+    def submit(self, movie_file_path, modifiers):
+        """
+        modifies a movie file on a worker thread of the session
+
+        :param Path or str movie_file_path:
+        :param list(IMetadataModifier) modifiers: as returned by plan
+        :rtype concurrent.futures.Future: the future ModificationReport
+        """
+        return self.executor.submit(self.apply, movie_file_path, modifiers)
 
 
 def fix_movie_file(movie_file_path):
     languages = get_movie_track_languages(movie_file_path)
     print(languages)
 
+def ask_metadata_modifiers(movie_file_path, fix_undefined_audio_languages, fix_title, title_guessers):
+    """
+    asks the user how to fix the metadata of the given movie file
+
+    :param Path movie_file_path:
+    :param bool fix_undefined_audio_languages: if True, the user is asked for the language of the undefined audio tracks
+    :param bool fix_title: if True, the user is asked for the title
+    :param list(ITitleGuesser) title_guessers: the title guessers that suggest the title to the user
+    :rtype list(IMetadataModifier):
+    """
+    print("%s%s%s :" % (BLUE, movie_file_path, RESET))
+    metadata_modifiers = []
+    if fix_undefined_audio_languages:
+        old_audio_track_languages = get_movie_track_languages(movie_file_path)
+        print("Current track languages : %s" % (old_audio_track_languages))
+        new_audio_track_languages = []
+        for track_index in range(len(old_audio_track_languages)):
+            chosen_language_iso = old_audio_track_languages[track_index].iso
+            if old_audio_track_languages[track_index].iso == "und":
+                while True:
+                    print("Choose a language for the undefined audiotrack #%d : " % track_index, end='', flush=True)
+                    chosen_language = sys.stdin.readline().rstrip()
+                    chosen_language_iso, _ = LANGUAGE_DEFS.find_language_iso(chosen_language)
+                    if chosen_language_iso is not None:
+                        break
+                    else:
+                        print(RED, "unexpected language %s : valid values are iso 639-2 codes (eg und, eng, fra, deu, jpn)" % chosen_language, RESET)
+            new_audio_track_languages.append(Language(language_iso=chosen_language_iso))
+        # print(old_audio_track_languages, new_audio_track_languages)
+        if [l.iso for l in old_audio_track_languages] != [l.iso for l in new_audio_track_languages]:
+            tracks_language_modifier = TracksLanguageModifier(new_audio_track_languages)
+            print("%ssetting audio track languages to %s%s" % (GREEN, new_audio_track_languages, RESET))
+            metadata_modifiers.append(tracks_language_modifier)
+    if fix_title:
+        old_title = get_movie_title(movie_file_path)
+        guessed_title = None
+        for title_guesser in title_guessers:
+            guessed_title = title_guesser.guess_title(movie_file_path)
+            if guessed_title != None:
+                break
+        if guessed_title == None:
+            guessed_title = old_title
+        # print("Choose a title (old title : %s%s%s) : " % (CYAN, old_title, RESET), end='', flush=True)
+        # chosen_title = sys.stdin.readline().rstrip()
+        new_title = input("Choose a title (old title : %s'%s'%s) : " % (BOLD, old_title, RESET), guessed_title)
+        if new_title != old_title:
+            print("%schanging title from '%s' to '%s'%s" % (GREEN, old_title, new_title, RESET))
+            metadata_modifiers.append(TitleModifier(new_title))
+    return metadata_modifiers
+
+
 _input = input
 def input(prompt, initial=''):
+    import readline
     readline.set_startup_hook(lambda: readline.insert_text(initial))
     try:
         return _input(prompt)
     finally:
         readline.set_startup_hook(None)
 
+def interrupt_commands(signal_number, frame):
+    """
+    the SIGINT handler : the processes run by videfix don't receive the Ctrl-C of the terminal (see CommandRunner), so they are terminated before the KeyboardInterrupt is raised
+    """
+    COMMAND_RUNNER.cancel_all()
+    signal.default_int_handler(signal_number, frame)
+
+def create_title_guessers(title_guesser_arg_values):
+    """
+    :param list(str) title_guesser_arg_values: the values of the --add-title-guesser command line options, of the form <guesser_type>:<guesser_args>
+    :rtype list(ITitleGuesser):
+    """
+    title_guessers = []
+    for title_guesser_arg_value in title_guesser_arg_values:
+        match = re.match('^(?P<type>[a-z_]+):(?P<arg>.*)$', title_guesser_arg_value)
+        if not match:
+            match = re.match('^(?P<type>[a-z_]+)$', title_guesser_arg_value)
+        assert match, "bad argument value for title guesser '%s' : it is expecte to be of the form <guesser_type>:<guesser_args>" % title_guesser_arg_value
+        if match['type'] == 'filename_re':
+            filename_re = match['arg']
+            title_guessers.append(TitleFromFileName(filename_re))
+        elif match['type'] == 'catalog':
+            title_guessers.append(TitleFromCatalog(Path(match['arg'])))
+        else:
+            assert False, "unexpected title guesser type : %s" % match['type']
+    return title_guessers
+
+def open_run_journal(parser, journal_file_path, resume, discard_journal):
+    """
+    opens the journal of a run of modify-metadata or apply-manifest, making sure that the interrupted run it may record is not lost by mistake
+
+    :param argparse.ArgumentParser parser:
+    :param Path journal_file_path:
+    :param bool resume: the value of --resume
+    :param bool discard_journal: the value of --discard-journal
+    :rtype ModificationJournal: locked for this run ; it's cleared if discard_journal is True
+    """
+    journal = ModificationJournal(journal_file_path)
+    try:
+        journal.lock()
+    except AssertionError as e:
+        parser.error(str(e))
+    if discard_journal:
+        journal.clear(discard_unfinished=True)
+    elif not resume:
+        unfinished_file_paths = journal.get_unfinished_file_paths()
+        if len(unfinished_file_paths) != 0:
+            parser.error("the journal %s records the interrupted modification of %d video files (eg %s) : use --resume to finish or roll them back, or --discard-journal to forget them" % (journal.journal_file_path, len(unfinished_file_paths), unfinished_file_paths[0]))
+    return journal
+
+def language_iso_argument(argument_value):
+    """
+    converts a command line argument to an iso 639-2/T code
+
+    :param str argument_value: an iso 639-2/T, iso 639-2/B or iso 639-1 code
+    :rtype str:
+    """
+    language_iso, _ = LANGUAGE_DEFS.find_language_iso(argument_value)
+    if language_iso is None:
+        raise argparse.ArgumentTypeError("unexpected language '%s' : an iso 639-2 code is expected (eg eng, fra)" % argument_value)
+    return language_iso
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='edit metadata inside movie files')
+    parser.add_argument('--max-processes', type=int, default=COMMAND_RUNNER.max_processes, help="the maximum number of ffprobe, ffmpeg and rsync processes running at the same time (default : %(default)s)")
+    parser.add_argument('--probe-timeout', type=float, default=120.0, help="the time after which an ffprobe process is considered stuck and is terminated, in seconds (default : %(default)s)")
+    parser.add_argument('--max-rewrites-per-device', type=int, default=1, help="the maximum number of video files remuxed or copied at the same time on each storage device, as concurrent rewrites make spinning disks and network shares thrash ; rewrites on different devices run in parallel (default : %(default)s)")
+    parser.add_argument('--max-device-rate', type=float, default=None, metavar='MB_PER_SECOND', help="the maximum average throughput of the rewrites on each storage device, in MB/s (default : no limit)")
+    parser.add_argument('--remux-timeout', type=float, default=None, help="the time after which an ffmpeg or rsync process is considered stuck and is terminated, in seconds (default : no timeout)")
     subparsers = parser.add_subparsers()
     subparsers.required = True
     subparsers.dest = 'command'
 
     show_audio_language_subparser = subparsers.add_parser("show-audio-languages", help="shows the audio track languages of the given video files")
-    show_audio_language_subparser.add_argument('movie_file_path', nargs='+')
+    show_audio_language_subparser.add_argument('movie_file_path', nargs='*')
+    show_audio_language_subparser.add_argument('-r', '--recursive', required=False, action='append', default=[], metavar='DIR', help="also process the video files found in this directory and its subdirectories")
+    show_audio_language_subparser.add_argument('--changed-since', required=False, type=datetime.datetime.fromisoformat, help="only process the video files of the --recursive directories that were modified after this date (eg 2024-01-31 or 2024-01-31T18:00)")
+    show_audio_language_subparser.add_argument('--library-index', default=str(DEFAULT_LIBRARY_INDEX_FILE_PATH), help="the index file in which the metadata of the probed video files is remembered (default : %(default)s)")
+    show_audio_language_subparser.add_argument('--no-library-index', required=False, action='store_true', help="probe all the given video files, without using the library index")
+    show_audio_language_subparser.add_argument('-j', '--jobs', type=int, default=1, help="the number of video files probed concurrently (default : %(default)s)")
+    show_audio_language_subparser.add_argument('--stats', nargs='?', const='-', metavar='STATS_FILE', help="write the resources (wall time, cpu time, storage reads and writes, spawned processes) used by each stage of the processing of each video file as json lines, followed by their p50, p95 and totals, to this file or to the standard error if no file is given")
 
     set_audio_language_subparser = subparsers.add_parser("set-audio-language", help="sets the audio track language of the given video file")
-    set_audio_language_subparser.add_argument('--languages', required=True, choices=LANGUAGE_DEFS.isos(), nargs='+')
+    set_audio_language_subparser.add_argument('--languages', required=True, type=language_iso_argument, metavar='LANGUAGE_ISO', nargs='+', help="the iso 639-2/T codes of the audio track languages (eg eng fra)")
     set_audio_language_subparser.add_argument('--movie-file-path', required=True)
+    set_audio_language_subparser.add_argument('--stats', nargs='?', const='-', metavar='STATS_FILE', help="write the resources (wall time, cpu time, storage reads and writes, spawned processes) used by each stage of the processing of each video file as json lines, followed by their p50, p95 and totals, to this file or to the standard error if no file is given")
+    set_audio_language_subparser.add_argument('--no-backup', required=False, action='store_true', help="don't keep the original content of the modified video files in .asof_* backups")
+    set_audio_language_subparser.add_argument('--verify', default='sampled', choices=[depth.name.lower() for depth in VerificationDepth], help="how thoroughly the content of the modified video file is compared to the original one (default : %(default)s)")
+
+    undo_subparser = subparsers.add_parser("undo", help="restores a video file that was patched in place, from the .asof_*%s undo record kept as its backup" % UNDO_RECORD_FILE_SUFFIX)
+    undo_subparser.add_argument('movie_file_path')
+    undo_subparser.add_argument('undo_record_file_path')
 
     modify_metadata_subparser = subparsers.add_parser("modify-metadata", help="allows the user to interactively modify metadata")
     modify_metadata_subparser.add_argument('-l', '--fix-undefined-audio-languages', required=False, action='store_true', help="define the undefined language of audiotracks")
     modify_metadata_subparser.add_argument('-t', '--fix-title', required=False, action='store_true', help="define the title")
-    modify_metadata_subparser.add_argument('-m', '--movie-file-path', required=True, nargs='+')
-    modify_metadata_subparser.add_argument('-g', '--add-title-guesser', required=False, action='append', dest='title_guessers', help="add a title guesser which guesses the title from the filename obeying the given regular expression")
+    modify_metadata_subparser.add_argument('-m', '--movie-file-path', required=False, nargs='+', default=[])
+    modify_metadata_subparser.add_argument('-r', '--recursive', required=False, action='append', default=[], metavar='DIR', help="also process the video files found in this directory and its subdirectories")
+    modify_metadata_subparser.add_argument('--changed-since', required=False, type=datetime.datetime.fromisoformat, help="only process the video files of the --recursive directories that were modified after this date (eg 2024-01-31 or 2024-01-31T18:00)")
+    modify_metadata_subparser.add_argument('-g', '--add-title-guesser', required=False, action='append', dest='title_guessers', default=[], help="add a title guesser : filename_re:<regular expression> guesses the title from the filename obeying the given regular expression, catalog:<catalog file> looks up the filename in a csv or tsv catalog of titles and years (eg imdb's title.basics.tsv.gz)")
+    modify_metadata_subparser.add_argument('-j', '--jobs', type=int, default=1, help="the number of video files modified concurrently in the background, while the user keeps answering the prompts (default : %(default)s)")
+    modify_metadata_subparser.add_argument('--no-backup', required=False, action='store_true', help="don't keep the original content of the modified video files in .asof_* backups")
+    modify_metadata_subparser.add_argument('--verify', default='sampled', choices=[depth.name.lower() for depth in VerificationDepth], help="how thoroughly the content of the modified video files is compared to the original ones (default : %(default)s)")
+    modify_metadata_subparser.add_argument('--journal', help="the journal file where the phases of the modification of each video file are recorded (default : a journal in %s for each set of video files and directories given)" % DEFAULT_JOURNAL_DIR_PATH)
+    modify_metadata_subparser.add_argument('--resume', required=False, action='store_true', help="resume the interrupted run recorded in the journal : the video files whose modification is over are skipped, and the interrupted modifications are rolled back then done again")
+    modify_metadata_subparser.add_argument('--discard-journal', required=False, action='store_true', help="start a new run even if the journal records an interrupted run, whose modifications then can't be resumed anymore")
+    modify_metadata_subparser.add_argument('--stats', nargs='?', const='-', metavar='STATS_FILE', help="write the resources (wall time, cpu time, storage reads and writes, spawned processes) used by each stage of the processing of each video file as json lines, followed by their p50, p95 and totals, to this file or to the standard error if no file is given")
+    modify_metadata_subparser.add_argument('--prefetch', type=int, default=4, metavar='NUM_FILES', help="the number of video files probed in the background ahead of the one being prompted, so that the prompts don't wait for ffprobe ; 0 to disable (default : %(default)s)")
+    modify_metadata_subparser.add_argument('--queue-size', type=int, default=16, help="the maximum number of answered video files waiting to be modified, after which the prompts wait (default : %(default)s)")
+    apply_manifest_subparser = subparsers.add_parser("apply-manifest", help="non-interactively sets the audio track languages and titles listed in a manifest")
+    apply_manifest_subparser.add_argument('manifest_file_path', help="a csv file with the columns path, languages (separated by spaces) and title, or a json lines file (.jsonl) of objects with the keys path, languages (a list) and title ; an empty or missing value leaves the metadata unchanged")
+    apply_manifest_subparser.add_argument('--report', help="the json lines file where the status of each row is written (default : the manifest file path followed by .report.jsonl)")
+    apply_manifest_subparser.add_argument('-j', '--jobs', type=int, default=1, help="the number of video files modified concurrently by worker processes (default : %(default)s)")
+    apply_manifest_subparser.add_argument('--skip-invalid', required=False, action='store_true', help="apply the valid rows even if some rows are invalid, instead of applying none")
+    apply_manifest_subparser.add_argument('--journal', help="the journal file where the phases of the modification of each video file are recorded (default : the manifest file path followed by .journal.jsonl)")
+    apply_manifest_subparser.add_argument('--resume', required=False, action='store_true', help="resume the interrupted run recorded in the journal : the video files whose modification is over are skipped, and the interrupted modifications are rolled back then done again")
+    apply_manifest_subparser.add_argument('--discard-journal', required=False, action='store_true', help="start a new run even if the journal records an interrupted run, whose modifications then can't be resumed anymore")
+    apply_manifest_subparser.add_argument('--no-backup', required=False, action='store_true', help="don't keep the original content of the modified video files in .asof_* backups")
+    apply_manifest_subparser.add_argument('--verify', default='sampled', choices=[depth.name.lower() for depth in VerificationDepth], help="how thoroughly the content of the modified video files is compared to the original ones (default : %(default)s)")
+    plan_subparser = subparsers.add_parser("plan", help="shows what apply-manifest would do to the video files of a manifest, and what it would cost, without modifying them")
+    plan_subparser.add_argument('manifest_file_path', help="a manifest, as read by apply-manifest")
+    plan_subparser.add_argument('-j', '--jobs', type=int, default=1, help="the number of video files planned concurrently (default : %(default)s)")
+    plan_subparser.add_argument('--no-backup', required=False, action='store_true', help="plan the modifications without keeping the original content of the video files in .asof_* backups")
+    plan_subparser.add_argument('--verify', default='sampled', choices=[depth.name.lower() for depth in VerificationDepth], help="how thoroughly the content of the modified video files would be compared to the original ones (default : %(default)s)")
+    plan_subparser.add_argument('--throughput', type=float, default=None, metavar='MB_PER_SECOND', help="the throughput of the storage devices used for the projected runtime, in MB/s (default : measured by reading the largest video file to modify on each device)")
+    watch_subparser = subparsers.add_parser("watch", help="fixes the metadata of the video files that arrive in a directory, without asking the user")
+    watch_subparser.add_argument('dir_path', help="the directory (and its subdirectories) where video files arrive")
+    watch_subparser.add_argument('-g', '--add-title-guesser', required=False, action='append', dest='title_guessers', default=[], help="give the video files with no title the title guessed from their filename obeying the given regular expression (eg filename_re:'^(?P<year>[0-9]+) - (?P<title>.+)$'), or found in a csv or tsv catalog of titles and years (eg catalog:title.basics.tsv.gz)")
+    watch_subparser.add_argument('--default-language', required=False, type=language_iso_argument, metavar='LANGUAGE_ISO', help="give the undefined audio tracks this language")
+    watch_subparser.add_argument('--settle-time', type=float, default=5.0, help="the time during which a video file must not change before it's processed, in seconds (default : %(default)s)")
+    watch_subparser.add_argument('--polling', required=False, action='store_true', help="scan the directory periodically instead of using inotify (eg for network shares)")
+    watch_subparser.add_argument('--poll-interval', type=float, default=10.0, help="the time between two scans of the directory when polling, in seconds (default : %(default)s)")
+    watch_subparser.add_argument('--library-index', default=str(DEFAULT_LIBRARY_INDEX_FILE_PATH), help="the index file in which the metadata of the probed video files is remembered (default : %(default)s)")
+    watch_subparser.add_argument('--verify', default='sampled', choices=[depth.name.lower() for depth in VerificationDepth], help="how thoroughly the content of the modified video files is compared to the original ones (default : %(default)s)")
+    query_subparser = subparsers.add_parser("query", help="lists the video files of the library index that match the given criteria")
+    query_subparser.add_argument('--library-index', default=str(DEFAULT_LIBRARY_INDEX_FILE_PATH), help="the index file filled by show-audio-languages (default : %(default)s)")
+    query_subparser.add_argument('--audio-language', required=False, type=language_iso_argument, metavar='LANGUAGE_ISO', help="only the video files with at least one audio track in this language")
+    query_subparser.add_argument('--empty-title', required=False, action='store_true', help="only the video files with no title")
+    query_subparser.add_argument('--title-like', required=False, help="only the video files whose title matches this sql LIKE pattern (eg '%%the%%')")
+    query_subparser.add_argument('--container', required=False, choices=[container_type.name.lower() for container_type in MovieContainerType], help="only the video files of this container type")
     namespace = parser.parse_args()
     # print(namespace)
+    COMMAND_RUNNER.max_processes = namespace.max_processes
+    COMMAND_RUNNER.timeouts['ffprobe'] = namespace.probe_timeout
+    if namespace.remux_timeout is not None:
+        COMMAND_RUNNER.timeouts['ffmpeg'] = namespace.remux_timeout
+        COMMAND_RUNNER.timeouts['rsync'] = namespace.remux_timeout
+    DEVICE_SCHEDULER.max_rewrites_per_device = namespace.max_rewrites_per_device
+    if namespace.max_device_rate is not None:
+        DEVICE_SCHEDULER.max_rate = namespace.max_device_rate * 1000000
+    signal.signal(signal.SIGINT, interrupt_commands)
+    if namespace.command in ['show-audio-languages', 'modify-metadata'] and len(namespace.movie_file_path) == 0 and len(namespace.recursive) == 0:
+        parser.error('%s requires video files or --recursive directories' % namespace.command)
 
     if namespace.command == 'show-audio-languages':
-        for movie_file_path in namespace.movie_file_path:
-            # print(movie_file_path)
+        library_index = None
+        if not namespace.no_library_index:
+            library_index = LibraryIndex(Path(namespace.library_index))
+        stats_collector = open_stats_collector(namespace.stats)
+
+        def show_movie_info(movie_file_path):
             try:
-                languages = get_movie_track_languages(Path(movie_file_path))
-                print(Path(movie_file_path), BLUE, languages, RESET)
-            except:
-                print(RED, "failed to process %s" % movie_file_path, RESET)
-                raise
+                with measure_movie(stats_collector, movie_file_path), measure_stage('probe'):
+                    return get_movie_info(movie_file_path, library_index)
+            finally:
+                if stats_collector is not None:
+                    stats_collector.finish_movie(movie_file_path)
+
+        num_failures = 0
+        movie_file_paths = iter_movie_file_paths(namespace.movie_file_path, namespace.recursive, namespace.changed_since)
+        for movie_file_path, movie_info, exception in parallel_map_ordered(show_movie_info, movie_file_paths, namespace.jobs):
+            if exception is None:
+                print(movie_file_path, BLUE, movie_info.audio_track_languages, RESET)
+            else:
+                print(RED, "failed to process %s : %s" % (movie_file_path, exception), RESET)
+                num_failures += 1
+        if library_index is not None:
+            library_index.close()
+        if stats_collector is not None:
+            stats_collector.close()
+        if num_failures != 0:
+            sys.exit(1)
+
+    if namespace.command == 'watch':
+        watch_policy = WatchPolicy(create_title_guessers(namespace.title_guessers), namespace.default_language)
+        if len(watch_policy.title_guessers) == 0 and watch_policy.default_language_iso is None:
+            parser.error('watch requires a policy : --add-title-guesser or --default-language')
+        library_index = LibraryIndex(Path(namespace.library_index))
+        file_watcher = create_file_watcher(Path(namespace.dir_path), namespace.polling, namespace.poll_interval)
+        try:
+            watch_directory(Path(namespace.dir_path), watch_policy, file_watcher, namespace.settle_time, library_index, MovieVerifier(VerificationDepth[namespace.verify.upper()]))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            file_watcher.close()
+            library_index.close()
+
+    if namespace.command == 'query':
+        library_index = LibraryIndex(Path(namespace.library_index))
+        container_type = None
+        if namespace.container is not None:
+            container_type = MovieContainerType[namespace.container.upper()]
+        for movie_info in library_index.query(audio_language_iso=namespace.audio_language, empty_title=namespace.empty_title, title_pattern=namespace.title_like, container_type=container_type):
+            print(movie_info.movie_file_path, BLUE, movie_info.audio_track_languages, RESET, "'%s'" % movie_info.title)
+        library_index.close()
+
+    if namespace.command == 'apply-manifest':
+        manifest_file_path = Path(namespace.manifest_file_path)
+        report_file_path = Path(namespace.report) if namespace.report is not None else manifest_file_path.with_name(manifest_file_path.name + '.report.jsonl')
+        journal = open_run_journal(parser, Path(namespace.journal) if namespace.journal is not None else manifest_file_path.with_name(manifest_file_path.name + '.journal.jsonl'), namespace.resume, namespace.discard_journal)
+        with open(report_file_path.expanduser(), 'w', encoding='utf-8') as report_file:
+            status_counts = apply_manifest(read_manifest(manifest_file_path), report_file, namespace.jobs, VerificationDepth[namespace.verify.upper()], namespace.skip_invalid, journal, namespace.resume, BackupMode.NO_BACKUP if namespace.no_backup else BackupMode.MODIFY_ORIGINAL)
+        journal.close()
+        print(', '.join(['%d %s' % (count, status) for status, count in status_counts.items()]) + ' (see %s)' % report_file_path)
+        if status_counts['invalid'] != 0 or status_counts['failed'] != 0:
+            sys.exit(1)
+
+    if namespace.command == 'plan':
+        status_counts = plan_manifest(read_manifest(Path(namespace.manifest_file_path)), namespace.jobs, VerificationDepth[namespace.verify.upper()], BackupMode.NO_BACKUP if namespace.no_backup else BackupMode.MODIFY_ORIGINAL, namespace.throughput * 1000000 if namespace.throughput is not None else None)
+        if status_counts['invalid'] != 0:
+            sys.exit(1)
 
     if namespace.command == 'set-audio-language':
         tracks_language_modifier = TracksLanguageModifier([Language(language_iso=language_iso) for language_iso in namespace.languages ])
-        modify_movie_metadata(Path(namespace.movie_file_path), modifiers=[tracks_language_modifier])
+        stats_collector = open_stats_collector(namespace.stats)
+        try:
+            with measure_movie(stats_collector, Path(namespace.movie_file_path)) as movie_stats:
+                modification_report = modify_movie_metadata(Path(namespace.movie_file_path), modifiers=[tracks_language_modifier], movie_verifier=MovieVerifier(VerificationDepth[namespace.verify.upper()]), backup_mode=BackupMode.NO_BACKUP if namespace.no_backup else BackupMode.MODIFY_ORIGINAL)
+                if movie_stats is not None:
+                    movie_stats.num_rewritten_bytes = modification_report.num_rewritten_bytes
+            print(modification_report)
+        finally:
+            if stats_collector is not None:
+                stats_collector.close()
+
+    if namespace.command == 'undo':
+        restore_undo_record_file(Path(namespace.movie_file_path), Path(namespace.undo_record_file_path))
+        # the undo record only restores the movie file it was made for, once
+        Path(namespace.undo_record_file_path).expanduser().unlink()
+        print("%s%s restored%s" % (GREEN, namespace.movie_file_path, RESET))
 
     if namespace.command == 'modify-metadata':
         print(namespace)
-        title_guessers = []
-        for title_guesser_arg_value in namespace.title_guessers:
-            match = re.match('^(?P<type>[a-z_]+):(?P<arg>.*)$', title_guesser_arg_value)
-            if not match:
-                match = re.match('^(?P<type>[a-z_]+)$', title_guesser_arg_value)
-            assert match, "bad argument value for title guesser '%s' : it is expecte to be of the form <guesser_type>:<guesser_args>" % title_guesser_arg_value
-            if match['type'] == 'filename_re':
-                filename_re = match['arg']
-                title_guessers.append(TitleFromFileName(filename_re))
-            else:
-                assert False, "unexpected title guesser type : %s" % match['type']
-        for movie_file_path in namespace.movie_file_path:
-            print("%s%s%s :" % (BLUE, movie_file_path, RESET))
-            metadata_modifiers = []
-            if namespace.fix_undefined_audio_languages:
-                old_audio_track_languages = get_movie_track_languages(Path(movie_file_path))
-                print("Current track languages : %s" % (old_audio_track_languages))
-                new_audio_track_languages = []
-                for track_index in range(len(old_audio_track_languages)):
-                    chosen_language_iso = old_audio_track_languages[track_index].iso
-                    if old_audio_track_languages[track_index].iso == "und":
-                        while True:
-                            print("Choose a language for the undefined audiotrack #%d : " % track_index, end='', flush=True)
-                            chosen_language_iso = sys.stdin.readline().rstrip()
-                            if chosen_language_iso in Language.isos():
-                                break
-                            else:
-                                print(RED, "unexpected language %s : valid values are %s" % (chosen_language_iso, Language.isos()), RESET)
-                    new_audio_track_languages.append(Language(language_iso=chosen_language_iso))
-                # print(old_audio_track_languages, new_audio_track_languages)
-                if [l.iso for l in old_audio_track_languages] != [l.iso for l in new_audio_track_languages]:
-                    tracks_language_modifier = TracksLanguageModifier(new_audio_track_languages)
-                    print("%ssetting audio track languages to %s%s" % (GREEN, new_audio_track_languages, RESET))
-                    metadata_modifiers.append(tracks_language_modifier)
-            if namespace.fix_title:
-                old_title = get_movie_title(Path(movie_file_path))
-                guessed_title = None
-                for title_guesser in title_guessers:
-                    guessed_title = title_guesser.guess_title(Path(movie_file_path))
-                    if guessed_title != None:
-                        break
-                if guessed_title == None:
-                    guessed_title = old_title
-                # print("Choose a title (old title : %s%s%s) : " % (CYAN, old_title, RESET), end='', flush=True)
-                # chosen_title = sys.stdin.readline().rstrip()
-                new_title = input("Choose a title (old title : %s'%s'%s) : " % (BOLD, old_title, RESET), guessed_title)
-                if new_title != old_title:
-                    print("%schanging title from '%s' to '%s'%s" % (GREEN, old_title, new_title, RESET))
-                    metadata_modifiers.append(TitleModifier(new_title))
+        title_guessers = create_title_guessers(namespace.title_guessers)
+        stats_collector = open_stats_collector(namespace.stats)
+        journal = open_run_journal(parser, Path(namespace.journal) if namespace.journal is not None else get_default_journal_file_path(namespace.movie_file_path, namespace.recursive), namespace.resume, namespace.discard_journal)
+        last_journal_entries = {}
+        if namespace.resume:
+            last_journal_entries = journal.read_last_entries()
+        else:
+            journal.clear()
+        modification_queue = ModificationQueue(namespace.jobs, namespace.queue_size, MovieVerifier(VerificationDepth[namespace.verify.upper()]), stats_collector, journal, BackupMode.NO_BACKUP if namespace.no_backup else BackupMode.MODIFY_ORIGINAL)
+        prompt_failures = []
+        num_done = 0
+        for movie_file_path in prefetch_movie_probes(iter_movie_file_paths(namespace.movie_file_path, namespace.recursive, namespace.changed_since), namespace.prefetch):
+            try:
+                if journal.resume(movie_file_path, last_journal_entries):
+                    num_done += 1
+                    continue
+                with measure_movie(stats_collector, movie_file_path), measure_stage('prompt'):
+                    metadata_modifiers = ask_metadata_modifiers(movie_file_path, namespace.fix_undefined_audio_languages, namespace.fix_title, title_guessers)
+            except Exception as e:
+                print(RED, "failed to process %s : %s" % (movie_file_path, e), RESET)
+                prompt_failures.append((movie_file_path, e))
+                metadata_modifiers = []
             if len(metadata_modifiers) != 0:
-                modify_movie_metadata(Path(movie_file_path), metadata_modifiers)
+                modification_queue.submit(movie_file_path, metadata_modifiers)
+            else:
+                if movie_file_path not in [prompt_failure[0] for prompt_failure in prompt_failures]:
+                    # nothing to modify : the movie file won't be prompted again on resume
+                    journal.record_done(movie_file_path)
+                if stats_collector is not None:
+                    stats_collector.finish_movie(movie_file_path)
+        modification_results = modification_queue.join()
+        journal.close()
+        if stats_collector is not None:
+            stats_collector.close()
+        failures = prompt_failures + [(movie_file_path, exception) for movie_file_path, _, exception in modification_results if exception is not None]
+        num_modified = len([exception for _, _, exception in modification_results if exception is None])
+        if namespace.resume:
+            print("%d video files already modified by the interrupted run" % num_done)
+        print("%d video files modified, %d failures" % (num_modified, len(failures)))
+        for movie_file_path, exception in failures:
+            print(RED, "failed to modify %s : %s" % (movie_file_path, exception), RESET)
+        if len(failures) != 0:
+            sys.exit(1)
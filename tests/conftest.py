@@ -0,0 +1,15 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+import videfix  # noqa: E402
+
+
+@pytest.fixture
+def header_probes(monkeypatch):
+    """
+    makes videfix probe the movie files from their headers only, as the synthetic movie files can't be probed by ffprobe
+    """
+    monkeypatch.setattr(videfix, 'probe_movie', lambda movie_file_path, use_ffprobe=False: videfix.MOVIE_PROBE_CACHE.get_probe(movie_file_path))
@@ -0,0 +1,167 @@
+"""
+tests the limits that the DeviceScheduler of videfix puts on the rewrites of each storage device
+"""
+import sys
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+import videfix  # noqa: E402
+
+
+class FakeClock:
+    """
+    a clock that only moves when it's told to, or when something sleeps
+    """
+
+    def __init__(self, now=1000000.0):
+        self.now = now
+        self.sleeps = []  # the duration of each sleep, in seconds
+
+    def time(self):
+        return self.now
+
+    def sleep(self, duration):
+        self.sleeps.append(duration)
+        self.now += duration
+
+
+def create_scheduler(tmp_path, max_rewrites_per_device=None, max_rate=None, fake_clock=None):
+    """
+    :param Path tmp_path:
+    :param int or None max_rewrites_per_device:
+    :param float or None max_rate:
+    :param FakeClock or None fake_clock: if None, the scheduler uses the real clock
+    :rtype DeviceScheduler:
+    """
+    if fake_clock is not None:
+        device_scheduler = videfix.DeviceScheduler(max_rewrites_per_device, max_rate, tmp_path / 'device_locks', fake_clock.time, fake_clock.sleep)
+    else:
+        device_scheduler = videfix.DeviceScheduler(max_rewrites_per_device, max_rate, tmp_path / 'device_locks')
+    device_scheduler.poll_interval = 0.01
+    return device_scheduler
+
+
+def run_rewrites(device_scheduler, file_paths):
+    """
+    runs a rewrite of each file in its own thread, each rewrite waiting for all the others to start or for a timeout
+
+    :param DeviceScheduler device_scheduler:
+    :param list(Path) file_paths:
+    :rtype int: the maximum number of rewrites that ran at the same time
+    """
+    lock = threading.Lock()
+    num_running_rewrites = [0]
+    max_num_running_rewrites = [0]
+    all_started = threading.Barrier(len(file_paths))
+
+    def rewrite(file_path):
+        with device_scheduler.rewrite_slot(file_path):
+            with lock:
+                num_running_rewrites[0] += 1
+                max_num_running_rewrites[0] = max(max_num_running_rewrites[0], num_running_rewrites[0])
+            try:
+                all_started.wait(timeout=0.3)
+            except threading.BrokenBarrierError:
+                pass
+            with lock:
+                num_running_rewrites[0] -= 1
+
+    threads = [threading.Thread(target=rewrite, args=(file_path,)) for file_path in file_paths]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return max_num_running_rewrites[0]
+
+
+@pytest.mark.parametrize('max_rewrites_per_device, expected_num_running_rewrites', [
+    (1, 1),
+    (2, 2),
+    # no limit
+    (None, 3),
+])
+def test_rewrites_of_a_device_are_limited(tmp_path, max_rewrites_per_device, expected_num_running_rewrites):
+    file_paths = []
+    for file_index in range(3):
+        file_path = tmp_path / ('movie_%d.mkv' % file_index)
+        file_path.write_bytes(b'x')
+        file_paths.append(file_path)
+
+    assert run_rewrites(create_scheduler(tmp_path, max_rewrites_per_device), file_paths) == expected_num_running_rewrites
+
+
+def test_slot_is_released_on_error(tmp_path):
+    device_scheduler = create_scheduler(tmp_path, max_rewrites_per_device=1)
+
+    with pytest.raises(ValueError):
+        with device_scheduler.rewrite_slot(tmp_path):
+            raise ValueError('failed rewrite')
+
+    # the slot is free again
+    with device_scheduler.rewrite_slot(tmp_path) as device_slot:
+        assert device_slot.device == tmp_path.stat().st_dev
+
+
+def test_devices_have_their_own_slots(tmp_path):
+    device_scheduler = create_scheduler(tmp_path, max_rewrites_per_device=1)
+    (tmp_path / 'device_locks').mkdir()
+
+    slot_fds = [device_scheduler._acquire_slot(device) for device in [1, 2]]
+    try:
+        assert len(set(slot_fds)) == 2
+    finally:
+        for slot_fd in slot_fds:
+            os.close(slot_fd)
+
+
+def test_rewrites_of_a_device_are_delayed_by_the_rate_limit(tmp_path):
+    fake_clock = FakeClock()
+    device_scheduler = create_scheduler(tmp_path, max_rate=1000.0, fake_clock=fake_clock)
+
+    with device_scheduler.rewrite_slot(tmp_path) as device_slot:
+        fake_clock.now += 1.0
+        device_slot.num_written_bytes = 5000
+    assert fake_clock.sleeps == [0.0]
+
+    # the 5000 bytes written from the start of the first rewrite take 5 seconds at 1000 bytes per second
+    with device_scheduler.rewrite_slot(tmp_path) as device_slot:
+        pass
+    assert fake_clock.sleeps == [0.0, 4.0]
+
+    # a rewrite that wrote nothing doesn't delay the next one, and the time spent since the last rewrite counts
+    fake_clock.now += 10.0
+    with device_scheduler.rewrite_slot(tmp_path) as device_slot:
+        device_slot.num_written_bytes = 2000
+    with device_scheduler.rewrite_slot(tmp_path) as device_slot:
+        pass
+    assert fake_clock.sleeps == [0.0, 4.0, 0.0, 2.0]
+
+
+def test_rate_limit_is_shared_by_the_schedulers(tmp_path):
+    # the worker processes of videfix each have their own scheduler, which share the state of the devices in the lock directory
+    fake_clock = FakeClock()
+    device_scheduler = create_scheduler(tmp_path, max_rate=1000.0, fake_clock=fake_clock)
+    other_device_scheduler = create_scheduler(tmp_path, max_rate=1000.0, fake_clock=fake_clock)
+
+    with device_scheduler.rewrite_slot(tmp_path) as device_slot:
+        device_slot.num_written_bytes = 3000
+    with other_device_scheduler.rewrite_slot(tmp_path) as device_slot:
+        pass
+
+    assert fake_clock.sleeps == [0.0, 3.0]
+
+
+def test_rate_limit_doesnt_apply_to_other_devices(tmp_path):
+    fake_clock = FakeClock()
+    device_scheduler = create_scheduler(tmp_path, max_rate=1000.0, fake_clock=fake_clock)
+    device = tmp_path.stat().st_dev
+
+    with device_scheduler.rewrite_slot(tmp_path) as device_slot:
+        device_slot.num_written_bytes = 3000
+
+    assert device_scheduler._update_available_time(device, lambda available_time: available_time) == fake_clock.now + 3.0
+    assert device_scheduler._update_available_time(device + 1, lambda available_time: available_time) == 0.0
@@ -0,0 +1,102 @@
+"""
+tests the search of the movie files of a directory tree by videfix (find_movie_files)
+"""
+import sys
+import os
+import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+import videfix  # noqa: E402
+
+
+def create_files(root_dir_path, file_paths):
+    """
+    :param Path root_dir_path:
+    :param list(str) file_paths: the paths of the files to create, relative to root_dir_path
+    """
+    for file_path in file_paths:
+        file_path = root_dir_path / file_path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(b'x')
+
+
+def find_movie_files(root_dir_path, changed_since=None):
+    """
+    :param Path root_dir_path:
+    :param datetime.datetime or None changed_since:
+    :rtype list(str): the movie files found, relative to root_dir_path
+    """
+    return [str(movie_file_path.relative_to(root_dir_path)) for movie_file_path in videfix.find_movie_files(root_dir_path, changed_since)]
+
+
+def test_movie_files_are_found_recursively(tmp_path):
+    create_files(tmp_path, ['b.mkv', 'a.avi', 'sub/deeper/d.mkv', 'sub/c.mp4', 'sub2/e.mkv', 'sub/f.mkv'])
+
+    # the files of a directory come before its subdirectories, in alphabetical order
+    assert find_movie_files(tmp_path) == ['a.avi', 'b.mkv', 'sub/c.mp4', 'sub/f.mkv', 'sub/deeper/d.mkv', 'sub2/e.mkv']
+
+
+@pytest.mark.parametrize('file_path, is_found', [
+    ('movie.mkv', True),
+    ('movie.MP4', True),
+    ('movie.Avi', True),
+    ('movie.mov', False),
+    ('movie.mkv.part', False),
+    ('movie.srt', False),
+    ('mkv', False),
+    # the backups and the temporary files of videfix
+    ('movie.asof_2021_03_04_05_06_07.mkv', False),
+    ('movie.asof_2021_03_04_05_06_07_2.mkv', False),
+    ('.movie.videfix_tmp.mkv', False),
+])
+def test_movie_files_are_found_by_suffix(tmp_path, file_path, is_found):
+    create_files(tmp_path, [file_path])
+
+    assert find_movie_files(tmp_path) == ([file_path] if is_found else [])
+
+
+def test_directories_are_not_movie_files(tmp_path):
+    create_files(tmp_path, ['movie.mkv/extras.mkv'])
+
+    assert find_movie_files(tmp_path) == ['movie.mkv/extras.mkv']
+
+
+def test_symbolic_links(tmp_path):
+    create_files(tmp_path, ['sub/movie.mkv'])
+    # a loop, which would make the walk endless if the symbolic links to directories were followed
+    (tmp_path / 'sub' / 'loop').symlink_to(tmp_path)
+    (tmp_path / 'other_sub').symlink_to(tmp_path / 'sub')
+    (tmp_path / 'link.mkv').symlink_to(tmp_path / 'sub' / 'movie.mkv')
+    (tmp_path / 'broken.mkv').symlink_to(tmp_path / 'missing.mkv')
+
+    assert find_movie_files(tmp_path) == ['link.mkv', 'sub/movie.mkv']
+
+
+def test_movie_files_changed_since(tmp_path):
+    create_files(tmp_path, ['old.mkv', 'sub/new.mkv', 'sub/cutoff.mkv'])
+    cutoff_date = datetime.datetime(2024, 6, 1, 12, 0, 0)
+    for file_path, date in [('old.mkv', datetime.datetime(2023, 1, 1)), ('sub/new.mkv', datetime.datetime(2024, 6, 1, 12, 0, 1)), ('sub/cutoff.mkv', cutoff_date)]:
+        os.utime(tmp_path / file_path, (date.timestamp(), date.timestamp()))
+    # the date of a directory doesn't matter
+    os.utime(tmp_path / 'sub', (0, 0))
+
+    assert find_movie_files(tmp_path) == ['old.mkv', 'sub/cutoff.mkv', 'sub/new.mkv']
+    assert find_movie_files(tmp_path, cutoff_date) == ['sub/new.mkv']
+    assert find_movie_files(tmp_path, datetime.datetime(2025, 1, 1)) == []
+
+
+def test_missing_directory_is_reported(tmp_path, capsys):
+    assert find_movie_files(tmp_path / 'missing') == []
+    assert 'failed to scan %s' % (tmp_path / 'missing') in capsys.readouterr().out
+
+
+def test_iter_movie_file_paths(tmp_path):
+    create_files(tmp_path, ['dir1/b.mkv', 'dir2/a.mkv'])
+
+    movie_file_paths = list(videfix.iter_movie_file_paths(['given.avi'], [str(tmp_path / 'dir2'), str(tmp_path / 'dir1')]))
+
+    # the movie files given explicitly come first, and aren't checked
+    assert movie_file_paths == [Path('given.avi'), tmp_path / 'dir2' / 'a.mkv', tmp_path / 'dir1' / 'b.mkv']
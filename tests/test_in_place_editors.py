@@ -0,0 +1,421 @@
+"""
+tests the in place editors of videfix (avi riff tags, matroska ebml elements, mp4 boxes) on small synthetic movie files
+
+the movie files only contain the headers that the editors read, along with some fake media data : they are not playable, but they are enough to check that the patches fit in the padding, that the editors fall back to a remux when the padding is too small, and that the patched headers are read back as expected.
+"""
+import sys
+import struct
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+import videfix  # noqa: E402
+
+
+def create_metadata_edit(title=None, audio_track_language_isos=None):
+    """
+    :param str or None title:
+    :param list(str) or None audio_track_language_isos:
+    :rtype videfix.MovieMetadataEdit:
+    """
+    metadata_edit = videfix.MovieMetadataEdit()
+    metadata_edit.title = title
+    if audio_track_language_isos is not None:
+        metadata_edit.audio_track_languages = [videfix.Language(language_iso=language_iso) for language_iso in audio_track_language_isos]
+    return metadata_edit
+
+
+def patch_movie_file(movie_file_path, metadata_edit):
+    """
+    :param Path movie_file_path:
+    :param videfix.MovieMetadataEdit metadata_edit:
+    :rtype list((int, bytes)) or None: the patches that were applied, or None if the edit can't be performed in place
+    """
+    in_place_editor = videfix.get_in_place_editor(videfix.get_movie_container_type(movie_file_path))
+    patches = in_place_editor.get_patches(movie_file_path, metadata_edit)
+    if patches is not None:
+        videfix.apply_file_patches(movie_file_path, patches)
+    return patches
+
+
+def read_title_and_languages(movie_file_path):
+    """
+    :param Path movie_file_path:
+    :rtype str, list(str): the title and the audio track languages read back by read_movie_headers
+    """
+    movie_probe = videfix.read_movie_headers(movie_file_path)
+    assert movie_probe is not None
+    return movie_probe.tags['title'], [stream.tags['language'] for stream in movie_probe.streams]
+
+
+# avi
+
+def build_riff_chunk(chunk_id, data):
+    return chunk_id + struct.pack('<I', len(data)) + data + (b'\0' if len(data) & 1 else b'')
+
+
+def build_riff_list(list_type, chunks):
+    return build_riff_chunk(b'LIST', list_type + b''.join(chunks))
+
+
+def build_avi_file(info_tags, junk_size=1016, num_audio_streams=2):
+    """
+    :param list((bytes, bytes)) info_tags: the riff tags of the LIST/INFO chunk
+    :param int junk_size: the size of the data of the JUNK chunk that follows the LIST/INFO chunk, 0 for no JUNK chunk
+    :param int num_audio_streams:
+    :rtype bytes:
+    """
+    stream_lists = [build_riff_list(b'strl', [build_riff_chunk(b'strh', b'vids' + b'\0' * 52)])]
+    stream_lists += [build_riff_list(b'strl', [build_riff_chunk(b'strh', b'auds' + b'\0' * 52)]) for _ in range(num_audio_streams)]
+    hdrl = build_riff_list(b'hdrl', [build_riff_chunk(b'avih', b'\0' * 56)] + stream_lists)
+    info = build_riff_list(b'INFO', [build_riff_chunk(tag_id, value) for tag_id, value in info_tags])
+    junk = build_riff_chunk(b'JUNK', b'\0' * junk_size) if junk_size != 0 else b''
+    movi = build_riff_list(b'movi', [build_riff_chunk(b'01wb', b'x' * 1001)])
+    body = b'AVI ' + hdrl + info + junk + movi + build_riff_chunk(b'idx1', b'\0' * 16)
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def test_avi_patch_fits_in_junk(tmp_path):
+    movie_file_path = tmp_path / 'movie.avi'
+    movie_file_path.write_bytes(build_avi_file([(b'ISFT', b'Lavf58.76.100\0'), (b'IAS1', b'English\0')]))
+    file_size = movie_file_path.stat().st_size
+    assert read_title_and_languages(movie_file_path) == ('', ['eng', 'und'])
+
+    patches = patch_movie_file(movie_file_path, create_metadata_edit('A movie', ['fra', 'deu']))
+
+    assert patches is not None
+    assert movie_file_path.stat().st_size == file_size
+    assert read_title_and_languages(movie_file_path) == ('A movie', ['fra', 'deu'])
+    # the other tags are kept
+    _, _, info_tags, _ = videfix.AviInfoEditor()._read_header_chunks(movie_file_path)
+    assert (b'ISFT', b'Lavf58.76.100\0') in info_tags
+
+
+@pytest.mark.parametrize('language_iso, expected_language_name', [
+    ('eng', b'English'),
+    ('fra', b'Francais'),
+    ('ell', b'Modern Greek'),
+    ('oci', b'Occitan'),
+    ('nob', 'Norwegian Bokmål'.encode('utf-8')),
+])
+def test_avi_languages_are_short_names(tmp_path, language_iso, expected_language_name):
+    # the official iso 639-2 names have commas and parentheses (eg 'Greek, Modern (1453-)')
+    movie_file_path = tmp_path / 'movie.avi'
+    movie_file_path.write_bytes(build_avi_file([(b'IAS1', b'English\0')], num_audio_streams=1))
+
+    patch_movie_file(movie_file_path, create_metadata_edit(audio_track_language_isos=[language_iso]))
+
+    _, _, info_tags, _ = videfix.AviInfoEditor()._read_header_chunks(movie_file_path)
+    assert dict(info_tags)[b'IAS1'].rstrip(b'\0') == expected_language_name
+    assert read_title_and_languages(movie_file_path) == ('', [language_iso])
+
+
+def test_avi_patch_absorbs_small_remaining_space(tmp_path):
+    # for each title length, the space left after the LIST/INFO chunk goes through the sizes that are too small for a JUNK chunk
+    for title_length in range(1, 20):
+        movie_file_path = tmp_path / ('movie_%d.avi' % title_length)
+        movie_file_path.write_bytes(build_avi_file([(b'INAM', b'x' * 10 + b'\0')], junk_size=8))
+        title = 'y' * title_length
+
+        patches = patch_movie_file(movie_file_path, create_metadata_edit(title))
+
+        assert patches is not None, title_length
+        assert read_title_and_languages(movie_file_path) == (title, ['und', 'und']), title_length
+
+
+def test_avi_patch_falls_back_without_junk(tmp_path):
+    movie_file_path = tmp_path / 'movie.avi'
+    movie_data = build_avi_file([(b'INAM', b'Old\0')], junk_size=0)
+    movie_file_path.write_bytes(movie_data)
+
+    assert patch_movie_file(movie_file_path, create_metadata_edit('A much longer title')) is None
+    assert movie_file_path.read_bytes() == movie_data
+
+
+# mkv
+
+def build_ebml_uint(element_id, value):
+    return videfix._build_ebml_element(element_id, value.to_bytes(max(1, (value.bit_length() + 7) // 8), 'big'))
+
+
+def build_mkv_file(title=None, audio_track_language_isos=('fre', None), void_size=100):
+    """
+    :param str or None title:
+    :param tuple(str or None) audio_track_language_isos: the Language of each audio track, None for none
+    :param int void_size: the size of the data of the Void elements that follow the Info and Tracks elements, 0 for no Void element
+    :rtype bytes:
+    """
+    build_element = videfix._build_ebml_element
+    ebml_header = build_element(videfix.EBML_ID_HEADER, build_element(videfix.EBML_ID_DOCTYPE, b'matroska') + build_ebml_uint(0x4287, 4))
+    info_payload = build_ebml_uint(0x2AD7B1, 1000000) + build_element(0x4D80, b'Lavf58.76.100')
+    if title is not None:
+        info_payload += build_element(videfix.MKV_ID_TITLE, title.encode('utf-8'))
+    info = build_element(videfix.MKV_ID_INFO, info_payload)
+    track_entries = [build_element(videfix.MKV_ID_TRACKENTRY, build_ebml_uint(0xD7, 1) + build_ebml_uint(videfix.MKV_ID_TRACKTYPE, 1) + build_element(0x86, b'V_MPEG4/ISO/AVC'))]
+    for track_index, language_iso in enumerate(audio_track_language_isos):
+        track_entry_payload = build_ebml_uint(0xD7, track_index + 2) + build_ebml_uint(videfix.MKV_ID_TRACKTYPE, videfix.MKV_TRACK_TYPE_AUDIO) + build_element(0x86, b'A_AAC')
+        if language_iso is not None:
+            track_entry_payload += build_element(videfix.MKV_ID_LANGUAGE, language_iso.encode('ascii'))
+        track_entries.append(build_element(videfix.MKV_ID_TRACKENTRY, track_entry_payload))
+    tracks = build_element(videfix.MKV_ID_TRACKS, b''.join(track_entries))
+    void = build_element(videfix.EBML_ID_VOID, b'\0' * void_size) if void_size != 0 else b''
+    cluster = build_element(videfix.MKV_ID_CLUSTER, build_ebml_uint(0xE7, 0) + build_element(0xA3, b'\x81\0\0\x80' + b'x' * 5000))
+    return ebml_header + build_element(videfix.MKV_ID_SEGMENT, info + void + tracks + void + cluster)
+
+
+def test_mkv_patch_fits_in_void(tmp_path):
+    movie_file_path = tmp_path / 'movie.mkv'
+    movie_file_path.write_bytes(build_mkv_file())
+    file_size = movie_file_path.stat().st_size
+    # the default language of a matroska track is english
+    assert read_title_and_languages(movie_file_path) == ('', ['fra', 'eng'])
+
+    patches = patch_movie_file(movie_file_path, create_metadata_edit('A movie', ['jpn', 'fra']))
+
+    assert patches is not None
+    assert movie_file_path.stat().st_size == file_size
+    assert read_title_and_languages(movie_file_path) == ('A movie', ['jpn', 'fra'])
+
+
+def test_mkv_patch_falls_back_without_void(tmp_path):
+    movie_file_path = tmp_path / 'movie.mkv'
+    movie_data = build_mkv_file(title='Old', void_size=0)
+    movie_file_path.write_bytes(movie_data)
+
+    assert patch_movie_file(movie_file_path, create_metadata_edit('A much longer title')) is None
+    assert movie_file_path.read_bytes() == movie_data
+
+
+@pytest.mark.parametrize('space_size', range(2, 300))
+def test_mkv_void_header_fills_space(space_size):
+    # a 1 byte size of 127 would mean an unknown size, so the void elements from 129 bytes have an 8 bytes size
+    void_header = videfix._build_ebml_void_header(space_size)
+    void = videfix._read_ebml_element_header(void_header, 0)
+    assert void.element_id == videfix.EBML_ID_VOID
+    assert void.data_size is not None
+    assert void.total_size == space_size
+
+
+def test_mkv_patch_leaves_every_void_size(tmp_path):
+    # the space left after the new Info element goes through the sizes around the switch to an 8 bytes void size, then down to 1 byte (too small for a void element) and 0 byte
+    void_size = 140
+    for title_length in range(0, void_size - 1):
+        movie_file_path = tmp_path / ('movie_%d.mkv' % title_length)
+        movie_file_path.write_bytes(build_mkv_file(void_size=void_size))
+        title = 'y' * title_length
+
+        patches = patch_movie_file(movie_file_path, create_metadata_edit(title))
+
+        assert patches is not None, title_length
+        # the Tracks element that follows the Void element is still found
+        assert read_title_and_languages(movie_file_path) == (title, ['fra', 'eng']), title_length
+
+
+def test_mkv_patch_falls_back_when_the_size_field_cant_grow(tmp_path, monkeypatch):
+    # the Info element is followed by a 2 bytes void element, and grows by 1 byte : the byte left can't be absorbed by the size of the Info element, which is already encoded on 8 bytes
+    build_master_element = videfix._build_ebml_master_element
+    monkeypatch.setattr(videfix, '_build_ebml_master_element', lambda element_id, children, size_length=None: build_master_element(element_id, children, 8 if size_length is None else size_length))
+    build_element = videfix._build_ebml_element
+    info = build_element(videfix.MKV_ID_INFO, build_element(videfix.MKV_ID_TITLE, b'x'), size_length=8)
+    movie_file_path = tmp_path / 'elements.mkv'
+    movie_file_path.write_bytes(info + build_element(videfix.EBML_ID_VOID, b''))
+
+    with open(movie_file_path, 'rb') as f:
+        element = videfix._read_ebml_element_header_at(f, 0)
+        patches = videfix.MkvEbmlEditor()._fit_element(f, element, videfix.MKV_ID_INFO, [(videfix.MKV_ID_TITLE, build_element(videfix.MKV_ID_TITLE, b'xy'))])
+
+    assert patches is None
+
+
+# mp4
+
+def build_mp4_box(box_type, payload):
+    return struct.pack('>I4s', len(payload) + 8, box_type) + payload
+
+
+def build_mp4_trak(handler_type, language_iso, mdat_offset):
+    packed_language = 0
+    for c in language_iso:
+        packed_language = (packed_language << 5) | (ord(c) - 0x60)
+    mdhd = build_mp4_box(b'mdhd', struct.pack('>IIIII', 0, 0, 0, 1000, 5000) + struct.pack('>HH', packed_language, 0))
+    hdlr = build_mp4_box(b'hdlr', struct.pack('>II4s12x', 0, 0, handler_type) + b'Handler\0')
+    stco = build_mp4_box(b'stco', struct.pack('>III', 0, 1, mdat_offset))
+    return build_mp4_box(b'trak', build_mp4_box(b'tkhd', b'\0' * 84) + build_mp4_box(b'mdia', mdhd + hdlr + build_mp4_box(b'minf', build_mp4_box(b'stbl', stco))))
+
+
+def build_mp4_file(title=None, audio_track_language_isos=('und', 'fra'), free_size=200, layout='moov_first'):
+    """
+    :param str or None title:
+    :param tuple(str) audio_track_language_isos:
+    :param int free_size: the size of the free box that follows the moov box, 0 for no free box
+    :param str layout: 'moov_first' for a moov box before the mdat box, 'moov_last' for a moov box at the end, 'mdat_to_end' for a moov box before a mdat box whose size is 0 (it extends to the end of the file)
+    :rtype bytes:
+    """
+    ftyp = build_mp4_box(b'ftyp', b'isom\0\0\2\0isomiso2mp41')
+    free = build_mp4_box(b'free', b'\0' * (free_size - 8)) if free_size != 0 else b''
+    media_data = b'M' * 4000
+
+    def build_moov(mdat_offset):
+        ilst_items = build_mp4_box(b'\xa9too', build_mp4_box(b'data', struct.pack('>II', 1, 0) + b'Lavf58.76.100'))
+        if title is not None:
+            ilst_items += build_mp4_box(b'\xa9nam', build_mp4_box(b'data', struct.pack('>II', 1, 0) + title.encode('utf-8')))
+        meta = build_mp4_box(b'meta', struct.pack('>I', 0) + build_mp4_box(b'hdlr', struct.pack('>II4s4sII', 0, 0, b'mdir', b'appl', 0, 0) + b'\0') + build_mp4_box(b'ilst', ilst_items))
+        traks = [build_mp4_trak(b'vide', 'und', mdat_offset)] + [build_mp4_trak(b'soun', language_iso, mdat_offset) for language_iso in audio_track_language_isos]
+        return build_mp4_box(b'moov', build_mp4_box(b'mvhd', b'\0' * 100) + b''.join(traks) + build_mp4_box(b'udta', meta))
+
+    if layout == 'moov_last':
+        mdat_offset = len(ftyp) + 8
+        return ftyp + build_mp4_box(b'mdat', media_data) + build_moov(mdat_offset)
+    # the size of the moov box doesn't depend on the chunk offsets
+    mdat_offset = len(ftyp) + len(build_moov(0)) + len(free) + 8
+    if layout == 'mdat_to_end':
+        return ftyp + build_moov(mdat_offset) + free + struct.pack('>I4s', 0, b'mdat') + media_data
+    return ftyp + build_moov(mdat_offset) + free + build_mp4_box(b'mdat', media_data)
+
+
+def read_mp4_top_level_boxes(movie_file_path):
+    """
+    :param Path movie_file_path:
+    :rtype list(videfix.Mp4Box):
+    """
+    data = movie_file_path.read_bytes()
+    return videfix._parse_mp4_children(data, 0, len(data))
+
+
+def read_mp4_media_data(movie_file_path):
+    """
+    :param Path movie_file_path:
+    :rtype bytes: the first bytes of the media data, read at the chunk offset of the audio tracks
+    """
+    data = movie_file_path.read_bytes()
+    moov = [box for box in read_mp4_top_level_boxes(movie_file_path) if box.box_type == b'moov'][0]
+    chunk_offset_pos = data.index(b'stco', moov.offset) + 4 + 8
+    chunk_offset = struct.unpack('>I', data[chunk_offset_pos:chunk_offset_pos + 4])[0]
+    return data[chunk_offset:chunk_offset + 16]
+
+
+def test_mp4_languages_are_patched_in_place(tmp_path):
+    movie_file_path = tmp_path / 'movie.mp4'
+    movie_data = build_mp4_file(free_size=0, layout='moov_first')
+    movie_file_path.write_bytes(movie_data)
+
+    patches = patch_movie_file(movie_file_path, create_metadata_edit(None, ['eng', 'jpn']))
+
+    # the language fields of the mdhd boxes have a fixed size
+    assert [len(data) for _, data in patches] == [2, 2]
+    assert len(movie_file_path.read_bytes()) == len(movie_data)
+    assert read_title_and_languages(movie_file_path) == ('', ['eng', 'jpn'])
+
+
+def test_mp4_title_fits_in_free_box(tmp_path):
+    movie_file_path = tmp_path / 'movie.mp4'
+    movie_file_path.write_bytes(build_mp4_file(title='Old'))
+    file_size = movie_file_path.stat().st_size
+
+    patches = patch_movie_file(movie_file_path, create_metadata_edit('A movie', ['eng', 'fra']))
+
+    assert patches is not None
+    assert movie_file_path.stat().st_size == file_size
+    assert read_title_and_languages(movie_file_path) == ('A movie', ['eng', 'fra'])
+    assert [box.box_type for box in read_mp4_top_level_boxes(movie_file_path)] == [b'ftyp', b'moov', b'free', b'mdat']
+    assert read_mp4_media_data(movie_file_path) == b'M' * 16
+
+
+def test_mp4_moov_is_moved_to_the_end(tmp_path):
+    movie_file_path = tmp_path / 'movie.mp4'
+    movie_file_path.write_bytes(build_mp4_file(title='Old', free_size=0))
+    file_size = movie_file_path.stat().st_size
+
+    patches = patch_movie_file(movie_file_path, create_metadata_edit('A much longer title'))
+
+    assert patches is not None
+    assert movie_file_path.stat().st_size > file_size
+    assert read_title_and_languages(movie_file_path) == ('A much longer title', ['und', 'fra'])
+    # the old moov box is turned into a free box, and the media data doesn't move
+    assert [box.box_type for box in read_mp4_top_level_boxes(movie_file_path)] == [b'ftyp', b'free', b'mdat', b'moov']
+    assert read_mp4_media_data(movie_file_path) == b'M' * 16
+
+
+def test_mp4_last_moov_grows_at_the_end(tmp_path):
+    movie_file_path = tmp_path / 'movie.mp4'
+    movie_file_path.write_bytes(build_mp4_file(title='Old', free_size=0, layout='moov_last'))
+
+    patches = patch_movie_file(movie_file_path, create_metadata_edit('A much longer title'))
+
+    assert patches is not None
+    assert read_title_and_languages(movie_file_path) == ('A much longer title', ['und', 'fra'])
+    assert [box.box_type for box in read_mp4_top_level_boxes(movie_file_path)] == [b'ftyp', b'mdat', b'moov']
+    assert read_mp4_media_data(movie_file_path) == b'M' * 16
+
+
+def test_mp4_patch_falls_back_when_mdat_extends_to_the_end(tmp_path):
+    movie_file_path = tmp_path / 'movie.mp4'
+    movie_data = build_mp4_file(title='Old', free_size=0, layout='mdat_to_end')
+    movie_file_path.write_bytes(movie_data)
+
+    assert patch_movie_file(movie_file_path, create_metadata_edit('A much longer title')) is None
+    assert movie_file_path.read_bytes() == movie_data
+
+
+# modify_movie_metadata
+
+@pytest.mark.parametrize('backup_mode', [videfix.BackupMode.MODIFY_ORIGINAL, videfix.BackupMode.NO_BACKUP])
+def test_patch_saves_only_the_overwritten_bytes(tmp_path, header_probes, backup_mode):
+    movie_file_path = tmp_path / 'movie.avi'
+    movie_data = build_avi_file([(b'INAM', b'Old\0')])
+    movie_file_path.write_bytes(movie_data)
+
+    modification_report = videfix.modify_movie_metadata(movie_file_path, [videfix.TitleModifier('A movie')], videfix.MovieVerifier(videfix.VerificationDepth.HEADER), backup_mode=backup_mode)
+
+    assert modification_report.edit_strategy == 'in place'
+    # the movie file isn't copied
+    assert modification_report.num_rewritten_bytes < 100
+    assert read_title_and_languages(movie_file_path) == ('A movie', ['und', 'und'])
+    if backup_mode == videfix.BackupMode.NO_BACKUP:
+        assert modification_report.backup_file_path is None
+        assert sorted(tmp_path.iterdir()) == [movie_file_path]
+    else:
+        assert modification_report.backup_strategy_name == 'undo record'
+        assert sorted(tmp_path.iterdir()) == sorted([movie_file_path, modification_report.backup_file_path])
+        assert modification_report.backup_file_path.stat().st_size < 1000
+        videfix.restore_undo_record_file(movie_file_path, modification_report.backup_file_path)
+        assert movie_file_path.read_bytes() == movie_data
+
+
+def test_moved_moov_patch_is_undone(tmp_path, header_probes):
+    movie_file_path = tmp_path / 'movie.mp4'
+    movie_data = build_mp4_file(title='Old', free_size=0)
+    movie_file_path.write_bytes(movie_data)
+
+    modification_report = videfix.modify_movie_metadata(movie_file_path, [videfix.TitleModifier('A much longer title')], videfix.MovieVerifier(videfix.VerificationDepth.HEADER))
+
+    assert len(movie_file_path.read_bytes()) > len(movie_data)
+    # the moov box appended to the file is removed by the undo record
+    videfix.restore_undo_record_file(movie_file_path, modification_report.backup_file_path)
+    assert movie_file_path.read_bytes() == movie_data
+
+
+def test_failed_patch_is_undone(tmp_path, header_probes, monkeypatch):
+    movie_file_path = tmp_path / 'movie.mkv'
+    movie_data = build_mkv_file(title='Old')
+    movie_file_path.write_bytes(movie_data)
+    monkeypatch.setattr(videfix.TitleModifier, 'check_modified_movie', lambda self, dst_movie_file_path: (False, 'unexpected title'))
+
+    with pytest.raises(AssertionError, match='unexpected title'):
+        videfix.modify_movie_metadata(movie_file_path, [videfix.TitleModifier('A movie')], videfix.MovieVerifier(videfix.VerificationDepth.HEADER))
+
+    assert movie_file_path.read_bytes() == movie_data
+    assert sorted(tmp_path.iterdir()) == [movie_file_path]
+
+
+def test_undo_record_refuses_a_modified_movie_file(tmp_path, header_probes):
+    movie_file_path = tmp_path / 'movie.avi'
+    movie_file_path.write_bytes(build_avi_file([(b'INAM', b'Old\0')]))
+    modification_report = videfix.modify_movie_metadata(movie_file_path, [videfix.TitleModifier('A movie')], videfix.MovieVerifier(videfix.VerificationDepth.HEADER))
+    patch_movie_file(movie_file_path, create_metadata_edit('Another movie'))
+    modified_data = movie_file_path.read_bytes()
+
+    with pytest.raises(AssertionError, match='has been modified since'):
+        videfix.restore_undo_record_file(movie_file_path, modification_report.backup_file_path)
+    assert movie_file_path.read_bytes() == modified_data
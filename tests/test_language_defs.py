@@ -0,0 +1,62 @@
+"""
+tests the lookups of the iso 639-2 languages of videfix
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+import videfix  # noqa: E402
+
+
+@pytest.mark.parametrize('iso_or_pseudo_iso, expected_language_iso, expected_norm', [
+    ('fra', 'fra', 'iso 639-2/T'),
+    ('deu', 'deu', 'iso 639-2/T'),
+    ('chu', 'chu', 'iso 639-2/T'),
+    ('fre', 'fra', 'iso 639-2/B'),
+    ('ger', 'deu', 'iso 639-2/B'),
+    ('gre', 'ell', 'iso 639-2/B'),
+    ('fr', 'fra', 'iso 639-1'),
+    ('el', 'ell', 'iso 639-1'),
+    ('nb', 'nob', 'iso 639-1'),
+    # the languages without an iso 639-1 code
+    ('haw', 'haw', 'iso 639-2/T'),
+    ('und', 'und', 'iso 639-2/T'),
+])
+def test_find_language_iso(iso_or_pseudo_iso, expected_language_iso, expected_norm):
+    assert videfix.LANGUAGE_DEFS.find_language_iso(iso_or_pseudo_iso) == (expected_language_iso, expected_norm)
+
+
+@pytest.mark.parametrize('iso_or_pseudo_iso', ['xyz', 'qaa', 'FRA', 'french', '', 'f', 'fraa'])
+def test_find_language_iso_rejects_unknown_codes(iso_or_pseudo_iso):
+    assert videfix.LANGUAGE_DEFS.find_language_iso(iso_or_pseudo_iso) == (None, None)
+
+
+@pytest.mark.parametrize('language_name, expected_language_iso', [
+    ('English', 'eng'),
+    ('english', 'eng'),
+    # the names that videfix has always written in avi files
+    ('Francais', 'fra'),
+    ('Unknown', 'und'),
+    # both the official name and the short name written in avi files
+    ('French', 'fra'),
+    ('Greek, Modern (1453-)', 'ell'),
+    ('Modern Greek', 'ell'),
+    ('Tonga (Nyasa)', 'tog'),
+    ('Nyasa Tonga', 'tog'),
+    ('Tonga', 'ton'),
+    ('Elvish', None),
+])
+def test_language_name_to_id(language_name, expected_language_iso):
+    assert videfix.LANGUAGE_DEFS.language_name_to_id(language_name) == expected_language_iso
+
+
+def test_language_names_are_short_and_unique():
+    # the names are written in riff IAS<n> tags, and read back to find the language
+    language_names = videfix.LANGUAGE_DEFS.names()
+
+    assert len(set([language_name.lower() for language_name in language_names])) == len(language_names)
+    assert [language_name for language_name in language_names if any(c in language_name for c in ',;()')] == []
+    for language_iso in videfix.LANGUAGE_DEFS.isos():
+        assert videfix.LANGUAGE_DEFS.language_name_to_id(videfix.Language(language_iso=language_iso).name) == language_iso
@@ -0,0 +1,157 @@
+"""
+tests the manifests of videfix apply-manifest : how they are read, how their rows are validated, and the status reported for each row
+"""
+import sys
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+import videfix  # noqa: E402
+from test_in_place_editors import build_mkv_file, read_title_and_languages  # noqa: E402
+
+
+def read_manifest_text(tmp_path, manifest_file_name, manifest_text):
+    """
+    :param Path tmp_path:
+    :param str manifest_file_name: its suffix tells the format of the manifest
+    :param str manifest_text:
+    :rtype list((int, str, list(str) or None, str or None)): the line number, path, languages and title of each row
+    """
+    manifest_file_path = tmp_path / manifest_file_name
+    manifest_file_path.write_text(manifest_text, encoding='utf-8')
+    return [(row.line_number, str(row.movie_file_path), row.audio_track_language_isos, row.title) for row in videfix.read_manifest(manifest_file_path)]
+
+
+@pytest.mark.parametrize('manifest_file_name, manifest_text, expected_rows', [
+    ('manifest.csv', 'path,languages,title\na.mkv,fra eng,A movie\n', [(2, 'a.mkv', ['fra', 'eng'], 'A movie')]),
+    # an empty cell leaves the languages or the title unchanged
+    ('manifest.csv', 'path,languages,title\na.mkv,,\nb.mkv, ,B\n', [(2, 'a.mkv', None, None), (3, 'b.mkv', None, 'B')]),
+    ('manifest.csv', 'title,path\n"A movie, part 1",a.mkv\n', [(2, 'a.mkv', None, 'A movie, part 1')]),
+    ('manifest.CSV', 'path\na.mkv\n', [(2, 'a.mkv', None, None)]),
+    ('manifest.jsonl', '{"path": "a.mkv", "languages": ["fra", "eng"], "title": "A movie"}\n', [(1, 'a.mkv', ['fra', 'eng'], 'A movie')]),
+    # a missing or null value leaves the languages or the title unchanged
+    ('manifest.jsonl', '{"path": "a.mkv"}\n\n{"path": "b.mkv", "languages": null, "title": "B"}\n', [(1, 'a.mkv', None, None), (3, 'b.mkv', None, 'B')]),
+    ('manifest.json', '{"path": "a.mkv", "title": ""}\n', [(1, 'a.mkv', None, '')]),
+])
+def test_read_manifest(tmp_path, manifest_file_name, manifest_text, expected_rows):
+    assert read_manifest_text(tmp_path, manifest_file_name, manifest_text) == expected_rows
+
+
+@pytest.mark.parametrize('manifest_file_name, manifest_text, expected_error', [
+    ('manifest.csv', 'a.mkv,fra eng,A movie\n', 'header line'),
+    ('manifest.csv', '', 'header line'),
+    ('manifest.jsonl', '{"title": "A movie"}\n', 'line 1 .* a json object with a path'),
+    ('manifest.jsonl', '["a.mkv"]\n', 'line 1 .* a json object with a path'),
+])
+def test_read_manifest_rejects_malformed_manifests(tmp_path, manifest_file_name, manifest_text, expected_error):
+    with pytest.raises(AssertionError, match=expected_error):
+        read_manifest_text(tmp_path, manifest_file_name, manifest_text)
+
+
+@pytest.fixture
+def movie_file_path(tmp_path, header_probes):
+    """
+    a matroska file titled 'Old', whose audio tracks are french and english
+    """
+    movie_file_path = tmp_path / 'movie.mkv'
+    movie_file_path.write_bytes(build_mkv_file(title='Old'))
+    return movie_file_path
+
+
+@pytest.mark.parametrize('audio_track_language_isos, title, expected_modifier_types', [
+    (None, None, []),
+    (['fra', 'eng'], 'Old', []),
+    # the iso 639-2/B codes are converted to iso 639-2/T ones
+    (['fre', 'eng'], None, []),
+    (['eng', 'fra'], None, [videfix.TracksLanguageModifier]),
+    (None, 'A movie', [videfix.TitleModifier]),
+    (['eng', 'fra'], 'A movie', [videfix.TracksLanguageModifier, videfix.TitleModifier]),
+])
+def test_validate_manifest_row(movie_file_path, audio_track_language_isos, title, expected_modifier_types):
+    modifiers = videfix.validate_manifest_row(videfix.ManifestRow(2, movie_file_path, audio_track_language_isos, title))
+
+    assert [type(modifier) for modifier in modifiers] == expected_modifier_types
+
+
+@pytest.mark.parametrize('file_name, audio_track_language_isos, expected_error', [
+    ('missing.mkv', None, 'is not a file'),
+    ('movie.txt', None, 'unexpected suffix'),
+    ('movie.mkv', ['fra', 'xyz'], 'unexpected language iso'),
+    ('movie.mkv', ['fra'], '1 languages are given for the 2 audio tracks'),
+])
+def test_validate_manifest_row_rejects_invalid_rows(movie_file_path, file_name, audio_track_language_isos, expected_error):
+    if file_name == 'movie.txt':
+        movie_file_path.with_name(file_name).write_bytes(movie_file_path.read_bytes())
+    with pytest.raises(AssertionError, match=expected_error):
+        videfix.validate_manifest_row(videfix.ManifestRow(2, movie_file_path.with_name(file_name), audio_track_language_isos, None))
+
+
+def apply_manifest_rows(manifest_rows, skip_invalid_rows=False, journal=None, resume=False):
+    """
+    :param list(ManifestRow) manifest_rows:
+    :param bool skip_invalid_rows:
+    :param ModificationJournal or None journal:
+    :param bool resume:
+    :rtype (dict(str, int), list((int, str))): the number of rows for each status (without the statuses of no row), and the line and status of each row in the report
+    """
+    report_file = io.StringIO()
+    status_counts = videfix.apply_manifest(manifest_rows, report_file, verification_depth=videfix.VerificationDepth.HEADER, skip_invalid_rows=skip_invalid_rows, journal=journal, resume=resume, backup_mode=videfix.BackupMode.NO_BACKUP)
+    row_reports = [json.loads(line) for line in report_file.getvalue().splitlines()]
+    return dict([(status, count) for status, count in status_counts.items() if count != 0]), [(row_report['line'], row_report['status']) for row_report in row_reports]
+
+
+@pytest.mark.parametrize('skip_invalid_rows, expected_status_counts, expected_statuses, expected_title', [
+    # no row is applied when a row is invalid
+    (False, {'invalid': 2, 'unchanged': 1, 'skipped': 1}, [(3, 'invalid'), (4, 'unchanged'), (5, 'invalid'), (2, 'skipped')], 'Old'),
+    (True, {'invalid': 2, 'unchanged': 1, 'modified': 1}, [(3, 'invalid'), (4, 'unchanged'), (5, 'invalid'), (2, 'modified')], 'A movie'),
+])
+def test_apply_manifest_with_invalid_rows(movie_file_path, skip_invalid_rows, expected_status_counts, expected_statuses, expected_title):
+    unchanged_movie_file_path = movie_file_path.with_name('unchanged.mkv')
+    unchanged_movie_file_path.write_bytes(build_mkv_file(title='Unchanged'))
+    manifest_rows = [
+        videfix.ManifestRow(2, movie_file_path, None, 'A movie'),
+        videfix.ManifestRow(3, movie_file_path.with_name('missing.mkv'), None, 'A movie'),
+        videfix.ManifestRow(4, unchanged_movie_file_path, ['fra', 'eng'], 'Unchanged'),
+        # a movie file can't be listed twice
+        videfix.ManifestRow(5, movie_file_path, None, 'Another movie'),
+    ]
+
+    status_counts, statuses = apply_manifest_rows(manifest_rows, skip_invalid_rows)
+
+    assert status_counts == expected_status_counts
+    assert statuses == expected_statuses
+    assert read_title_and_languages(movie_file_path) == (expected_title, ['fra', 'eng'])
+
+
+def test_apply_manifest_reports_failed_rows(movie_file_path, monkeypatch):
+    monkeypatch.setattr(videfix.TitleModifier, 'check_modified_movie', lambda self, dst_movie_file_path: (False, 'unexpected title'))
+    modified_movie_file_path = movie_file_path.with_name('modified.mkv')
+    modified_movie_file_path.write_bytes(build_mkv_file())
+    manifest_rows = [
+        videfix.ManifestRow(2, movie_file_path, None, 'A movie'),
+        videfix.ManifestRow(3, modified_movie_file_path, ['eng', 'fra'], None),
+    ]
+
+    status_counts, statuses = apply_manifest_rows(manifest_rows)
+
+    assert status_counts == {'failed': 1, 'modified': 1}
+    assert statuses == [(2, 'failed'), (3, 'modified')]
+    # the failed modification is undone
+    assert read_title_and_languages(movie_file_path) == ('Old', ['fra', 'eng'])
+    assert read_title_and_languages(modified_movie_file_path) == ('', ['eng', 'fra'])
+
+
+def test_apply_manifest_resumes_a_run(movie_file_path):
+    journal = videfix.ModificationJournal(movie_file_path.with_name('journal.jsonl'))
+    try:
+        manifest_rows = [videfix.ManifestRow(2, movie_file_path, None, 'A movie')]
+        assert apply_manifest_rows(manifest_rows, journal=journal) == ({'modified': 1}, [(2, 'modified')])
+
+        # the rows applied by the previous run are neither validated nor applied again
+        manifest_rows.append(videfix.ManifestRow(3, movie_file_path.with_name('missing.mkv'), None, 'A movie'))
+        assert apply_manifest_rows(manifest_rows, journal=journal, resume=True) == ({'done': 1, 'invalid': 1}, [(2, 'done'), (3, 'invalid')])
+    finally:
+        journal.close()
@@ -0,0 +1,256 @@
+"""
+tests that the journal of videfix brings the movie files of an interrupted run back to a consistent state on --resume
+
+the interrupted runs are simulated by writing the journal entries that a run would have written up to the phase it was interrupted at, along with the files it would have left behind.
+"""
+import sys
+import argparse
+import json
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+import videfix  # noqa: E402
+
+
+MOVIE_DATA = b'0123456789' * 100
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = videfix.ModificationJournal(tmp_path / 'journal.jsonl')
+    yield journal
+    journal.close()
+
+
+def create_movie_file(dir_path, movie_data=MOVIE_DATA):
+    """
+    :param Path dir_path:
+    :param bytes movie_data:
+    :rtype Path:
+    """
+    movie_file_path = dir_path / 'movie.mkv'
+    movie_file_path.write_bytes(movie_data)
+    return movie_file_path
+
+
+def read_last_phase(journal, movie_file_path):
+    """
+    :param ModificationJournal journal:
+    :param Path movie_file_path:
+    :rtype str:
+    """
+    return journal.read_last_entries()[str(movie_file_path)]['phase']
+
+
+def resume(journal, movie_file_path):
+    """
+    resumes the modification of a movie file, as --resume does
+
+    :param ModificationJournal journal:
+    :param Path movie_file_path:
+    :rtype bool: True if the modification of the movie file is over
+    """
+    return journal.resume(movie_file_path, journal.read_last_entries())
+
+
+# in place patches
+
+@pytest.mark.parametrize('has_undo_record_file', [True, False])
+def test_resume_rolls_back_an_interrupted_patch(tmp_path, journal, has_undo_record_file):
+    movie_file_path = create_movie_file(tmp_path)
+    # the second patch extends the movie file, as a moov box moved to the end of an mp4 file
+    patches = [(10, b'xxxx'), (995, b'y' * 20)]
+    undo_record = videfix.read_undo_record(movie_file_path, patches)
+    undo_record_file_path = None
+    if has_undo_record_file:
+        # the undo record is also saved next to the movie file with BackupMode.MODIFY_ORIGINAL
+        undo_record_file_path = videfix.get_backup_file_path(movie_file_path, videfix.UNDO_RECORD_FILE_SUFFIX)
+        journal.record(movie_file_path, videfix.JournalPhase.BACKING_UP, backup_file_path=str(undo_record_file_path))
+        videfix.write_undo_record_file(undo_record_file_path, undo_record)
+    journal.record(movie_file_path, videfix.JournalPhase.PATCHING, backup_file_path=str(undo_record_file_path) if undo_record_file_path is not None else None, undo_record=undo_record)
+    # the run is interrupted after the second patch
+    videfix.apply_file_patches(movie_file_path, patches[1:])
+
+    assert not resume(journal, movie_file_path)
+
+    assert movie_file_path.read_bytes() == MOVIE_DATA
+    assert sorted(tmp_path.iterdir()) == sorted([movie_file_path, journal.journal_file_path])
+    assert read_last_phase(journal, movie_file_path) == 'rolled_back'
+    assert journal.get_unfinished_file_paths() == []
+
+
+def test_resume_removes_an_interrupted_undo_record_file(tmp_path, journal):
+    movie_file_path = create_movie_file(tmp_path)
+    undo_record_file_path = videfix.get_backup_file_path(movie_file_path, videfix.UNDO_RECORD_FILE_SUFFIX)
+    journal.record(movie_file_path, videfix.JournalPhase.BACKING_UP, backup_file_path=str(undo_record_file_path))
+    undo_record_file_path.write_text('{"file_size": 10')
+
+    assert not resume(journal, movie_file_path)
+
+    assert movie_file_path.read_bytes() == MOVIE_DATA
+    assert not undo_record_file_path.exists()
+
+
+# remuxes
+
+def test_resume_removes_an_interrupted_remux(tmp_path, journal):
+    movie_file_path = create_movie_file(tmp_path)
+    temporary_file_path = videfix.get_temporary_file_path(movie_file_path)
+    journal.record(movie_file_path, videfix.JournalPhase.PROBED)
+    journal.record(movie_file_path, videfix.JournalPhase.REMUXING, temporary_file_path=str(temporary_file_path))
+    temporary_file_path.write_bytes(b'half remuxed')
+
+    assert not resume(journal, movie_file_path)
+
+    assert movie_file_path.read_bytes() == MOVIE_DATA
+    assert not temporary_file_path.exists()
+
+
+def test_resume_removes_an_interrupted_remux_backup(tmp_path, journal):
+    movie_file_path = create_movie_file(tmp_path)
+    temporary_file_path = videfix.get_temporary_file_path(movie_file_path)
+    backup_file_path = videfix.get_backup_file_path(movie_file_path)
+    journal.record(movie_file_path, videfix.JournalPhase.REMUXING, temporary_file_path=str(temporary_file_path))
+    temporary_file_path.write_bytes(b'remuxed')
+    journal.record(movie_file_path, videfix.JournalPhase.BACKING_UP, backup_file_path=str(backup_file_path), temporary_file_path=str(temporary_file_path))
+    backup_file_path.write_bytes(MOVIE_DATA[:10])
+
+    assert not resume(journal, movie_file_path)
+
+    assert movie_file_path.read_bytes() == MOVIE_DATA
+    assert sorted(tmp_path.iterdir()) == sorted([movie_file_path, journal.journal_file_path])
+
+
+@pytest.mark.parametrize('is_replaced', [False, True])
+def test_resume_finishes_a_verified_remux(tmp_path, journal, is_replaced):
+    movie_file_path = create_movie_file(tmp_path)
+    temporary_file_path = videfix.get_temporary_file_path(movie_file_path)
+    journal.record(movie_file_path, videfix.JournalPhase.REMUXING, temporary_file_path=str(temporary_file_path))
+    temporary_file_path.write_bytes(b'remuxed')
+    journal.record(movie_file_path, videfix.JournalPhase.VERIFIED, backup_file_path=None, temporary_file_path=str(temporary_file_path), drop_backup=False)
+    if is_replaced:
+        # the run is interrupted after the temporary file has replaced the movie file, before the modification is recorded as done
+        temporary_file_path.replace(movie_file_path)
+
+    assert resume(journal, movie_file_path)
+
+    assert movie_file_path.read_bytes() == b'remuxed'
+    assert not temporary_file_path.exists()
+    assert read_last_phase(journal, movie_file_path) == 'done'
+    # the modification isn't done again
+    assert resume(journal, movie_file_path)
+
+
+# modified backups
+
+@pytest.mark.parametrize('phase', [videfix.JournalPhase.BACKED_UP, videfix.JournalPhase.MODIFIED])
+def test_resume_removes_an_interrupted_modified_backup(tmp_path, journal, phase):
+    movie_file_path = create_movie_file(tmp_path)
+    backup_file_path = videfix.get_backup_file_path(movie_file_path)
+    backup_file_path.write_bytes(b'half modified')
+    # with BackupMode.MODIFY_BACKUP, the backup is the destination of the modification
+    journal.record(movie_file_path, phase, backup_file_path=str(backup_file_path), source_file_path=str(movie_file_path), destination_file_path=str(backup_file_path))
+
+    assert not resume(journal, movie_file_path)
+
+    assert movie_file_path.read_bytes() == MOVIE_DATA
+    assert not backup_file_path.exists()
+    assert read_last_phase(journal, movie_file_path) == 'rolled_back'
+
+
+def test_resume_restores_the_backup_of_a_modified_movie_file(tmp_path, journal):
+    movie_file_path = create_movie_file(tmp_path, b'half modified')
+    backup_file_path = videfix.get_backup_file_path(movie_file_path)
+    backup_file_path.write_bytes(MOVIE_DATA)
+    journal.record(movie_file_path, videfix.JournalPhase.MODIFIED, backup_file_path=str(backup_file_path), source_file_path=str(backup_file_path), destination_file_path=str(movie_file_path))
+
+    assert not resume(journal, movie_file_path)
+
+    assert movie_file_path.read_bytes() == MOVIE_DATA
+    assert not backup_file_path.exists()
+    assert read_last_phase(journal, movie_file_path) == 'rolled_back'
+
+
+# finished modifications
+
+def test_resume_redoes_a_movie_file_modified_since(tmp_path, journal):
+    movie_file_path = create_movie_file(tmp_path)
+    journal.record_done(movie_file_path)
+    assert resume(journal, movie_file_path)
+
+    movie_file_path.write_bytes(MOVIE_DATA + b'more')
+
+    assert not resume(journal, movie_file_path)
+
+
+def test_resume_ignores_unknown_movie_files(tmp_path, journal):
+    assert not resume(journal, create_movie_file(tmp_path))
+
+
+def test_journal_ignores_a_cut_last_line(tmp_path, journal):
+    movie_file_path = create_movie_file(tmp_path)
+    journal.record(movie_file_path, videfix.JournalPhase.PROBED)
+    line = json.dumps({'path': str(movie_file_path), 'phase': 'remuxing', 'temporary_file_path': str(tmp_path / 'movie.tmp.mkv')})
+    with open(journal.journal_file_path, 'a') as journal_file:
+        journal_file.write(line[:len(line) // 2])
+
+    assert read_last_phase(journal, movie_file_path) == 'probed'
+
+
+# clearing and locking
+
+def test_clear_keeps_unfinished_modifications(tmp_path, journal):
+    finished_movie_file_path = create_movie_file(tmp_path)
+    journal.record_done(finished_movie_file_path)
+    journal.clear()
+    assert journal.read_last_entries() == {}
+
+    movie_file_path = tmp_path / 'other_movie.mkv'
+    movie_file_path.write_bytes(MOVIE_DATA)
+    journal.record(movie_file_path, videfix.JournalPhase.PROBED)
+    assert journal.get_unfinished_file_paths() == [str(movie_file_path)]
+
+    with pytest.raises(AssertionError, match='1 unfinished modifications'):
+        journal.clear()
+    assert journal.get_unfinished_file_paths() == [str(movie_file_path)]
+
+    journal.clear(discard_unfinished=True)
+    assert journal.read_last_entries() == {}
+
+
+def test_journal_is_locked_by_one_run(tmp_path, journal):
+    journal.lock()
+    other_journal = videfix.ModificationJournal(journal.journal_file_path)
+    try:
+        with pytest.raises(AssertionError, match='used by another run'):
+            other_journal.lock()
+    finally:
+        other_journal.close()
+
+
+def test_run_journal_is_locked(tmp_path, journal):
+    journal.lock()
+
+    with pytest.raises(SystemExit):
+        videfix.open_run_journal(argparse.ArgumentParser(), journal.journal_file_path, resume=False, discard_journal=False)
+
+
+@pytest.mark.parametrize('resume, discard_journal, is_opened, num_entries', [
+    (False, False, False, None),  # the interrupted run isn't lost by mistake
+    (True, False, True, 1),
+    (False, True, True, 0),
+])
+def test_run_journal_keeps_an_interrupted_run(tmp_path, journal, resume, discard_journal, is_opened, num_entries):
+    journal.record(create_movie_file(tmp_path), videfix.JournalPhase.PROBED)
+
+    if not is_opened:
+        with pytest.raises(SystemExit):
+            videfix.open_run_journal(argparse.ArgumentParser(), journal.journal_file_path, resume, discard_journal)
+        return
+    run_journal = videfix.open_run_journal(argparse.ArgumentParser(), journal.journal_file_path, resume, discard_journal)
+    try:
+        assert len(run_journal.read_last_entries()) == num_entries
+    finally:
+        run_journal.close()
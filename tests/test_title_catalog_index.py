@@ -0,0 +1,139 @@
+"""
+tests the trigram index of the title catalogs of videfix (TitleCatalogIndex) on small catalogs
+"""
+import sys
+import os
+import gzip
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+import videfix  # noqa: E402
+
+
+CATALOG_TEXT = '''title,year
+Le Fabuleux Destin d'Amélie Poulain,2001
+The Matrix,1999
+The Matrix Reloaded,2003
+Heat,1995
+Heat,1986
+Alien,1979
+Aliens,1986
+東京物語,1953
+'''
+
+
+def open_catalog_index(tmp_path, catalog_file_name='catalog.csv', catalog_text=CATALOG_TEXT):
+    """
+    :param Path tmp_path:
+    :param str catalog_file_name: its suffixes tell the format of the catalog
+    :param str catalog_text:
+    :rtype TitleCatalogIndex:
+    """
+    catalog_file_path = tmp_path / catalog_file_name
+    if catalog_file_name.endswith('.gz'):
+        with gzip.open(catalog_file_path, 'wt', encoding='utf-8') as catalog_file:
+            catalog_file.write(catalog_text)
+    else:
+        catalog_file_path.write_text(catalog_text, encoding='utf-8')
+    return videfix.TitleCatalogIndex.open(catalog_file_path, tmp_path / 'index' / (catalog_file_name + '.trigram_index'))
+
+
+@pytest.fixture
+def catalog_index(tmp_path):
+    catalog_index = open_catalog_index(tmp_path)
+    yield catalog_index
+    catalog_index.close()
+
+
+@pytest.mark.parametrize('title, year, expected_match', [
+    ('The Matrix', None, ('The Matrix', 1999)),
+    # the case, the accents and the punctuation don't matter
+    ('le fabuleux destin d amelie poulain', None, ("Le Fabuleux Destin d'Amélie Poulain", 2001)),
+    ('matrix reloaded', None, ('The Matrix Reloaded', 2003)),
+    ('Alien', None, ('Alien', 1979)),
+    ('Aliens', None, ('Aliens', 1986)),
+    # among titles as similar, the one of the given year, then the one of a year close to it, then the first one in the catalog
+    ('Heat', 1986, ('Heat', 1986)),
+    ('Heat', 1987, ('Heat', 1986)),
+    ('Heat', 1996, ('Heat', 1995)),
+    ('Heat', None, ('Heat', 1995)),
+    ('Heat', 2020, ('Heat', 1995)),
+    ('Amelie', None, None),
+    ('Jaws', None, None),
+    # too short to have 2 trigrams
+    ('', None, None),
+])
+def test_find_title(catalog_index, title, year, expected_match):
+    match = catalog_index.find_title(title, year)
+
+    if expected_match is None:
+        assert match is None
+    else:
+        assert match is not None and match[:2] == expected_match
+        assert 0.6 <= match[2] <= 1.0
+
+
+def test_find_title_ranks_by_similarity(catalog_index):
+    assert catalog_index.find_title('The Matrix')[2] == 1.0
+    assert catalog_index.find_title('The Matrix Reloaded')[2] == 1.0
+    assert catalog_index.find_title('The Matrix Reloade')[:2] == ('The Matrix Reloaded', 2003)
+    assert catalog_index.find_title('Matrix', min_similarity=0.0)[:2] == ('The Matrix', 1999)
+    assert catalog_index.find_title('Matrix', min_similarity=0.9) is None
+
+
+def test_titles_without_trigrams_are_not_indexed(catalog_index):
+    assert catalog_index.num_titles == 7
+    assert [catalog_index.get_title(title_id) for title_id in range(2)] == [("Le Fabuleux Destin d'Amélie Poulain", 2001), ('The Matrix', 1999)]
+
+
+def test_imdb_catalog(tmp_path):
+    catalog_text = 'tconst\ttitleType\tprimaryTitle\toriginalTitle\tstartYear\n'
+    catalog_text += 'tt0133093\tmovie\tThe Matrix\tThe Matrix\t1999\n'
+    catalog_text += 'tt0389150\ttvSeries\tThe Matrix Revisited\tThe Matrix Revisited\t2001\n'
+    catalog_text += 'tt0000001\tshort\t"Carmencita\t"Carmencita\t\\N\n'
+    catalog_index = open_catalog_index(tmp_path, 'title.basics.tsv.gz', catalog_text)
+    try:
+        # the series are not indexed, the tsv is not quoted, and \N is an unknown year
+        assert [catalog_index.get_title(title_id) for title_id in range(catalog_index.num_titles)] == [('The Matrix', 1999), ('"Carmencita', None)]
+    finally:
+        catalog_index.close()
+
+
+def test_catalog_without_title_column(tmp_path):
+    with pytest.raises(AssertionError, match='title or primaryTitle'):
+        open_catalog_index(tmp_path, catalog_text='name,year\nThe Matrix,1999\n')
+
+
+def test_index_is_rebuilt_when_the_catalog_changes(tmp_path):
+    catalog_file_path = tmp_path / 'catalog.csv'
+    index_file_path = tmp_path / 'index' / 'catalog.csv.trigram_index'
+    open_catalog_index(tmp_path).close()
+    index_stat = index_file_path.stat()
+
+    # an unchanged catalog is not indexed again
+    videfix.TitleCatalogIndex.open(catalog_file_path, index_file_path).close()
+    assert index_file_path.stat().st_ino == index_stat.st_ino
+
+    # a catalog modified without changing its size is detected by its mtime
+    catalog_file_path.write_text(CATALOG_TEXT.replace('Heat,1986', 'Jaws,1975'), encoding='utf-8')
+    catalog_stat = catalog_file_path.stat()
+    os.utime(catalog_file_path, ns=(catalog_stat.st_atime_ns, catalog_stat.st_mtime_ns + 1000000000))
+    catalog_index = videfix.TitleCatalogIndex.open(catalog_file_path, index_file_path)
+    try:
+        assert index_file_path.stat().st_ino != index_stat.st_ino
+        assert (catalog_index.catalog_size, catalog_index.catalog_mtime_ns) == (catalog_file_path.stat().st_size, catalog_file_path.stat().st_mtime_ns)
+        assert catalog_index.find_title('Jaws')[:2] == ('Jaws', 1975)
+        assert catalog_index.find_title('Heat', 1986)[:2] == ('Heat', 1995)
+    finally:
+        catalog_index.close()
+    assert sorted(index_file_path.parent.iterdir()) == [index_file_path]
+
+
+def test_index_file_path_depends_on_the_catalog_path(tmp_path):
+    index_file_path = videfix.get_title_catalog_index_file_path(tmp_path / 'a' / 'catalog.csv')
+
+    assert index_file_path.name.startswith('catalog.csv.')
+    assert index_file_path != videfix.get_title_catalog_index_file_path(tmp_path / 'b' / 'catalog.csv')
+    assert index_file_path == videfix.get_title_catalog_index_file_path(tmp_path / 'b' / '..' / 'a' / 'catalog.csv')